@@ -10,8 +10,11 @@ import matplotlib.pyplot as plt
 import streamlit as st
 
 # Importa tus módulos del proyecto (layout actual: src/…)
-from src.scenarios import baseline, bloqueo, anchos
+from src.curves import StepCurve
 from src.metrics import plot_curva, plot_curvas_comparadas
+from src.jobs import ThreadedJobService
+from src.snapshots import build_floor_figure
+from src.store import ResultsStore
 
 # -------------------------------------------------------
 # Config general de la app
@@ -30,7 +33,7 @@ st.caption(
 # -------------------------------------------------------
 def _plot_line(ts, perc, title="Curva de evacuación"):
     fig, ax = plt.subplots()
-    ax.plot(ts, perc)
+    StepCurve(ts, perc).plot(ax)  # puntos de cambio, reducidos si son muchos
     ax.set_xlabel("Tiempo (s)")
     ax.set_ylabel("% evacuado")
     ax.set_title(title)
@@ -48,22 +51,107 @@ def _download_df_button(df: pd.DataFrame, filename: str, label: str = "Descargar
     )
 
 
-@st.cache_data(show_spinner=False)
-def run_baseline_cached(N, width, height, num_exits, seed, max_steps):
-    return baseline(N=N, width=width, height=height, num_exits=num_exits, seed=seed, max_steps=max_steps)
+@st.cache_resource
+def _registry():
+    # Servicio compartido entre sesiones: deduplica corridas con los mismos
+    # parámetros y acota los procesos simultáneos (el resto espera en cola)
+    return ThreadedJobService()
 
-@st.cache_data(show_spinner=False)
-def run_bloqueo_cached(N, width, height, num_exits, seed, t_bloqueo, exit_index, max_steps):
-    return bloqueo(
-        N=N, width=width, height=height, num_exits=num_exits, seed=seed,
-        t_bloqueo=t_bloqueo, exit_index=exit_index, max_steps=max_steps
-    )
 
-@st.cache_data(show_spinner=False)
-def run_anchos_cached(N, width, height, lista_anchos, seed, max_steps):
-    return anchos(
-        N=N, width=width, height=height, lista_anchos=tuple(lista_anchos), seed=seed, max_steps=max_steps
-    )
+POLL_S = 0.5  # frecuencia de refresco del progreso (s)
+
+
+def _fmt_eta(seconds):
+    if seconds is None or not np.isfinite(seconds):
+        return "—"
+    m, s = divmod(int(seconds), 60)
+    return f"{m}m {s:02d}s" if m else f"{s}s"
+
+
+def _launch(state_key, kind, params, snapshots=False):
+    run, created = _registry().submit(kind, params, snapshots=snapshots)
+    st.session_state[state_key] = run.key
+    if not created and run.pending:
+        st.info("Ya hay una corrida en curso con estos parámetros; se muestra su progreso.")
+
+
+def _live_view(run, title):
+    if not run.pending:
+        st.rerun()
+    if run.status == "queued":
+        pos = _registry().queue_position(run.key)
+        st.info(f"{title}: en cola ({pos or 0} trabajo/s antes).")
+        if st.button("⏹️ Cancelar", key=f"cancel_{run.key}"):
+            run.cancel()
+            st.rerun()
+        return
+
+    info = run.last
+    st.progress(min(run.overall_pct(), 100.0) / 100.0, text=f"{title}: {run.overall_pct():.1f}% de los steps")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("% evacuado", f"{info.get('pct', 0.0):.1f}%")
+    c2.metric("Ticks/s", f"{info.get('ticks_per_s', 0.0):.0f}")
+    c3.metric("ETA", _fmt_eta(run.eta()))
+
+    fig, ax = plt.subplots()
+    for variant, pts in run.points.items():
+        if pts:
+            ts, perc = zip(*pts)
+            ax.plot(ts, perc, label=None if variant is None else f"ancho{variant}")
+    ax.set_xlabel("Tiempo (s)")
+    ax.set_ylabel("% evacuado")
+    ax.set_ylim(0, 100)
+    ax.set_title(f"{title} (parcial)")
+    ax.grid(True, alpha=0.3)
+    if len(run.points) > 1:
+        ax.legend()
+    st.pyplot(fig, clear_figure=True)
+
+    if st.button("⏹️ Cancelar", key=f"cancel_{run.key}"):
+        run.cancel()
+        st.rerun()
+
+
+def _watch_run(state_key, title):
+    """
+    Muestra la corrida asociada a state_key: progreso en vivo mientras corre
+    (sin bloquear la app) y devuelve el resultado cuando termina (o None).
+    """
+    run = _registry().get(st.session_state.get(state_key))
+    if run is None:
+        return None
+    if run.pending:
+        st.fragment(run_every=POLL_S)(_live_view)(run, title)
+        return None
+    if run.status == "cancelled":
+        st.warning("Simulación cancelada.")
+    elif run.status == "error":
+        st.error("La simulación falló.")
+        st.code(run.error)
+    return run.result
+
+
+def _show_floor(state_key, title):
+    """Vista animada (plotly) si la corrida registró snapshots."""
+    run = _registry().get(st.session_state.get(state_key))
+    if run is None or not run.floor_view or not run.floor_view["frames"]:
+        return
+    st.markdown("### Vista del piso (animada)")
+    st.plotly_chart(build_floor_figure(run.floor_view, title=title), use_container_width=True)
+
+
+def _save_to_store(state_key):
+    """Botón para agregar la corrida terminada al almacén (una vez por corrida)."""
+    run = _registry().get(st.session_state.get(state_key))
+    if run is None or run.result is None:
+        return
+    saved = st.session_state.setdefault("stored_runs", {})
+    if run.key in saved:
+        st.caption(f"💾 En el almacén ({len(saved[run.key])} corrida/s).")
+    elif st.button("💾 Guardar en el almacén", key=f"store_{run.key}"):
+        results = run.result if run.kind == "anchos" else [run.result]
+        saved[run.key] = ResultsStore().append_results(run.kind, run.params, results)
+        st.rerun()
 
 
 # -------------------------------------------------------
@@ -77,7 +165,7 @@ seed = st.sidebar.number_input("Semilla", min_value=0, max_value=10_000, value=4
 max_steps = st.sidebar.number_input("Max steps", min_value=100, max_value=200_000, value=5000, step=500)
 
 st.sidebar.markdown("---")
-escenario = st.sidebar.selectbox("Escenario", ["Baseline", "Bloqueo", "Anchos (proxy)"])
+escenario = st.sidebar.selectbox("Escenario", ["Baseline", "Bloqueo", "Anchos (proxy)", "Comparar corridas"])
 
 # -------------------------------------------------------
 # Escenario: BASELINE
@@ -85,15 +173,18 @@ escenario = st.sidebar.selectbox("Escenario", ["Baseline", "Bloqueo", "Anchos (p
 if escenario == "Baseline":
     st.subheader("Escenario: Baseline")
     num_exits = st.number_input("Número de salidas", min_value=1, max_value=12, value=3, step=1)
+    snapshots = st.checkbox("🎞️ Registrar vista animada del piso", value=False, key="snap_baseline")
 
     colA, colB = st.columns([1, 2])
     with colA:
         run = st.button("▶️ Ejecutar baseline", type="primary")
     if run:
-        with st.spinner("Simulando baseline..."):
-            df, ts, perc, metrics = run_baseline_cached(
-                N=agents, width=width, height=height, num_exits=num_exits, seed=seed, max_steps=max_steps
-            )
+        _launch("run_baseline", "baseline", dict(
+            N=agents, width=width, height=height, num_exits=num_exits, seed=seed, max_steps=max_steps
+        ), snapshots=snapshots)
+    result = _watch_run("run_baseline", "Baseline")
+    if result is not None:
+        df, ts, perc, metrics = result
 
         # Métricas
         mdf = pd.DataFrame([metrics])
@@ -101,10 +192,13 @@ if escenario == "Baseline":
         st.markdown("### Métricas")
         st.dataframe(mdf, use_container_width=True)
         _download_df_button(mdf, "baseline_metrics.csv", "Descargar métricas (CSV)")
+        _save_to_store("run_baseline")
 
         # Curva
         st.markdown("### Curva de evacuación")
         _plot_line(ts, perc, "Curva de evacuación — Baseline")
+        _download_df_button(StepCurve(ts, perc).to_frame(), "baseline_curva.csv", "Descargar curva (CSV)")
+        _show_floor("run_baseline", "Baseline — posiciones, colas y densidad")
 
         # Tiempos individuales
         st.markdown("### Tiempos individuales")
@@ -123,23 +217,30 @@ elif escenario == "Bloqueo":
     num_exits = st.number_input("Número de salidas", min_value=1, max_value=12, value=3, step=1)
     t_bloqueo = st.number_input("Tiempo de bloqueo (s)", min_value=0.0, max_value=10_000.0, value=60.0, step=5.0)
     exit_index = st.number_input("Índice de salida a bloquear (0..n-1)", min_value=0, max_value=max(0, num_exits-1), value=0, step=1)
+    snapshots = st.checkbox("🎞️ Registrar vista animada del piso", value=False, key="snap_bloqueo")
 
     run = st.button("🚧 Ejecutar bloqueo", type="primary")
     if run:
-        with st.spinner("Simulando bloqueo..."):
-            df, ts, perc, metrics = run_bloqueo_cached(
-                N=agents, width=width, height=height, num_exits=num_exits,
-                seed=seed, t_bloqueo=t_bloqueo, exit_index=exit_index, max_steps=max_steps
-            )
+        _launch("run_bloqueo", "bloqueo", dict(
+            N=agents, width=width, height=height, num_exits=num_exits,
+            seed=seed, t_bloqueo=t_bloqueo, exit_index=exit_index, max_steps=max_steps
+        ), snapshots=snapshots)
+    result = _watch_run("run_bloqueo", "Bloqueo")
+    if result is not None:
+        df, ts, perc, metrics = result
 
         mdf = pd.DataFrame([metrics])
         st.success("✅ Simulación completada.")
         st.markdown("### Métricas")
         st.dataframe(mdf, use_container_width=True)
         _download_df_button(mdf, f"bloqueo_e{exit_index}_t{int(t_bloqueo)}_metrics.csv", "Descargar métricas (CSV)")
+        _save_to_store("run_bloqueo")
 
         st.markdown("### Curva de evacuación")
         _plot_line(ts, perc, f"Bloqueo — salida {exit_index} a {t_bloqueo}s")
+        _download_df_button(StepCurve(ts, perc).to_frame(),
+                            f"bloqueo_e{exit_index}_t{int(t_bloqueo)}_curva.csv", "Descargar curva (CSV)")
+        _show_floor("run_bloqueo", f"Bloqueo — salida {exit_index} a {t_bloqueo}s")
 
         st.markdown("### Tiempos individuales")
         if df is not None and not df.empty:
@@ -164,11 +265,12 @@ elif escenario == "Anchos (proxy)":
 
     run = st.button("📈 Ejecutar comparación", type="primary")
     if run:
-        with st.spinner("Simulando anchos (proxy)..."):
-            resultados = run_anchos_cached(
-                N=agents, width=width, height=height, lista_anchos=tuple(lista_anchos),
-                seed=seed, max_steps=max_steps
-            )
+        _launch("run_anchos", "anchos", dict(
+            N=agents, width=width, height=height, lista_anchos=tuple(lista_anchos),
+            seed=seed, max_steps=max_steps
+        ))
+    resultados = _watch_run("run_anchos", "Anchos (proxy)")
+    if resultados is not None:
 
         # Curvas comparadas
         series, rows = [], []
@@ -180,7 +282,7 @@ elif escenario == "Anchos (proxy)":
         st.markdown("### Curvas comparadas")
         fig, ax = plt.subplots()
         for label, ts, perc in series:
-            ax.plot(ts, perc, label=label)
+            StepCurve(ts, perc).plot(ax, label=label)
         ax.set_xlabel("Tiempo (s)")
         ax.set_ylabel("% evacuado")
         ax.set_title("Curvas por 'ancho' (proxy)")
@@ -193,21 +295,72 @@ elif escenario == "Anchos (proxy)":
         st.markdown("### Métricas por 'ancho'")
         st.dataframe(resumo, use_container_width=True)
         _download_df_button(resumo, "anchos_metrics.csv", "Descargar métricas (CSV)")
+        _save_to_store("run_anchos")
 
         # Descarga de tiempos individuales por ancho (ZIP simple en memoria)
         import zipfile
         mem_zip = io.BytesIO()
         with zipfile.ZipFile(mem_zip, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for a, df, _, _, _ in resultados:
+            for a, df, ts, perc, _ in resultados:
                 csv_bytes = df.to_csv(index=False).encode("utf-8")
                 zf.writestr(f"anchos_{a}_times.csv", csv_bytes)
+                zf.writestr(f"anchos_{a}_curva.csv", StepCurve(ts, perc).to_frame().to_csv(index=False))
         st.download_button(
-            "Descargar tiempos por ancho (ZIP)",
+            "Descargar tiempos y curvas por ancho (ZIP)",
             data=mem_zip.getvalue(),
             file_name="anchos_times.zip",
             mime="application/zip",
         )
 
+# -------------------------------------------------------
+# Comparar corridas guardadas
+# -------------------------------------------------------
+elif escenario == "Comparar corridas":
+    st.subheader("Comparar corridas del almacén")
+    store = ResultsStore()
+    nombres = store.scenarios()
+    if not nombres:
+        st.info(f"El almacén ({store.root}) está vacío: guarda corridas desde los escenarios "
+                "o con los scripts de experiments/.")
+        st.stop()
+
+    elegidos = st.multiselect("Escenarios", nombres, default=nombres)
+    where = st.text_input("Filtro (expresión pandas, opcional)", "", placeholder="N == 300 and makespan < 60")
+    try:
+        runs = store.runs(elegidos, where=where or None)
+    except Exception as e:
+        st.error(f"Filtro inválido: {e}")
+        st.stop()
+
+    st.markdown(f"### Corridas ({len(runs)})")
+    cols = [c for c in runs.columns if c not in ("params", "batch")]
+    st.dataframe(runs[cols], use_container_width=True)
+    _download_df_button(runs[cols], "corridas.csv", "Descargar tabla (CSV)")
+
+    ids = st.multiselect("Corridas a superponer", runs["run_id"].tolist(), default=runs["run_id"].tolist()[-5:])
+    if ids:
+        curvas = store.curves(ids)  # sólo se leen las curvas elegidas
+        fig, ax = plt.subplots()
+        for rid in ids:
+            if rid in curvas:
+                ts, perc = curvas[rid]
+                StepCurve(ts, perc).plot(ax, label=rid)
+        ax.set_xlabel("Tiempo (s)")
+        ax.set_ylabel("% evacuado")
+        ax.set_ylim(0, 100)
+        ax.set_title("Curvas comparadas")
+        ax.grid(True, alpha=0.3)
+        if curvas:
+            ax.legend(fontsize=7)
+        st.pyplot(fig, clear_figure=True)
+        sin_curva = [rid for rid in ids if rid not in curvas]
+        if sin_curva:
+            st.caption(f"Sin curva guardada: {', '.join(sin_curva)}")
+
+        metricas = [c for c in ("makespan", "p50", "p90", "evacuados") if c in runs.columns]
+        st.markdown("### Métricas")
+        st.dataframe(runs[runs["run_id"].isin(ids)][["run_id", "scenario", *metricas]], use_container_width=True)
+
 # -------------------------------------------------------
 # Pie
 # -------------------------------------------------------
@@ -0,0 +1,61 @@
+import argparse
+import sys
+import time
+import tracemalloc
+import warnings
+
+from src.agents import PersonAgent
+from src.model import EvacuationModel
+
+warnings.filterwarnings("ignore")
+
+
+def bytes_per_agent(model):
+    """Tamaño de la instancia más su __dict__ (si tiene), promedio por persona."""
+    persons = [a for a in model.schedule.agents if isinstance(a, PersonAgent)]
+    total = 0
+    for a in persons:
+        total += sys.getsizeof(a)
+        d = getattr(a, "__dict__", None)
+        if d is not None:
+            total += sys.getsizeof(d)
+    return total / max(len(persons), 1)
+
+
+def bench(N, width, height, ticks=50, seed=0, scheduler="random", warmup=0):
+    """
+    (bytes/agente por instancia, bytes/agente asignados al construir, s/tick).
+    warmup: ticks previos sin medir (p. ej. para medir con colas ya formadas).
+    """
+    tracemalloc.start()
+    model = EvacuationModel(width=width, height=height, N=N, seed=seed, scheduler=scheduler)
+    alloc, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for _ in range(warmup):
+        model.step()
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        model.step()
+    per_tick = (time.perf_counter() - t0) / ticks
+    return bytes_per_agent(model), alloc / N, per_tick
+
+
+def main():
+    p = argparse.ArgumentParser(description="Memoria por agente y tiempo por tick del modelo Mesa")
+    p.add_argument("--agents", nargs="+", type=int, default=[10_000])
+    p.add_argument("--density", type=float, default=0.5, help="personas por celda (define el tamaño del grid)")
+    p.add_argument("--ticks", type=int, default=50)
+    p.add_argument("--warmup", type=int, default=0, help="ticks sin medir antes de cronometrar")
+    p.add_argument("--scheduler", nargs="+", choices=["random", "active"], default=["random"])
+    args = p.parse_args()
+
+    print(f"{'N':>8} {'grid':>9} {'scheduler':>9} {'B/agente':>9} {'B/agente (modelo)':>18} {'ms/tick':>8}")
+    for N in args.agents:
+        side = max(5, int((N / args.density) ** 0.5))
+        for sch in args.scheduler:
+            inst, alloc, tick = bench(N, side, side, args.ticks, scheduler=sch, warmup=args.warmup)
+            print(f"{N:>8} {side:>4}x{side:<4} {sch:>9} {inst:>9.0f} {alloc:>18.0f} {tick * 1e3:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from src.curves import StepCurve
+from src.scenarios import baseline
+from src.space import METRICS, best_step_table, bottom_exit_positions, distance_field
+
+warnings.filterwarnings("ignore")
+
+
+def build_time(side, metric, num_exits=3, repeat=3):
+    """Mejor tiempo (s) de armar el campo de distancias de un grid side x side."""
+    exits = bottom_exit_positions(side, num_exits)
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        distance_field(side, side, exits, metric=metric)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def mean_ties(side, metric, num_exits=3):
+    """Candidatos promedio del paso greedy por celda (1 = sin empates)."""
+    _, counts = best_step_table(distance_field(side, side, bottom_exit_positions(side, num_exits), metric=metric))
+    return float(counts.mean())
+
+
+def main():
+    p = argparse.ArgumentParser(description="Campo de distancias por métrica: tiempo de armado y efecto en la evacuación")
+    p.add_argument("--sides", nargs="+", type=int, default=[100, 500, 1000, 2000], help="lados de grid para el armado")
+    p.add_argument("--metrics", nargs="+", choices=METRICS, default=list(METRICS))
+    p.add_argument("--agents", type=int, default=300)
+    p.add_argument("--side", type=int, default=25, help="lado del grid de las corridas")
+    p.add_argument("--seeds", nargs="+", type=int, default=[1, 2, 3, 4, 5, 6])
+    p.add_argument("--max_steps", type=int, default=1500)
+    p.add_argument("--pct", type=float, default=25.0, help="%% evacuado para medir ticks (muchas corridas no llegan a 100)")
+    args = p.parse_args()
+
+    print("Armado del campo (s):")
+    print(f"{'lado':>6} " + " ".join(f"{m:>10}" for m in args.metrics))
+    for side in args.sides:
+        print(f"{side:>6} " + " ".join(f"{build_time(side, m):>10.3f}" for m in args.metrics))
+
+    print(f"\nCorridas: {args.agents} personas, grid {args.side}x{args.side}, semillas {args.seeds}")
+    print(f"{'métrica':>10} {'empates':>8} {'ticks ' + format(args.pct, 'g') + ' %':>10} {'makespan':>9} "
+          f"{'% evac':>7} {'s/corrida':>9}")
+    for m in args.metrics:
+        rows = []
+        t0 = time.perf_counter()
+        for seed in args.seeds:
+            _, ts, perc, met = baseline(N=args.agents, width=args.side, height=args.side, seed=seed,
+                                        max_steps=args.max_steps, model_kwargs={"metric": m})
+            ticks = StepCurve(ts, perc).time_to(args.pct) / met["time_step"]
+            rows.append((ticks, met["makespan"], met["evacuados"] / args.agents * 100.0))
+        secs = (time.perf_counter() - t0) / len(args.seeds)
+        ticks, mk, pct = np.nanmean(np.array(rows, dtype=float), axis=0)
+        print(f"{m:>10} {mean_ties(args.side, m):>8.2f} {ticks:>10.0f} {mk:>9.1f} {pct:>7.1f} {secs:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# módulos cuyo costo de import se reporta (cada uno en un intérprete nuevo)
+MODULES = ["src.cli", "src.jobs", "src.batched", "src.metrics", "src.scenarios", "numpy", "pandas",
+           "matplotlib.pyplot", "mesa"]
+
+
+def import_ms(module):
+    """Tiempo acumulado de importar module (ms), según python -X importtime."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         capture_output=True, text=True).stderr
+    last = [l for l in out.splitlines() if l.startswith("import time:") and re.search(rf"\| {re.escape(module)}$", l)]
+    return int(last[-1].split("|")[1]) / 1000.0 if last else float("nan")
+
+
+def cli_ms(repeats):
+    """Mediana del tiempo de pared (ms) de `python -m src.cli --help` en un proceso nuevo."""
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "src.cli", "--help"], capture_output=True, check=True)
+        times.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(times)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Costo de import y arranque del CLI (python -m src.cli)")
+    p.add_argument("--repeats", type=int, default=5)
+    p.add_argument("--budget_ms", type=float, default=150.0, help="presupuesto para `python -m src.cli --help`")
+    args = p.parse_args()
+
+    print(f"{'módulo':<20} {'import (ms)':>12}")
+    for m in MODULES:
+        print(f"{m:<20} {import_ms(m):>12.1f}")
+
+    t = cli_ms(args.repeats)
+    ok = t <= args.budget_ms
+    print(f"\npython -m src.cli --help: {t:.0f} ms (presupuesto {args.budget_ms:.0f} ms) {'✅' if ok else '❌'}")
+    raise SystemExit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
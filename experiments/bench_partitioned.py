@@ -0,0 +1,39 @@
+import argparse
+import os
+import time
+import warnings
+
+from src.partitioned import run_partitioned
+
+warnings.filterwarnings("ignore")
+
+
+def bench(N, side, workers, ticks, seed=0):
+    """(franjas usadas, segundos totales, ticks/s) de una corrida acotada a 'ticks' ticks."""
+    t0 = time.perf_counter()
+    *_, metrics = run_partitioned(N=N, width=side, height=side, seed=seed, max_steps=ticks, workers=workers)
+    elapsed = time.perf_counter() - t0
+    return metrics["workers"], elapsed, metrics["steps"] / metrics["elapsed_s"]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Escalado del motor particionado por franjas (1 a todos los núcleos)")
+    p.add_argument("--agents", type=int, default=50_000)
+    p.add_argument("--side", type=int, default=600, help="lado del grid (celdas)")
+    p.add_argument("--ticks", type=int, default=200)
+    p.add_argument("--workers", nargs="+", type=int, default=None,
+                   help="cantidades de procesos (por defecto 1, 2, 4, ... hasta os.cpu_count())")
+    args = p.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({min(2 ** k, cores) for k in range(cores.bit_length() + 1)})
+    print(f"{args.agents} personas, grid {args.side}x{args.side}, {args.ticks} ticks, {cores} núcleos")
+    print(f"{'procesos':>8} {'s total':>8} {'ticks/s':>8} {'speedup':>8} {'eficiencia':>10}")
+    base = None
+    for w in workers:
+        used, elapsed, rate = bench(args.agents, args.side, w, args.ticks)
+        base = base or rate
+        print(f"{used:>8} {elapsed:>8.1f} {rate:>8.1f} {rate / base:>8.2f} {rate / base / used:>10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+import time
+import warnings
+
+from src.model import EvacuationModel
+
+warnings.filterwarnings("ignore")
+
+
+def bench(N, width, height, repeats=3):
+    """Mejor tiempo (s) de construir EvacuationModel con N personas."""
+    best = float("inf")
+    for r in range(repeats):
+        t0 = time.perf_counter()
+        EvacuationModel(width=width, height=height, N=N, seed=r)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    p = argparse.ArgumentParser(description="Tiempo de arranque del modelo (construcción de la población)")
+    p.add_argument("--agents", nargs="+", type=int, default=[1_000, 10_000, 100_000])
+    p.add_argument("--density", type=float, default=0.5, help="personas por celda (define el tamaño del grid)")
+    p.add_argument("--repeats", type=int, default=3)
+    args = p.parse_args()
+
+    print(f"{'N':>8} {'grid':>9} {'s':>8} {'µs/agente':>10}")
+    for N in args.agents:
+        side = max(5, int((N / args.density) ** 0.5))
+        t = bench(N, side, side, args.repeats)
+        print(f"{N:>8} {side:>4}x{side:<4} {t:>8.3f} {t / N * 1e6:>10.1f}")
+
+if __name__ == "__main__":
+    main()
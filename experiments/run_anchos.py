@@ -2,8 +2,9 @@ import argparse, os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from src.scenarios import anchos
-from src.metrics import plot_curvas_comparadas
+from src.jobs import run_job
+from src.metrics import plot_curvas_comparadas, save_heatmaps
+from src.store import ResultsStore
 
 def main():
     p = argparse.ArgumentParser()
@@ -14,25 +15,32 @@ def main():
     p.add_argument("--seed", type=int, default=42)
     p.add_argument("--max_steps", type=int, default=5000)
     p.add_argument("--outdir", type=str, default="results")
+    p.add_argument("--heatmaps", action="store_true", help="exportar mapas de calor por celda (.npy)")
+    p.add_argument("--store", type=str, default=None, help="almacén de resultados (por defecto: <outdir>/store)")
+    p.add_argument("--no_store", action="store_true", help="no agregar la corrida al almacén")
+    p.add_argument("--subprocess", action="store_true", help="correr en un proceso trabajador aparte")
     args = p.parse_args()
 
     os.makedirs(args.outdir, exist_ok=True)
 
-    resultados = anchos(
+    resultados = run_job("anchos", dict(
         N=args.agents, width=args.width, height=args.height,
-        lista_anchos=args.anchos, seed=args.seed, max_steps=args.max_steps
-    )
+        lista_anchos=args.anchos, seed=args.seed, max_steps=args.max_steps,
+        heatmaps=args.heatmaps
+    ), inline=not args.subprocess)
 
     # Guardar resumen + curvas
     series = []
     rows = []
-    for a, df, ts, perc, met in resultados:
+    for a, df, ts, perc, met, *maps in resultados:
         series.append((f"ancho{a}", ts, perc))
         rows.append({**met, "N": args.agents, "width": args.width, "height": args.height, "seed": args.seed})
 
         # export por ancho
         pref = os.path.join(args.outdir, f"anchos_{a}")
         df.to_csv(pref + "_times.csv", index=False)
+        if maps:
+            save_heatmaps(maps[0], pref)
 
     # CSV de métricas
     resumo = pd.DataFrame(rows)
@@ -61,6 +69,13 @@ def main():
     except Exception:
         pass
 
+    if not args.no_store:
+        store = ResultsStore(args.store or os.path.join(args.outdir, "store"))
+        ids = store.append_results("anchos", dict(
+            N=args.agents, width=args.width, height=args.height, seed=args.seed, max_steps=args.max_steps
+        ), resultados)
+        print(f"✅ Almacén: {store.root} ({len(ids)} corridas)")
+
     print("✅ Listo.")
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 import argparse, os
 import pandas as pd
-from src.scenarios import bloqueo
-from src.metrics import save_times, save_metrics, plot_curva
+from src.jobs import run_job
+from src.metrics import save_times, save_metrics, save_heatmaps, plot_curva
+from src.store import ResultsStore
 
 def main():
     p = argparse.ArgumentParser()
@@ -14,18 +15,26 @@ def main():
     p.add_argument("--exit_index", type=int, default=0, help="índice de salida a bloquear (0..n-1)")
     p.add_argument("--max_steps", type=int, default=5000)
     p.add_argument("--outdir", type=str, default="results")
+    p.add_argument("--heatmaps", action="store_true", help="exportar mapas de calor por celda (.npy)")
+    p.add_argument("--store", type=str, default=None, help="almacén de resultados (por defecto: <outdir>/store)")
+    p.add_argument("--no_store", action="store_true", help="no agregar la corrida al almacén")
+    p.add_argument("--subprocess", action="store_true", help="correr en un proceso trabajador aparte")
     args = p.parse_args()
 
     os.makedirs(args.outdir, exist_ok=True)
 
-    df, ts, perc, metrics = bloqueo(
-        N=args.agents, width=args.width, height=args.height,
-        num_exits=args.num_exits, seed=args.seed,
-        t_bloqueo=args.t_bloqueo, exit_index=args.exit_index,
-        max_steps=args.max_steps
-    )
+    params = dict(N=args.agents, width=args.width, height=args.height,
+                  num_exits=args.num_exits, seed=args.seed,
+                  t_bloqueo=args.t_bloqueo, exit_index=args.exit_index, max_steps=args.max_steps)
+    df, ts, perc, metrics, *maps = run_job("bloqueo", {**params, "heatmaps": args.heatmaps}, inline=not args.subprocess)
+
+    if metrics["t_bloqueo_aplicado"] == metrics["t_bloqueo_aplicado"]:  # no NaN: hubo cierre
+        print(f"✅ Salida {args.exit_index} bloqueada en t={metrics['t_bloqueo_aplicado']:.1f}s. "
+              f"Nuevas salidas: {metrics['num_exits_final']}, Agentes liberados: {metrics['liberados']}")
 
     base = f"bloqueo_e{args.exit_index}_t{int(args.t_bloqueo)}"
+    if maps:
+        save_heatmaps(maps[0], os.path.join(args.outdir, base))
     save_times(df, os.path.join(args.outdir, f"{base}_times.csv"))
     save_metrics({
         **metrics,
@@ -34,6 +43,11 @@ def main():
     }, os.path.join(args.outdir, f"{base}_metrics.csv"))
     plot_curva(ts, perc, f"Bloqueo: salida {args.exit_index} @ {args.t_bloqueo}s", os.path.join(args.outdir, f"{base}_curva.png"))
 
+    if not args.no_store:
+        store = ResultsStore(args.store or os.path.join(args.outdir, "store"))
+        run_id = store.append_run("bloqueo", params, metrics, ts, perc, df)
+        print(f"✅ Almacén: {store.root} (run_id {run_id})")
+
     print("✅ Listo.")
 
 if __name__ == "__main__":
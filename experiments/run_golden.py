@@ -0,0 +1,60 @@
+import argparse, os
+from src.golden import ENGINES, GOLDEN_SEEDS, record, replay
+
+def main():
+    p = argparse.ArgumentParser(description="Salidas de referencia y verificación de motores")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("record", help="correr el corpus y guardar la referencia")
+    r.add_argument("--engine", choices=list(ENGINES), default="mesa")
+    r.add_argument("--seeds", nargs="+", type=int, default=list(GOLDEN_SEEDS))
+    r.add_argument("--golden", type=str, default="results/golden.json")
+
+    c = sub.add_parser("check", help="volver a correr el corpus con un motor y comparar")
+    c.add_argument("--engine", nargs="+", choices=list(ENGINES), default=["mesa"])
+    c.add_argument("--mode", choices=["auto", "exact", "ks"], default="auto",
+                   help="auto: exacto para mesa, KS para motores equivalentes en distribución")
+    c.add_argument("--alpha", type=float, default=0.01, help="nivel de la prueba KS")
+    c.add_argument("--golden", type=str, default="results/golden.json")
+    c.add_argument("--out", type=str, default=None, help="CSV con el reporte (opcional)")
+    args = p.parse_args()
+
+    def progress(info):
+        print(f"  {info['scenario']} seed={info['seed']}: {info['seconds']:.1f}s")
+
+    if args.cmd == "record":
+        golden = record(args.golden, engine=args.engine, seeds=args.seeds, progress=progress)
+        print(f"✅ Referencia ({args.engine}, {len(golden['cases'])} corridas): {args.golden}")
+        return
+
+    ok = True
+    reports = []
+    for engine in args.engine:
+        print(f"Motor {engine}:")
+        rep = replay(args.golden, engine=engine, mode=args.mode, alpha=args.alpha, progress=progress)
+        rep.insert(0, "engine", engine)
+        reports.append(rep)
+        for row in rep.itertuples():
+            name = row.scenario + (f"[{row.variant:g}]" if row.variant == row.variant else "")
+            if rep.attrs["mode"] == "exact":
+                detail = "idéntico" if row.exact else (
+                    f"Δcurva máx {row.max_curve_diff:.3g} pts, métricas: {row.metric_diffs or '-'}")
+            elif row.ks_stat != row.ks_stat:  # sin tiempos individuales (streaming)
+                detail = "métricas ok" if row.equivalent else f"métricas: {row.metric_diffs}"
+            else:
+                detail = f"KS D={row.ks_stat:.3f} p={row.ks_pvalue:.3f}"
+            mark = "✓" if row.equivalent else "✗"
+            print(f"  {mark} {name:<14} {detail:<40} makespan {row.makespan_ref:.1f} → {row.makespan:.1f} s"
+                  f"  {row.seconds_ref:.1f}s → {row.seconds:.1f}s (x{row.speedup:.2f})")
+        ok &= bool(rep["equivalent"].all())
+
+    if args.out:
+        import pandas as pd
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        pd.concat(reports, ignore_index=True).to_csv(args.out, index=False)
+        print(f"✅ Reporte: {args.out}")
+    print("✅ Equivalente." if ok else "❌ Hay diferencias con la referencia.")
+    raise SystemExit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
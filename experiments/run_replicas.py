@@ -0,0 +1,76 @@
+import argparse, os
+from src.replicas import run_replicas
+from src.store import ResultsStore
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--scenario", choices=["baseline", "bloqueo"], default="baseline")
+    p.add_argument("--agents", type=int, default=300)
+    p.add_argument("--width", type=int, default=25)
+    p.add_argument("--height", type=int, default=25)
+    p.add_argument("--num_exits", type=int, default=3)
+    p.add_argument("--t_bloqueo", type=float, default=60.0, help="sólo bloqueo")
+    p.add_argument("--exit_index", type=int, default=0, help="sólo bloqueo")
+    p.add_argument("--max_steps", type=int, default=5000)
+    p.add_argument("--metrics", nargs="+", default=["makespan", "p90"])
+    p.add_argument("--precision", type=float, default=0.05, help="semiancho del IC / |media| buscado")
+    p.add_argument("--confidence", type=float, default=0.95)
+    p.add_argument("--min_runs", type=int, default=5)
+    p.add_argument("--max_runs", type=int, default=200, help="presupuesto de corridas")
+    p.add_argument("--max_seconds", type=float, default=None, help="presupuesto de tiempo")
+    p.add_argument("--workers", type=int, default=None, help="procesos (por defecto: todos los núcleos)")
+    p.add_argument("--base_seed", type=int, default=0)
+    p.add_argument("--outdir", type=str, default="results")
+    p.add_argument("--store", type=str, default=None, help="almacén de resultados (por defecto: <outdir>/store)")
+    p.add_argument("--no_store", action="store_true", help="no agregar la corrida al almacén")
+    p.add_argument("--perf", action="store_true", help="medir tiempo, throughput y memoria de cada réplica")
+    args = p.parse_args()
+
+    os.makedirs(args.outdir, exist_ok=True)
+
+    params = dict(N=args.agents, width=args.width, height=args.height,
+                  num_exits=args.num_exits, max_steps=args.max_steps)
+    if args.scenario == "bloqueo":
+        params.update(t_bloqueo=args.t_bloqueo, exit_index=args.exit_index)
+
+    def progress(info):
+        worst = info["summary"]["rel_precision"].max()
+        print(f"  ola {info['waves']}: {info['runs']} corridas, peor precisión relativa {worst:.3f}")
+
+    rep = run_replicas(
+        args.scenario, params, metrics=args.metrics, rel_precision=args.precision,
+        confidence=args.confidence, min_runs=args.min_runs, max_runs=args.max_runs,
+        max_seconds=args.max_seconds, workers=args.workers, base_seed=args.base_seed,
+        progress=progress, perf=args.perf,
+    )
+
+    base = os.path.join(args.outdir, f"replicas_{args.scenario}")
+    rep["summary"].to_csv(base + "_summary.csv", index=False)
+    rep["per_run"].to_csv(base + "_runs.csv", index=False)
+    if args.perf:
+        rep["perf"].to_csv(base + "_perf.csv", index=False)
+
+    reason = {"precision": "precisión alcanzada", "budget": "presupuesto de corridas agotado",
+              "time": "presupuesto de tiempo agotado"}[rep["stopped"]]
+    print(f"Corridas usadas: {rep['runs']} en {len(rep['waves'])} olas ({reason}, {rep['elapsed']:.1f}s)")
+    for r in rep["summary"].itertuples():
+        print(f"  {r.metric}: {r.mean:.2f} ± {r.half_width:.2f} (IC {args.confidence:.0%}, "
+              f"precisión relativa {r.rel_precision:.3f}, meta {args.precision:.3f}"
+              f"{' ✓' if r.target_met else ''})")
+    if args.perf:
+        pf = rep["perf"].iloc[0]
+        print(f"  recursos: {pf.wall_s_mean:.2f}s/réplica, {pf.agent_steps_per_s_mean:,.0f} personas-tick/s, "
+              f"RSS pico {pf.rss_peak_mb_max:.0f} MB")
+    print(f"✅ Guardado: {base}_summary.csv")
+    if not args.no_store:
+        # sólo métricas por réplica (los trabajadores no devuelven curvas)
+        store = ResultsStore(args.store or os.path.join(args.outdir, "store"))
+        ids = store.append(args.scenario, [
+            {"params": {**params, "seed": int(r["seed"])}, "metrics": {m: r[m] for m in args.metrics}}
+            for r in rep["per_run"].to_dict("records")
+        ])
+        print(f"✅ Almacén: {store.root} ({len(ids)} corridas)")
+    print("✅ Listo.")
+
+if __name__ == "__main__":
+    main()
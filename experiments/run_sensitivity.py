@@ -0,0 +1,42 @@
+import argparse, os
+from src.sensitivity import run_sensitivity
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--method", choices=["sobol", "morris"], default="sobol")
+    p.add_argument("--n", type=int, default=64, help="sobol: muestras base; morris: trayectorias")
+    p.add_argument("--engine", choices=["batched", "mesa"], default="batched")
+    p.add_argument("--agents", type=int, default=300)
+    p.add_argument("--width", type=int, default=25)
+    p.add_argument("--height", type=int, default=25)
+    p.add_argument("--num_exits", type=int, default=3)
+    p.add_argument("--seeds", nargs="+", type=int, default=[42], help="semillas por punto (se promedian)")
+    p.add_argument("--max_steps", type=int, default=2000)
+    p.add_argument("--workers", type=int, default=None, help="procesos (por defecto: todos los núcleos)")
+    p.add_argument("--outdir", type=str, default="results")
+    p.add_argument("--cache", type=str, default=None, help="carpeta de caché (por defecto: <outdir>/sens_cache)")
+    args = p.parse_args()
+
+    os.makedirs(args.outdir, exist_ok=True)
+
+    rep = run_sensitivity(
+        method=args.method, n=args.n, engine=args.engine,
+        N=args.agents, width=args.width, height=args.height, num_exits=args.num_exits,
+        seeds=args.seeds, max_steps=args.max_steps, workers=args.workers,
+        cache_dir=args.cache or os.path.join(args.outdir, "sens_cache"),
+    )
+
+    base = os.path.join(args.outdir, f"sensibilidad_{args.method}")
+    rep["indices"].to_csv(base + "_indices.csv", index=False)
+    rep["design"].to_csv(base + "_design.csv", index=False)
+
+    key = "ST" if args.method == "sobol" else "mu_star"
+    print(f"Puntos: {rep['points']} (desde caché: {rep['cached']})")
+    for out, g in rep["indices"].groupby("output", sort=False):
+        top = g.sort_values(key, ascending=False).head(3)
+        print(f"  {out}: " + ", ".join(f"{r.factor} ({key}={getattr(r, key):.2f})" for r in top.itertuples()))
+    print(f"✅ Guardado: {base}_indices.csv")
+    print("✅ Listo.")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 from mesa import Agent
 import numpy as np
 import random
-from .space import neighbors_moore
+
+# Estados de PersonAgent (enteros chicos: comparar es más barato que con strings)
+# IDLE: todavía en pre-movimiento (ver events.StaggeredRelease)
+MOVING, WAITING, IDLE = 0, 1, 2
+STATE_NAMES = ("MOVING", "WAITING", "IDLE")
+
+# Re-evaluación por pánico de quien espera: si pánico > MIN, prob. P por tick
+PANIC_RECHECK_MIN = 0.7
+PANIC_RECHECK_P = 0.05
 
 class ExitAgent(Agent):
     """
@@ -10,9 +18,12 @@ class ExitAgent(Agent):
     y evacúa floor(credit) personas en cola; reduce credit en esa cantidad.
     La cola es implícita: personas adyacentes que se 'anclan' a esta salida.
     """
-    def __init__(self, unique_id, model, pos, capacity_ps=1.3):
+    def __init__(self, unique_id, model, pos, capacity_ps=1.3, index=None):
         super().__init__(unique_id, model)
         self.pos = pos
+        self.home = pos     # pos queda en None si se cierra (grid.remove_agent); home no
+        self.index = index  # posición original en model.exits (métricas por salida)
+        self.window = []    # celdas vecinas (cola), la asigna el modelo: model.moore_window(pos)
         self.capacity_ps = capacity_ps
         self.service_credit = 0.0
         self.exit_count = 0  # Contador para throughput
@@ -22,13 +33,10 @@ class ExitAgent(Agent):
         self.service_credit += self.capacity_ps * self.model.time_step
 
         # Recoger candidatos (personas esperando junto a la salida)
-        x, y = self.pos
-        candidates = []
-        for nx, ny in neighbors_moore(x, y, self.model.width, self.model.height):
-            contents = self.model.grid.get_cell_list_contents([(nx, ny)])
-            for a in contents:
-                if isinstance(a, PersonAgent) and (not a.evacuated) and a.target_exit is self and a.state == "WAITING":
-                    candidates.append(a)
+        candidates = [
+            a for a in self.model.grid.get_cell_list_contents(self.window)
+            if isinstance(a, PersonAgent) and (not a.evacuated) and a.target_exit is self and a.state == WAITING
+        ]
 
         # Servir hasta 'credit' personas
         k = int(self.service_credit)
@@ -41,8 +49,13 @@ class ExitAgent(Agent):
             a.evacuated = True
             t_now = self.model.schedule.steps * self.model.time_step
             a.t_exit = t_now
-            self.model.exit_events.append({"id": a.unique_id, "t_exit": t_now})
+            if self.model.stream is not None:
+                self.model.stream.record(t_now, a.tipo, self.index)
+            else:
+                self.model.exit_events.append({"id": a.unique_id, "t_exit": t_now})
             self.exit_count += 1  # ¡CORREGIDO: solo una vez!
+            if self.model.pos_cols is not None:
+                self.model.pos_cols.remove(a.unique_id)
 
             # Remover del grid/schedule
             try:
@@ -58,11 +71,24 @@ class ExitAgent(Agent):
         self.service_credit -= served
 
 
-class PersonAgent(Agent):
+class PersonAgent:
     """
     Persona con atributos realistas: edad, movilidad, pánico, familiaridad, cumplimiento.
-    Estados: MOVING → WAITING → (evacuado y removido)
+    Estados: MOVING → WAITING → (evacuado y removido), como códigos MOVING / WAITING
+    (IDLE antes, si un evento de alarma demora su pre-movimiento).
+
+    Con miles de personas el __dict__ por instancia pesa más que los datos:
+    la clase usa __slots__ y por eso no hereda de mesa.Agent (que no los
+    declara). Reproduce su interfaz: unique_id, model, pos, registro en
+    el modelo (model.track_agent / untrack_agent), remove(), advance() y
+    random. El slot __weakref__ es necesario para el AgentSet del scheduler.
     """
+    __slots__ = (
+        "unique_id", "model", "pos", "evacuated", "t_exit", "tipo", "edad", "v_cells_per_step",
+        "pánico", "familiaridad", "cumplimiento", "movilidad_reducida", "state", "target_exit",
+        "reelecciones", "preferred_exit_id", "_target_gen", "__weakref__",
+    )
+
     def __init__(
         self,
         unique_id,
@@ -76,7 +102,9 @@ class PersonAgent(Agent):
         cumplimiento=1.0,
         movilidad_reducida=False,
     ):
-        super().__init__(unique_id, model)
+        self.unique_id = unique_id
+        self.model = model
+        model.track_agent(self)  # registro como en mesa.Agent
         self.pos = pos
         self.evacuated = False
         self.t_exit = None
@@ -87,10 +115,49 @@ class PersonAgent(Agent):
         self.familiaridad = familiaridad
         self.cumplimiento = cumplimiento
         self.movilidad_reducida = movilidad_reducida
-        self.state = "MOVING"
+        self.state = MOVING
         self.target_exit = None
         self.reelecciones = 0
         self.preferred_exit_id = None  # para modelar familiaridad
+        self._target_gen = -1  # model.exits_generation en que target_exit era válida
+
+    # --- interfaz de mesa.Agent ---
+    def remove(self):
+        self.model.untrack_agent(self)
+
+    def advance(self):
+        pass
+
+    @property
+    def random(self):
+        return self.model.random
+
+    @property
+    def state_name(self):
+        return STATE_NAMES[self.state]
+
+    # --------------------------------------------------
+    def _target_valid(self):
+        """
+        ¿target_exit sigue entre model.exits? O(1): el modelo incrementa
+        exits_generation cada vez que cambia el conjunto de salidas y sólo
+        entonces se vuelve a buscar.
+        """
+        ex = self.target_exit
+        if ex is None:
+            return False
+        gen = self.model.exits_generation
+        if self._target_gen != gen:
+            if not any(e.unique_id == ex.unique_id for e in self.model.exits):
+                return False
+            self._target_gen = gen
+        return True
+
+    def recheck(self):
+        """Re-elige salida estando WAITING (objetivo inválido o pánico)."""
+        self.target_exit = self._choose_best_exit()
+        if self.target_exit:
+            self.state = MOVING  # volver a moverse hacia nueva salida
 
     # --------------------------------------------------
     def _choose_best_exit(self):
@@ -99,16 +166,15 @@ class PersonAgent(Agent):
             return None
 
         opciones = []
+        grid = self.model.grid
         for ex in self.model.exits:
             d = self.model.dist_field[self.pos[1], self.pos[0]]  # distancia global
 
-            # Estimar congestión: agentes WAITING cerca de esta salida
-            x_ex, y_ex = ex.pos
+            # Estimar congestión: agentes WAITING cerca de esta salida (ventana cacheada)
             cola = 0
-            for nx, ny in neighbors_moore(x_ex, y_ex, self.model.width, self.model.height):
-                for a in self.model.grid.get_cell_list_contents([(nx, ny)]):
-                    if isinstance(a, PersonAgent) and a.state == "WAITING" and a.target_exit is ex:
-                        cola += 1
+            for a in grid.get_cell_list_contents(ex.window):
+                if isinstance(a, PersonAgent) and a.state == WAITING and a.target_exit is ex:
+                    cola += 1
 
             # Utilidad negativa (minimizar)
             utilidad = d + 0.5 * cola  # mayor distancia o cola → peor
@@ -125,10 +191,19 @@ class PersonAgent(Agent):
 
         # Escoger con probabilidad softmax
         utils, exits = zip(*opciones)
-        utils = np.array(utils)
-        # Evitar overflow
-        utils = utils - np.max(utils)
-        probs = np.exp(-utils)  # menos utilidad → más probabilidad
+        utils = np.array(utils, dtype=float)
+        finite = np.isfinite(utils)
+        if finite.all():
+            # Evitar overflow
+            utils = utils - np.max(utils)
+            probs = np.exp(-utils)  # menos utilidad → más probabilidad
+        elif finite.any():
+            # salidas inalcanzables (distancia inf) quedan con probabilidad 0
+            probs = np.zeros(len(utils))
+            probs[finite] = np.exp(-(utils[finite] - np.max(utils[finite])))
+        else:
+            # sin camino a ninguna salida (p. ej. encerrado por obstáculos): al azar
+            probs = np.ones(len(utils))
         probs = probs / probs.sum()
         idx = np.random.choice(len(exits), p=probs)
         elegida = exits[idx]
@@ -149,44 +224,38 @@ class PersonAgent(Agent):
 
     # --------------------------------------------------
     def _best_neighbor_step(self):
+        """
+        Celda de menor distancia entre la propia y sus vecinos libres (al azar
+        entre empates). Los candidatos por celda están precalculados en
+        model.step_ptr / step_idx (CSR); randrange(n) consume el generador
+        igual que random.choice sobre la lista de n candidatos.
+        """
+        m = self.model
+        if m._step_src is not m.dist_field:  # dist_field reemplazado desde fuera
+            m._build_step_table()
         x, y = self.pos
-        best_val = self.model.dist_field[y, x]
-        best_cells = [(x, y)]
-
-        for nx, ny in neighbors_moore(x, y, self.model.width, self.model.height):
-            if (nx, ny) in self.model.obstacles:
-                continue
-            val = self.model.dist_field[ny, nx]
-            if val < best_val - 1e-6:
-                best_val = val
-                best_cells = [(nx, ny)]
-            elif abs(val - best_val) < 1e-6:
-                best_cells.append((nx, ny))
-
-        return random.choice(best_cells)
+        w = m.width
+        c = y * w + x
+        start = m.step_ptr[c]
+        cell = m.step_idx[start + random.randrange(m.step_ptr[c + 1] - start)]
+        return (cell % w, cell // w)
 
     # --------------------------------------------------
     def step(self):
-        if self.evacuated:
+        if self.evacuated or self.state == IDLE:
             return
 
-        if self.state == "WAITING":
+        if self.state == WAITING:
             # Mientras espera, puede reconsiderar si el pánico es alto o el objetivo desaparece
-            valid_exit = False
-            if self.target_exit is not None:
-                valid_exit = any(ex.unique_id == self.target_exit.unique_id for ex in self.model.exits)
-            
-            if not valid_exit or (self.pánico > 0.7 and self.random.random() < 0.05):
-                self.target_exit = self._choose_best_exit()
-                if self.target_exit:
-                    self.state = "MOVING"  # volver a moverse hacia nueva salida
+            valid_exit = self._target_valid()
+
+            if not valid_exit or (self.pánico > PANIC_RECHECK_MIN and self.random.random() < PANIC_RECHECK_P):
+                self.recheck()
             return
 
         # Reevaluar salida cada 10 steps (simula indecisión realista)
-        valid_exit = False
-        if self.target_exit is not None:
-            valid_exit = any(ex.unique_id == self.target_exit.unique_id for ex in self.model.exits)
-        
+        valid_exit = self._target_valid()
+
         if self.model.schedule.steps % 10 == 0 or not valid_exit:
             old_exit = self.target_exit
             self.target_exit = self._choose_best_exit()
@@ -199,13 +268,15 @@ class PersonAgent(Agent):
 
         # Avanzar v_cells_per_step micro-pasos
         steps_left = self.v_cells_per_step
-        while steps_left > 0 and not self.evacuated and self.state == "MOVING":
+        while steps_left > 0 and not self.evacuated and self.state == MOVING:
             new_pos = self._best_neighbor_step()
             self.model.grid.move_agent(self, new_pos)
+            if self.model.pos_cols is not None:
+                self.model.pos_cols.move(self.unique_id, new_pos)
 
             # Si llega adyacente o encima de su salida objetivo → anclarse
             if self.target_exit is not None and self._is_adjacent_to_exit(self.target_exit):
-                self.state = "WAITING"
+                self.state = WAITING
                 break
 
             steps_left -= 1
\ No newline at end of file
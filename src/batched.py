@@ -0,0 +1,321 @@
+"""
+Motor vectorizado por réplicas: K semillas del mismo layout en un solo estado.
+
+Las personas se guardan "aplanadas" en orden réplica-mayor (equivale a las
+matrices K x N de posiciones/estado, con rep[i] = réplica de la fila i);
+los créditos de servicio y contadores de salida son matrices K x E. Cada tick
+avanza todas las réplicas con las mismas operaciones NumPy; las personas
+evacuadas (y por ende las réplicas terminadas) se compactan fuera del estado,
+así que dejan de costar cómputo. El campo de distancias y la tabla de pasos
+greedy dependen sólo del layout y se calculan una vez para todo el lote.
+
+La dinámica reproduce la de EvacuationModel/PersonAgent/ExitAgent en
+distribución (no bit a bit: el orden aleatorio de activación de Mesa se
+emula con sorteos, y la cola que ve cada persona es la del inicio del tick).
+"""
+import numpy as np
+
+from .metrics import summarize_run, summarize_stream
+from .population import DEFAULT_POPULATION, sample_attributes
+from .sketches import StreamingMetrics
+from .space import (best_step_table, bottom_exit_positions, distance_field, normalize_exit_widths,
+                    sample_free_cells)
+
+MOVING, WAITING, EVACUATED = 0, 1, 2
+
+
+class BatchedEvacuation:
+    """
+    K réplicas independientes (una por semilla) del layout de EvacuationModel.
+    La población inicial de cada réplica depende sólo de su semilla (y de su
+    PopulationParams); la dinámica usa un generador común sembrado con todas
+    las semillas. population: PopulationParams o lista con una por réplica.
+    streaming: si True, cada réplica resume sus salidas en un StreamingMetrics
+    (sketches.py) y no se guardan eventos ni atributos por persona.
+    metric: métrica del campo de distancias (ver EvacuationModel).
+    """
+    def __init__(self, seeds, width=25, height=25, N=300, num_exits=3, exit_widths=None, time_step=0.1,
+                 population=None, streaming=False, sketch_rel_error=0.01, metric="manhattan"):
+        self.seeds = [int(s) for s in seeds]
+        self.K = K = len(self.seeds)
+        self.width = width
+        self.height = height
+        self.N = N
+        self.num_exits = E = num_exits
+        self.time_step = time_step
+        self.steps = 0
+        self.streaming = streaming
+
+        # === Layout compartido ===
+        self.exit_positions = bottom_exit_positions(width, num_exits)
+        self.capacity_ps = 1.3 * np.asarray(normalize_exit_widths(exit_widths, num_exits), dtype=float)
+        self.obstacles = set()
+        self.dist_field = distance_field(width, height, self.exit_positions, self.obstacles, metric)
+        self._cands, self._ncands = best_step_table(self.dist_field, self.obstacles)
+        self._ex_x = np.array([p[0] for p in self.exit_positions], dtype=np.int64)
+        self._ex_y = np.array([p[1] for p in self.exit_positions], dtype=np.int64)
+
+        # === Población por réplica (ids como en Mesa: salidas 1..E, personas E+1..E+N) ===
+        if population is None or not isinstance(population, (list, tuple)):
+            population = [population or DEFAULT_POPULATION] * K
+        self.population = list(population)
+        self.person_data = []
+        self.streams = []
+        cols = {k: [] for k in ("cell", "tipo", "familiaridad", "pánico", "v_cells")}
+        for seed, params in zip(self.seeds, self.population):
+            rng = np.random.default_rng(seed)
+            attrs = sample_attributes(rng, N, params)
+            cols["cell"].append(sample_free_cells(rng, width, height, N, self.exit_positions))
+            for k in ("tipo", "familiaridad", "pánico", "v_cells"):
+                cols[k].append(attrs[k])
+            if streaming:
+                counts = np.bincount(attrs["tipo"], minlength=len(params.names))
+                self.streams.append(StreamingMetrics(dict(zip(params.names, counts.tolist())),
+                                                     rel_error=sketch_rel_error))
+                continue
+            self.person_data.append({
+                "id": np.arange(E + 1, E + 1 + N),
+                "tipo": np.asarray(params.names, dtype=object)[attrs["tipo"]],
+                "edad": attrs["edad"],
+                "v_base": attrs["v_base"],
+                "pánico": attrs["pánico"],
+                "familiaridad": attrs["familiaridad"],
+                "cumplimiento": attrs["cumplimiento"],
+                "movilidad_reducida": attrs["movilidad_reducida"],
+            })
+
+        cell = np.concatenate(cols["cell"]) if K else np.zeros(0, dtype=np.int64)
+        self.rep = np.repeat(np.arange(K), N)
+        self.pid = np.tile(np.arange(N), K)
+        self.y, self.x = np.divmod(cell, width)
+        self.state = np.full(K * N, MOVING, dtype=np.int8)
+        self.target = np.full(K * N, -1, dtype=np.int64)
+        self.preferred = np.full(K * N, -1, dtype=np.int64)
+        self.reelecciones = np.zeros(K * N, dtype=np.int64)
+        self.tipo = np.concatenate(cols["tipo"]) if K else np.zeros(0, dtype=np.int64)
+        self.familiar = np.concatenate(cols["familiaridad"]) if K else np.zeros(0, dtype=bool)
+        self.panic = np.concatenate(cols["pánico"]) if K else np.zeros(0)
+        self.v = np.concatenate(cols["v_cells"]) if K else np.zeros(0, dtype=np.int64)
+
+        self.credit = np.zeros((K, E))
+        self.exit_count = np.zeros((K, E), dtype=np.int64)
+        self.live = np.ones(K, dtype=bool)
+        self.done_steps = np.full(K, -1, dtype=np.int64)
+        self._events = []  # (rep, pid, t) por tick con salidas
+        self._served = []  # streaming: evacuados por réplica en cada tick
+        self.rng = np.random.default_rng(np.random.SeedSequence(self.seeds))
+
+    # ------------------------------------------------
+    def _in_window(self, idx):
+        """Persona idx junto a su salida objetivo (3x3 sin el centro, como ExitAgent)."""
+        tx = self._ex_x[self.target[idx]]
+        ty = self._ex_y[self.target[idx]]
+        dx = np.abs(self.x[idx] - tx)
+        dy = np.abs(self.y[idx] - ty)
+        return (dx <= 1) & (dy <= 1) & ((dx + dy) > 0)
+
+    def _queue_counts(self, waiting):
+        """Cola (K, E): WAITING en la ventana de su salida objetivo."""
+        idx = np.flatnonzero(waiting & (self.target >= 0))
+        idx = idx[self._in_window(idx)]
+        g = self.rep[idx] * self.num_exits + self.target[idx]
+        return np.bincount(g, minlength=self.K * self.num_exits).reshape(self.K, self.num_exits)
+
+    def _choose(self, idx, cola):
+        """
+        Elección softmax de salida (PersonAgent._choose_best_exit) para las filas idx.
+        La distancia es la misma para todas las salidas, así que se cancela en el softmax.
+        """
+        n, E = idx.size, self.num_exits
+        util = 0.5 * cola[self.rep[idx]].astype(float)
+        pref = self.preferred[idx]
+        fam = self.familiar[idx]
+        rows = np.flatnonzero(fam & (pref >= 0))
+        util[rows, pref[rows]] -= 0.3
+        noisy = self.panic[idx] > 0.6
+        util[noisy] += self.rng.uniform(-0.4, 0.4, size=(int(noisy.sum()), E))
+
+        w = np.exp(-(util - util.min(axis=1, keepdims=True)))
+        cum = np.cumsum(w, axis=1)
+        u = self.rng.random(n) * cum[:, -1]
+        choice = np.minimum((cum < u[:, None]).sum(axis=1), E - 1)
+
+        first = fam & (pref < 0)
+        self.preferred[idx[first]] = choice[first]
+        return choice
+
+    def _move(self, moving):
+        """Micro-pasos greedy; quien queda junto a su salida pasa a WAITING."""
+        for j in range(int(self.v.max(initial=0))):
+            idx = np.flatnonzero(moving & (self.state == MOVING) & (self.v > j))
+            if idx.size == 0:
+                break
+            cell = self.y[idx] * self.width + self.x[idx]
+            pick = (self.rng.random(idx.size) * self._ncands[cell]).astype(np.int64)
+            self.y[idx], self.x[idx] = np.divmod(self._cands[cell, pick], self.width)
+
+            has_target = self.target[idx] >= 0
+            tx = self._ex_x[np.maximum(self.target[idx], 0)]
+            ty = self._ex_y[np.maximum(self.target[idx], 0)]
+            adj = has_target & (np.maximum(np.abs(self.x[idx] - tx), np.abs(self.y[idx] - ty)) <= 1)
+            self.state[idx[adj]] = WAITING
+
+    def _serve(self, waiting_before, waiting_new):
+        """
+        ExitAgent.step vectorizado: credit += cap * dt y se sirven floor(credit)
+        candidatos al azar por (réplica, salida). Emula el orden aleatorio de
+        Mesa: quien llegó a WAITING en este tick es candidato sólo si su paso
+        'ocurrió' antes que el de la salida (sorteo q < p).
+        """
+        K, E = self.K, self.num_exits
+        self.credit[self.live] += self.capacity_ps * self.time_step
+
+        p = self.rng.random((K, E))
+        q = self.rng.random(self.state.size)
+        cand = waiting_before | (waiting_new & (q < p[self.rep, np.maximum(self.target, 0)]))
+        idx = np.flatnonzero(cand & (self.target >= 0))
+        idx = idx[self._in_window(idx)]
+        if idx.size == 0:
+            return np.zeros(K, dtype=np.int64)
+
+        g = self.rep[idx] * E + self.target[idx]
+        order = np.lexsort((self.rng.random(idx.size), g))
+        idx, g = idx[order], g[order]
+        rank = np.arange(idx.size) - np.searchsorted(g, g, side="left")
+        served = rank < np.floor(self.credit.ravel()[g])
+        idx, g = idx[served], g[served]
+        if idx.size == 0:
+            return np.zeros(K, dtype=np.int64)
+
+        counts = np.bincount(g, minlength=K * E).reshape(K, E)
+        self.credit -= counts
+        self.exit_count += counts
+        self.state[idx] = EVACUATED
+        t = self.steps * self.time_step
+        if self.streaming:
+            # todas las salidas del tick comparten t: basta contar por (réplica, tipo/salida)
+            T = int(self.tipo.max()) + 1
+            by_tipo = np.bincount(self.rep[idx] * T + self.tipo[idx], minlength=K * T).reshape(K, T)
+            for k in np.flatnonzero(counts.sum(axis=1)).tolist():
+                names = self.population[k].names
+                self.streams[k].record_counts(
+                    t,
+                    by_tipo={names[j]: c for j, c in enumerate(by_tipo[k].tolist()) if c},
+                    by_exit={e: c for e, c in enumerate(counts[k].tolist()) if c},
+                )
+        else:
+            self._events.append((self.rep[idx], self.pid[idx], t))
+        return counts.sum(axis=1)
+
+    def _compact(self):
+        keep = self.state != EVACUATED
+        if keep.all():
+            return
+        for name in ("rep", "pid", "x", "y", "state", "target", "preferred",
+                     "reelecciones", "tipo", "familiar", "panic", "v"):
+            setattr(self, name, getattr(self, name)[keep])
+
+    # ------------------------------------------------
+    def step(self):
+        waiting0 = self.state == WAITING
+        cola = self._queue_counts(waiting0)
+
+        # WAITING: re-elección por pánico (5 % por tick si pánico > 0.7)
+        idx = np.flatnonzero(waiting0 & (self.panic > 0.7))
+        idx = idx[self.rng.random(idx.size) < 0.05]
+        if idx.size:
+            self.target[idx] = self._choose(idx, cola)
+            self.state[idx] = MOVING
+
+        # MOVING: reevaluar salida cada 10 steps (o si aún no tiene)
+        moving = ~waiting0
+        idx = np.flatnonzero(moving if self.steps % 10 == 0 else moving & (self.target < 0))
+        if idx.size:
+            old = self.target[idx]
+            new = self._choose(idx, cola)
+            self.reelecciones[idx] += old != new
+            self.target[idx] = new
+        self._move(moving)
+
+        waiting_now = self.state == WAITING
+        served = self._serve(waiting0 & waiting_now, moving & waiting_now)
+        if self.streaming:
+            self._served.append(served)
+
+        self.steps += 1
+        self._compact()
+        finished = self.live & (np.bincount(self.rep, minlength=self.K) == 0)
+        self.done_steps[finished] = self.steps
+        self.live &= ~finished
+
+    def run(self, max_steps=5000, progress=None, progress_every=50):
+        """
+        Avanza hasta que terminen todas las réplicas o max_steps.
+        progress recibe {"steps", "max_steps", "live", "evacuados", "total", "pct"}.
+        """
+        while self.live.any() and self.steps < max_steps:
+            self.step()
+            if progress is not None and (self.steps % progress_every == 0 or not self.live.any()):
+                total = self.K * self.N
+                evac = total - self.state.size
+                progress({"steps": self.steps, "max_steps": max_steps, "live": int(self.live.sum()),
+                          "evacuados": evac, "total": total, "pct": evac / max(total, 1) * 100.0})
+        return self.results()
+
+    def results(self):
+        """
+        Una tupla (df, ts, perc, metrics) por réplica, como run_model; con
+        streaming, df es el StreamingMetrics de la réplica (ver summarize_stream).
+        """
+        if self.streaming:
+            served = np.cumsum(np.array(self._served).reshape(-1, self.K), axis=0)
+            out = []
+            for k, seed in enumerate(self.seeds):
+                steps = int(self.done_steps[k]) if self.done_steps[k] >= 0 else self.steps
+                res = summarize_stream(self.streams[k], served[:steps, k], steps, self.time_step,
+                                       initial_population=self.N, exit_counts=self.exit_count[k],
+                                       reelecciones=self.reelecciones[self.rep == k])
+                res[3]["seed"] = seed
+                out.append(res)
+            return out
+
+        if self._events:
+            ev_rep = np.concatenate([e[0] for e in self._events])
+            ev_pid = np.concatenate([e[1] for e in self._events])
+            ev_t = np.concatenate([np.full(e[0].size, e[2]) for e in self._events])
+        else:
+            ev_rep = ev_pid = np.zeros(0, dtype=np.int64)
+            ev_t = np.zeros(0)
+
+        out = []
+        for k, seed in enumerate(self.seeds):
+            mask = ev_rep == k
+            events = {"id": ev_pid[mask] + self.num_exits + 1, "t_exit": ev_t[mask]}
+            steps = int(self.done_steps[k]) if self.done_steps[k] >= 0 else self.steps
+            df, ts, perc, metrics = summarize_run(
+                events if mask.any() else [],
+                self.person_data[k],
+                steps,
+                self.time_step,
+                initial_population=self.N,
+                exit_counts=self.exit_count[k],
+                reelecciones=self.reelecciones[self.rep == k],
+            )
+            metrics["seed"] = seed
+            out.append((df, ts, perc, metrics))
+        return out
+
+
+def run_batched(seeds, N=300, width=25, height=25, num_exits=3, exit_widths=None, max_steps=5000,
+                time_step=0.1, population=None, progress=None, progress_every=50, streaming=False,
+                metric="manhattan"):
+    """
+    Corre len(seeds) réplicas del baseline en un solo estado vectorizado.
+    Devuelve una lista de tuplas (df, ts, perc, metrics) compatibles con run_model
+    (con streaming=True, df es un StreamingMetrics; se combinan con
+    StreamingMetrics.merged([r[0] for r in resultados])).
+    """
+    sim = BatchedEvacuation(seeds, width=width, height=height, N=N, num_exits=num_exits,
+                            exit_widths=exit_widths, time_step=time_step, population=population,
+                            streaming=streaming, metric=metric)
+    return sim.run(max_steps=max_steps, progress=progress, progress_every=progress_every)
@@ -0,0 +1,299 @@
+"""
+Punto de entrada único, sin interfaz gráfica, para corridas por lotes:
+
+    python -m src.cli run --scenario bloqueo --agents 500 --out res.json
+    python -m src.cli run --engine batched --agents 20000 --out res.npz
+    python -m src.cli sweep --param N=100,300 --param num_exits=1,2,3 --seeds 1 2 3 --workers 4
+    python -m src.cli replicas --scenario baseline --precision 0.03 --out rep.json
+
+Por defecto escribe JSON por stdout (o a --out: .json, .npz binario o .csv
+en sweep) y no dibuja nada; --plot PNG genera la figura. numpy, pandas,
+matplotlib, mesa y los motores se importan recién dentro de cada
+subcomando, así que `--help` o un error de argumentos no pagan su costo
+(ver experiments/bench_import.py). El progreso va por stderr.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+ENGINES = ("mesa", "active", "batched", "partitioned")
+
+
+def _jsonable(obj):
+    """Convierte numpy / pandas / NaN a tipos JSON estándar (NaN → null)."""
+    if isinstance(obj, dict):
+        return {str(k): _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    if hasattr(obj, "tolist"):  # arrays y escalares numpy
+        return _jsonable(obj.tolist())
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+
+def _write_json(payload, out):
+    text = json.dumps(_jsonable(payload), ensure_ascii=False)
+    if out in (None, "-"):
+        sys.stdout.write(text + "\n")
+    else:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def _progress(quiet):
+    if quiet:
+        return None
+
+    def show(info):
+        variant = f" [{info['variant']}]" if info.get("variant") is not None else ""
+        sys.stderr.write(f"\r  {info['pct']:5.1f}% evacuado{variant}, step {info['steps']}/{info['max_steps']}")
+        sys.stderr.flush()
+    return show
+
+
+def _common(p):
+    p.add_argument("--scenario", choices=["baseline", "bloqueo", "anchos"], default="baseline")
+    p.add_argument("--agents", type=int, default=300)
+    p.add_argument("--width", type=int, default=25)
+    p.add_argument("--height", type=int, default=25)
+    p.add_argument("--num_exits", type=int, default=3)
+    p.add_argument("--max_steps", type=int, default=5000)
+    p.add_argument("--t_bloqueo", type=float, default=60.0, help="sólo bloqueo")
+    p.add_argument("--exit_index", type=int, default=0, help="sólo bloqueo")
+    p.add_argument("--anchos", nargs="+", type=int, default=[1, 2, 3], help="sólo anchos")
+    p.add_argument("--metric", choices=["manhattan", "chebyshev", "octile"], default="manhattan",
+                   help="métrica del campo de distancias")
+    p.add_argument("--out", type=str, default=None, help="archivo de salida (por defecto: JSON por stdout)")
+    p.add_argument("--quiet", action="store_true", help="sin progreso por stderr")
+    p.add_argument("--perf", action="store_true", help="agregar metrics['perf']: tiempo, throughput y memoria")
+    p.add_argument("--perf_trace", action="store_true",
+                   help="como --perf, con tracemalloc (bytes por persona y mayores asignadores; más lento)")
+
+
+def _perf_option(args):
+    return "trace" if args.perf_trace else args.perf
+
+
+def _scenario_params(args):
+    params = dict(N=args.agents, width=args.width, height=args.height, max_steps=args.max_steps)
+    if _perf_option(args):
+        params["perf"] = _perf_option(args)
+    if args.scenario == "anchos":
+        params["lista_anchos"] = list(args.anchos)
+    else:
+        params["num_exits"] = args.num_exits
+    if args.scenario == "bloqueo":
+        params.update(t_bloqueo=args.t_bloqueo, exit_index=args.exit_index)
+    return params
+
+
+# ------------------------------------------------
+def _run(args):
+    params = dict(_scenario_params(args), seed=args.seed)
+    progress = _progress(args.quiet)
+    if args.engine in ("batched", "partitioned"):
+        if args.scenario != "baseline":
+            raise SystemExit(f"El motor {args.engine} sólo corre el escenario baseline")
+        from .perf import ResourceMeter
+        kw = dict(params, metric=args.metric, progress=progress)
+        seed = kw.pop("seed")
+        meter = ResourceMeter.from_option(kw.pop("perf", False))
+        if args.engine == "batched":
+            from .batched import run_batched
+            runs = [(None, *run_batched([seed], **kw)[0])]
+        else:
+            from .partitioned import run_partitioned
+            runs = [(None, *run_partitioned(seed=seed, workers=args.workers, **kw))]
+        if meter is not None:
+            _, _, ts, perc, met = runs[0]
+            met["perf"] = meter.report(met["steps"], met["time_step"], ts, perc, met["total_agentes"])
+    else:
+        from .jobs import run_job
+        model_kwargs = {"metric": args.metric}
+        if args.engine == "active":
+            model_kwargs["scheduler"] = "active"
+        result = run_job(args.scenario, dict(params, model_kwargs=model_kwargs), inline=not args.subprocess,
+                         progress=progress)
+        runs = [r[:5] for r in result] if args.scenario == "anchos" else [(None, *result[:4])]
+    if progress is not None:
+        sys.stderr.write("\n")
+
+    meta = {"scenario": args.scenario, "engine": args.engine, "metric": args.metric, "params": params}
+    out_fmt = "npz" if args.out and args.out.endswith(".npz") else "json"
+    if out_fmt == "npz":
+        import numpy as np
+        arrays = {}
+        for i, (variant, df, ts, perc, met) in enumerate(runs):
+            arrays[f"r{i}_ts"], arrays[f"r{i}_perc"] = np.asarray(ts), np.asarray(perc)
+            if args.times and hasattr(df, "columns"):
+                arrays[f"r{i}_id"] = df["id"].to_numpy()
+                arrays[f"r{i}_t_exit"] = df["t_exit"].to_numpy(dtype=float)
+        meta["runs"] = [{"variant": v, "metrics": met} for v, _, _, _, met in runs]
+        np.savez_compressed(args.out, meta=np.array(json.dumps(_jsonable(meta), ensure_ascii=False)), **arrays)
+    else:
+        meta["runs"] = []
+        for variant, df, ts, perc, met in runs:
+            row = {"variant": variant, "metrics": met, "curve": {"ts": ts, "perc": perc}}
+            if args.times and hasattr(df, "columns"):
+                row["times"] = {"id": df["id"].to_numpy(), "t_exit": df["t_exit"].to_numpy(dtype=float)}
+            meta["runs"].append(row)
+        _write_json(meta, args.out)
+
+    if args.plot:
+        from .metrics import plot_curva, plot_curvas_comparadas
+        title = f"{args.scenario} ({args.engine})"
+        if len(runs) > 1:
+            plot_curvas_comparadas([(f"ancho{v}", ts, perc) for v, _, ts, perc, _ in runs], title, args.plot)
+        else:
+            plot_curva(runs[0][2], runs[0][3], title, args.plot)
+
+
+def _parse_grid(specs):
+    """["N=100,300", "num_exits=1,2"] → {"N": [100, 300], "num_exits": [1, 2]}."""
+    grid = {}
+    for spec in specs:
+        key, sep, values = spec.partition("=")
+        if not sep or not values:
+            raise SystemExit(f"--param debe ser CLAVE=v1,v2,... (recibido: {spec})")
+        grid[key] = [_parse_value(v) for v in values.split(",")]
+    return grid
+
+
+def _parse_value(text):
+    try:
+        return json.loads(text)  # números, true/false
+    except ValueError:
+        return text
+
+
+def _sweep(args):
+    import itertools
+
+    from .jobs import InlineJobService, ThreadedJobService
+    from .perf import flat_perf
+
+    grid = _parse_grid(args.param)
+    base = _scenario_params(args)
+    model_kwargs = {"metric": args.metric}
+    combos = [dict(zip(grid, values)) for values in itertools.product(*grid.values())] or [{}]
+    points = [(combo, seed) for combo in combos for seed in args.seeds]
+
+    svc = InlineJobService() if args.inline else ThreadedJobService(max_workers=args.workers)
+    try:
+        jobs = [svc.submit(args.scenario, dict(base, **combo, seed=seed, model_kwargs=model_kwargs))[0]
+                for combo, seed in points]
+        rows, perf_rows = [], []
+        for i, ((combo, seed), job) in enumerate(zip(points, jobs), 1):
+            job.wait()
+            if job.status != "done":
+                raise SystemExit(f"Falló {combo} seed={seed}:\n{job.error}")
+            results = job.result if args.scenario == "anchos" else [(None, *job.result[:4])]
+            for variant, _, _, _, met, *_ in results:
+                met = dict(met)
+                perf = met.pop("perf", None)
+                rows.append({**combo, "seed": seed, "variant": variant, **met, **flat_perf(perf)})
+                if perf is not None:
+                    perf_rows.append({**combo, "variant": variant, "perf": perf})
+            if not args.quiet:
+                sys.stderr.write(f"\r  {i}/{len(points)} corridas")
+                sys.stderr.flush()
+    finally:
+        svc.close()
+    if not args.quiet:
+        sys.stderr.write("\n")
+
+    rows = _jsonable(rows)
+    if args.out and args.out.endswith(".csv"):
+        import csv
+        cols = list(dict.fromkeys(k for r in rows for k in r))
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=cols)
+            w.writeheader()
+            w.writerows(rows)
+    else:
+        payload = {"scenario": args.scenario, "params": base, "grid": grid, "seeds": args.seeds, "runs": rows}
+        if perf_rows:
+            from .perf import summarize_perf
+            payload["perf"] = summarize_perf(perf_rows, by=list(grid) + ["variant"]).to_dict("records")
+        _write_json(payload, args.out)
+
+
+def _replicas(args):
+    from .replicas import run_replicas
+
+    if args.scenario == "anchos":
+        raise SystemExit("replicas corre baseline o bloqueo")
+    params = dict(_scenario_params(args), model_kwargs={"metric": args.metric})
+    perf = params.pop("perf", False)
+
+    def progress(info):
+        if not args.quiet:
+            worst = info["summary"]["rel_precision"].max()
+            sys.stderr.write(f"  ola {info['waves']}: {info['runs']} corridas, peor precisión relativa {worst:.3f}\n")
+
+    rep = run_replicas(
+        args.scenario, params, metrics=args.metrics, rel_precision=args.precision,
+        confidence=args.confidence, min_runs=args.min_runs, max_runs=args.max_runs,
+        max_seconds=args.max_seconds, workers=args.workers, base_seed=args.base_seed, progress=progress,
+        perf=perf,
+    )
+    payload = {
+        "scenario": args.scenario, "params": params, "runs": rep["runs"], "waves": rep["waves"],
+        "stopped": rep["stopped"], "elapsed": rep["elapsed"],
+        "summary": rep["summary"].to_dict("records"), "per_run": rep["per_run"].to_dict("records"),
+    }
+    if "perf" in rep:
+        payload["perf"] = rep["perf"].to_dict("records")
+    _write_json(payload, args.out)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="python -m src.cli", description="Corridas por lotes sin interfaz gráfica")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="una corrida (JSON por stdout o --out .json/.npz)")
+    _common(r)
+    r.add_argument("--seed", type=int, default=42)
+    r.add_argument("--engine", choices=ENGINES, default="mesa")
+    r.add_argument("--workers", type=int, default=None, help="sólo partitioned: procesos")
+    r.add_argument("--times", action="store_true", help="incluir tiempos de salida por persona")
+    r.add_argument("--plot", type=str, default=None, help="PNG con la curva (importa matplotlib)")
+    r.add_argument("--subprocess", action="store_true", help="correr en un proceso trabajador aparte")
+    r.set_defaults(fn=_run)
+
+    s = sub.add_parser("sweep", help="grilla de parámetros x semillas en el servicio de trabajos")
+    _common(s)
+    s.add_argument("--param", action="append", default=[], help="CLAVE=v1,v2,... (repetible)")
+    s.add_argument("--seeds", nargs="+", type=int, default=[42])
+    s.add_argument("--workers", type=int, default=None, help="procesos (por defecto: núcleos - 1)")
+    s.add_argument("--inline", action="store_true", help="correr en este proceso, sin el servicio de trabajos")
+    s.set_defaults(fn=_sweep)
+
+    q = sub.add_parser("replicas", help="réplicas con parada adaptativa (replicas.run_replicas)")
+    _common(q)
+    q.add_argument("--metrics", nargs="+", default=["makespan", "p90"])
+    q.add_argument("--precision", type=float, default=0.05, help="semiancho del IC / |media| buscado")
+    q.add_argument("--confidence", type=float, default=0.95)
+    q.add_argument("--min_runs", type=int, default=5)
+    q.add_argument("--max_runs", type=int, default=200)
+    q.add_argument("--max_seconds", type=float, default=None)
+    q.add_argument("--workers", type=int, default=None)
+    q.add_argument("--base_seed", type=int, default=0)
+    q.set_defaults(fn=_replicas)
+    return p
+
+
+def main(argv=None):
+    import warnings
+    warnings.filterwarnings("ignore", category=FutureWarning)  # AgentSet experimental de mesa
+    args = build_parser().parse_args(argv)
+    if args.out and os.path.dirname(args.out):
+        os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Curvas de evacuación como función escalón.
+
+El % evacuado sólo cambia en los ticks en que sale alguien, así que la curva
+se guarda como puntos de cambio (ts, perc): perc[i] vale desde ts[i] hasta
+ts[i + 1] (continua por derecha). ts[0] = 0 y el último punto repite el valor
+final en t_end = steps * Δt, para conservar la duración de la corrida. Con N
+personas son a lo sumo N + 2 puntos, sin importar max_steps; la grilla densa
+por tick (la de antes) se obtiene con StepCurve(ts, perc).materialize(Δt).
+
+Para graficar o exportar: downsample(max_points) acota la cantidad de puntos
+conservando la forma (primer/último/mín/máx por ventana adaptativa), y
+plot() dibuja con drawstyle="steps-post".
+"""
+import numpy as np
+
+PLOT_MAX_POINTS = 2000     # puntos por curva al graficar
+EXPORT_MAX_POINTS = 20000  # puntos por curva en descargas / CSV
+
+
+class StepCurve:
+    """Función escalón continua por derecha dada por sus puntos de cambio."""
+
+    __slots__ = ("ts", "perc")
+
+    def __init__(self, ts, perc):
+        self.ts = np.asarray(ts, dtype=float)
+        self.perc = np.asarray(perc, dtype=float)
+        if self.ts.shape != self.perc.shape or self.ts.ndim != 1:
+            raise ValueError("ts y perc deben ser arrays 1D del mismo largo")
+
+    # ------------------------------------------------
+    @classmethod
+    def from_events(cls, t_exit, population, t_end):
+        """
+        Curva de % evacuado a partir de los tiempos de salida (no hace falta
+        que vengan ordenados): en t vale 100 * #{t_exit <= t} / population.
+        """
+        t = np.sort(np.asarray(t_exit, dtype=float))
+        times, first = np.unique(t, return_index=True)
+        counts = np.append(first[1:], len(t))  # evacuados acumulados en cada tiempo distinto
+        return cls._from_changes(times, counts, population, t_end)
+
+    @classmethod
+    def from_counts(cls, counts, time_step, population):
+        """Curva a partir de evacuados acumulados por tick (counts[k] en t = k * Δt)."""
+        counts = np.asarray(counts)
+        change = np.flatnonzero(np.diff(counts)) + 1
+        t_end = (len(counts) - 1) * time_step
+        return cls._from_changes(change * time_step, counts[change], population, t_end,
+                                 start=counts[0] if len(counts) else 0)
+
+    @classmethod
+    def _from_changes(cls, times, counts, population, t_end, start=None):
+        times = np.asarray(times, dtype=float)
+        counts = np.asarray(counts, dtype=float)
+        if start is None:
+            start = counts[0] if len(times) and times[0] <= 0 else 0
+        keep = times > 0
+        ts = np.concatenate([[0.0], times[keep]])
+        ys = np.concatenate([[start], counts[keep]])
+        if ts[-1] < t_end:
+            ts = np.append(ts, t_end)
+            ys = np.append(ys, ys[-1])
+        return cls(ts, ys / population * 100.0)
+
+    # ------------------------------------------------
+    def __len__(self):
+        return len(self.ts)
+
+    def __iter__(self):
+        # permite ts, perc = curva
+        return iter((self.ts, self.perc))
+
+    @property
+    def t_end(self):
+        return float(self.ts[-1]) if len(self.ts) else 0.0
+
+    @property
+    def final(self):
+        return float(self.perc[-1]) if len(self.perc) else 0.0
+
+    @property
+    def nbytes(self):
+        return self.ts.nbytes + self.perc.nbytes
+
+    def at(self, t):
+        """Valor(es) en t (escalar o array); 0 antes del primer punto."""
+        t = np.asarray(t, dtype=float)
+        i = np.searchsorted(self.ts, t, side="right") - 1
+        out = np.where(i >= 0, self.perc[np.clip(i, 0, None)], 0.0)
+        return out if out.ndim else float(out)
+
+    def time_to(self, pct):
+        """Primer tiempo con % evacuado >= pct (NaN si no se alcanza)."""
+        i = np.flatnonzero(self.perc >= pct)
+        return float(self.ts[i[0]]) if len(i) else np.nan
+
+    def materialize(self, time_step=None, n=None):
+        """
+        Grilla densa (ts, perc): cada time_step segundos hasta t_end (con el
+        Δt de la corrida reproduce la curva por tick), o n puntos equiespaciados.
+        """
+        if (time_step is None) == (n is None):
+            raise ValueError("indicar time_step o n")
+        if time_step is not None:
+            steps = int(round(self.t_end / time_step))
+            grid = np.arange(0, steps + 1) * time_step
+        else:
+            grid = np.linspace(0.0, self.t_end, n)
+        return grid, self.at(grid)
+
+    def downsample(self, max_points=PLOT_MAX_POINTS):
+        """
+        Curva con a lo sumo ~max_points puntos de cambio. Los puntos se
+        agrupan en max_points // 4 ventanas de igual "largo" medido como
+        fracción de tiempo + fracción de variación acumulada del %, así las
+        ventanas se achican donde la curva sube rápido; de cada ventana se
+        conservan el primer, el último, el mínimo y el máximo punto (M4).
+        Dentro de una ventana el error es < 2 / ventanas del rango de la curva.
+        """
+        n = len(self.ts)
+        if n <= max_points:
+            return self
+        buckets = max(max_points // 4, 1)
+        var = np.concatenate([[0.0], np.cumsum(np.abs(np.diff(self.perc)))])
+        key = self.ts / (self.t_end or 1.0) + var / (var[-1] or 1.0)
+        b = np.minimum((key * (buckets / 2.0)).astype(np.int64), buckets - 1)
+        starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+        ends = np.r_[starts[1:], n] - 1
+        keep = [starts, ends]
+        for fn in (np.minimum, np.maximum):
+            # índice del mín / máx en cada ventana
+            red = fn.reduceat(self.perc, starts)
+            hit = np.flatnonzero(self.perc == np.repeat(red, ends - starts + 1))
+            first_hit = hit[np.searchsorted(hit, starts)]
+            keep.append(first_hit)
+        idx = np.unique(np.concatenate(keep))
+        return StepCurve(self.ts[idx], self.perc[idx])
+
+    def to_frame(self, max_points=EXPORT_MAX_POINTS):
+        """DataFrame t / perc (puntos de cambio) para CSV, acotado a max_points."""
+        import pandas as pd
+
+        c = self.downsample(max_points) if max_points else self
+        return pd.DataFrame({"t": c.ts, "perc": c.perc})
+
+    def plot(self, ax, max_points=PLOT_MAX_POINTS, **kwargs):
+        c = self.downsample(max_points) if max_points else self
+        return ax.plot(c.ts, c.perc, drawstyle="steps-post", **kwargs)
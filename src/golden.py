@@ -0,0 +1,291 @@
+"""
+Salidas de referencia ("golden") para validar motores más rápidos.
+
+record() corre un corpus fijo de escenarios y semillas (baseline, bloqueo,
+anchos) con un motor y guarda por corrida los exit_events (id, t_exit), la
+curva de % evacuado y las métricas, más los segundos que tardó. replay()
+vuelve a correr el mismo corpus con otro motor (o el mismo tras un cambio)
+y reporta, por escenario/variante:
+
+- exacto: mismos exit_events, curva y métricas en todas las semillas
+  (motores que deben ser idénticos bit a bit, p. ej. "mesa" tras optimizar);
+- KS: estadístico de Kolmogorov-Smirnov de dos muestras sobre los tiempos
+  de salida de todas las semillas juntas (motores equivalentes sólo en
+  distribución: "active", "batched", "partitioned"). Los tiempos de una misma corrida no
+  son independientes (una corrida "mala" desplaza todos), así que el
+  p-valor se obtiene permutando corridas enteras entre referencia y motor,
+  no con la fórmula asintótica para muestras iid;
+- speedup: segundos de la referencia / segundos del motor.
+
+Con "streaming" no hay tiempos individuales: se comparan las métricas,
+con tolerancia quantile_rel_error en los cuantiles.
+"""
+import itertools
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .curves import StepCurve
+
+# Corpus fijo: cada entrada se corre con cada semilla; anchos da una
+# variante por ancho. max_steps acotado para que replay sea rápido.
+GOLDEN_CORPUS = [
+    {"scenario": "baseline", "params": {"max_steps": 1500}},
+    {"scenario": "bloqueo", "params": {"max_steps": 1500, "t_bloqueo": 20.0, "exit_index": 0}},
+    {"scenario": "anchos", "params": {"max_steps": 1500, "lista_anchos": [1, 2, 3]}},
+]
+GOLDEN_SEEDS = (1, 2, 3, 4, 5, 6)  # 6 + 6 corridas: 924 permutaciones para el p-valor
+
+# motor -> model_kwargs de EvacuationModel ("batched" usa batched.run_batched y
+# "partitioned" partitioned.run_partitioned con 2 franjas)
+ENGINES = {
+    "mesa": {},
+    "active": {"scheduler": "active"},
+    "streaming": {"streaming": True},
+    "batched": None,
+    "partitioned": None,
+}
+# motores vectorizados que sólo corren el baseline (anchos = baseline por cantidad de salidas)
+_BASELINE_ONLY = ("batched", "partitioned")
+# motores que deben reproducir la referencia "mesa" bit a bit
+EXACT_ENGINES = ("mesa",)
+
+# métricas de streaming que son aproximadas (cuantiles del sketch)
+_QUANTILE_PREFIXES = ("p50", "p90")
+
+
+def _ks_stat(a, b):
+    grid = np.concatenate([a, b])
+    return float(np.max(np.abs(np.searchsorted(a, grid, side="right") / len(a)
+                               - np.searchsorted(b, grid, side="right") / len(b))))
+
+
+def ks_runs(ref_runs, new_runs, n_perm=999, seed=0):
+    """
+    KS entre dos grupos de corridas (listas de arrays de tiempos): D sobre
+    los tiempos juntados de cada grupo y p-valor por permutación de
+    corridas completas (exhaustiva si hay <= n_perm asignaciones posibles).
+    """
+    runs = [np.asarray(r, dtype=float) for r in list(ref_runs) + list(new_runs)]
+    k = len(ref_runs)
+    if k == 0 or k == len(runs) or not sum(map(len, runs[:k])) or not sum(map(len, runs[k:])):
+        return np.nan, np.nan
+
+    def stat(idx):
+        mask = np.zeros(len(runs), dtype=bool)
+        mask[list(idx)] = True
+        a = np.sort(np.concatenate([r for r, m in zip(runs, mask) if m]))
+        b = np.sort(np.concatenate([r for r, m in zip(runs, mask) if not m]))
+        return _ks_stat(a, b) if len(a) and len(b) else 0.0
+
+    d = stat(range(k))
+    if math.comb(len(runs), k) <= n_perm:
+        perms = list(itertools.combinations(range(len(runs)), k))
+    else:
+        rng = np.random.default_rng(seed)
+        perms = [range(k)] + [rng.permutation(len(runs))[:k] for _ in range(n_perm)]
+    ge = sum(stat(idx) >= d - 1e-12 for idx in perms)
+    return d, ge / len(perms)
+
+
+# ------------------------------------------------
+def run_case(engine, scenario, params, seed):
+    """
+    Corre un escenario del corpus con un motor.
+    Devuelve (segundos, [(variante, df_o_stream, (ts, perc), metrics), ...]).
+    """
+    from .scenarios import anchos, baseline, bloqueo
+
+    if engine not in ENGINES:
+        raise ValueError(f"Motor desconocido: {engine} (opciones: {', '.join(ENGINES)})")
+    params = dict(params)
+    t0 = time.perf_counter()
+    if engine in _BASELINE_ONLY:
+        from .batched import run_batched
+        from .partitioned import run_partitioned
+
+        if scenario == "bloqueo":
+            raise ValueError(f"El motor {engine} no implementa el escenario bloqueo")
+        variants = params.pop("lista_anchos", None) if scenario == "anchos" else None
+        out = []
+        for a in (variants if variants is not None else [None]):
+            kw = dict(params, num_exits=int(a)) if a is not None else params
+            if engine == "batched":
+                df, ts, perc, met = run_batched([seed], **kw)[0]
+            else:
+                df, ts, perc, met = run_partitioned(seed=seed, workers=2, **kw)
+            out.append((a, df, (ts, perc), met))
+    else:
+        kw = {"model_kwargs": ENGINES[engine]} if ENGINES[engine] else {}
+        if scenario == "baseline":
+            df, ts, perc, met = baseline(seed=seed, **params, **kw)
+            out = [(None, df, (ts, perc), met)]
+        elif scenario == "bloqueo":
+            df, ts, perc, met = bloqueo(seed=seed, **params, **kw)
+            out = [(None, df, (ts, perc), met)]
+        elif scenario == "anchos":
+            out = [(a, df, (ts, perc), met) for a, df, ts, perc, met in anchos(seed=seed, **params, **kw)]
+        else:
+            raise ValueError(f"Escenario desconocido: {scenario}")
+    return time.perf_counter() - t0, out
+
+
+def _case_record(scenario, params, seed, variant, df, curve, metrics, seconds):
+    has_times = isinstance(df, pd.DataFrame)
+    ts, perc = curve
+    return {
+        "scenario": scenario,
+        "params": params,
+        "seed": seed,
+        "variant": variant,
+        "ids": df["id"].astype(int).tolist() if has_times else None,
+        "t_exit": df["t_exit"].astype(float).tolist() if has_times else None,
+        "ts": np.asarray(ts, dtype=float).tolist(),
+        "perc": np.asarray(perc, dtype=float).tolist(),
+        "metrics": {k: _json_scalar(v) for k, v in metrics.items()},
+        "seconds": seconds,
+    }
+
+
+def _json_scalar(v):
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+
+def _run_corpus(engine, corpus, seeds, progress=None):
+    cases = []
+    for entry in corpus:
+        for seed in seeds:
+            seconds, variants = run_case(engine, entry["scenario"], entry["params"], seed)
+            # el tiempo de anchos se reparte entre sus variantes
+            for variant, df, curve, met in variants:
+                cases.append(_case_record(entry["scenario"], entry["params"], seed, variant,
+                                          df, curve, met, seconds / len(variants)))
+            if progress is not None:
+                progress({"scenario": entry["scenario"], "seed": seed, "seconds": seconds})
+    return cases
+
+
+def record(path="results/golden.json", engine="mesa", corpus=None, seeds=GOLDEN_SEEDS, progress=None):
+    """Corre el corpus con 'engine' y guarda las salidas de referencia en JSON."""
+    corpus = corpus or GOLDEN_CORPUS
+    golden = {
+        "engine": engine,
+        "corpus": corpus,
+        "seeds": list(seeds),
+        "cases": _run_corpus(engine, corpus, seeds, progress),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(golden, f)
+    return golden
+
+
+def load(path="results/golden.json"):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ------------------------------------------------
+def _metrics_equal(ref, new, rel_tol=0.0):
+    """Claves de métricas que difieren (rel_tol sólo para los cuantiles)."""
+    diff = []
+    for k, v in ref.items():
+        w = new.get(k)
+        tol = rel_tol if rel_tol and k.startswith(_QUANTILE_PREFIXES) else 0.0
+        if v is None or w is None or isinstance(v, str) or isinstance(w, str):
+            same = v == w
+        else:
+            v, w = float(v), float(w)
+            same = (math.isnan(v) and math.isnan(w)) or abs(v - w) <= tol * abs(v)
+        if not same:
+            diff.append(k)
+    return diff
+
+
+def _case_exact(ref, new):
+    """(idéntico, máx. |Δ curva| en puntos %, métricas distintas)."""
+    pr, pn = _dense_curve(ref), _dense_curve(new)
+    curve_diff = float(np.max(np.abs(pr - pn))) if len(pr) == len(pn) else np.inf
+    rel_tol = new["metrics"].get("quantile_rel_error", 0.0) if new["t_exit"] is None else 0.0
+    keys = [k for k in ref["metrics"] if not (rel_tol and k not in new["metrics"])]
+    diff = _metrics_equal({k: ref["metrics"][k] for k in keys}, new["metrics"], rel_tol)
+    events_same = new["t_exit"] is None or (ref["ids"] == new["ids"] and ref["t_exit"] == new["t_exit"])
+    return events_same and curve_diff == 0 and not diff, curve_diff, diff
+
+
+def _dense_curve(case):
+    """% evacuado por tick (referencias viejas guardaban la curva densa, sin "ts")."""
+    if "ts" not in case:
+        return np.asarray(case["perc"])
+    return StepCurve(case["ts"], case["perc"]).materialize(case["metrics"]["time_step"])[1]
+
+
+def replay(golden, engine="mesa", mode="auto", alpha=0.01, progress=None):
+    """
+    Vuelve a correr el corpus de 'golden' (dict de record()/load() o ruta)
+    con 'engine' y compara. mode: "exact", "ks" o "auto" (exacto para los
+    motores de EXACT_ENGINES, KS para el resto).
+    Devuelve un DataFrame con una fila por escenario/variante: n_seeds,
+    exact, max_curve_diff, metric_diffs, ks_stat, ks_pvalue (por
+    permutación de corridas, ver ks_runs), equivalent,
+    makespan_ref / makespan (medias), seconds_ref, seconds y speedup.
+    """
+    if isinstance(golden, (str, os.PathLike)):
+        golden = load(golden)
+    if mode == "auto":
+        mode = "exact" if engine in EXACT_ENGINES else "ks"
+    if mode not in ("exact", "ks"):
+        raise ValueError("mode debe ser 'exact', 'ks' o 'auto'")
+
+    corpus = golden["corpus"]
+    if engine in _BASELINE_ONLY:
+        corpus = [e for e in corpus if e["scenario"] != "bloqueo"]
+    new_cases = _run_corpus(engine, corpus, golden["seeds"], progress)
+    ref_by_key = {(c["scenario"], c["seed"], c["variant"]): c for c in golden["cases"]}
+
+    groups = {}
+    for new in new_cases:
+        ref = ref_by_key[(new["scenario"], new["seed"], new["variant"])]
+        groups.setdefault((new["scenario"], new["variant"]), []).append((ref, new))
+
+    rows = []
+    for (scenario, variant), pairs in groups.items():
+        checks = [_case_exact(ref, new) for ref, new in pairs]
+        exact = all(c[0] for c in checks)
+        metric_diffs = sorted({k for c in checks for k in c[2]})
+        has_times = all(new["t_exit"] is not None for _, new in pairs)
+        if has_times:
+            d, p = ks_runs([ref["t_exit"] for ref, _ in pairs], [new["t_exit"] for _, new in pairs])
+        else:
+            d, p = np.nan, np.nan
+        if mode == "exact" or not has_times:
+            equivalent = exact if has_times else not metric_diffs
+        else:
+            equivalent = bool(p >= alpha)
+        seconds_ref = sum(ref["seconds"] for ref, _ in pairs)
+        seconds = sum(new["seconds"] for _, new in pairs)
+        rows.append({
+            "scenario": scenario,
+            "variant": variant,
+            "n_seeds": len(pairs),
+            "exact": exact,
+            "max_curve_diff": max(c[1] for c in checks),
+            "metric_diffs": ",".join(metric_diffs),
+            "ks_stat": d,
+            "ks_pvalue": p,
+            "equivalent": equivalent,
+            "makespan_ref": float(np.nanmean([ref["metrics"]["makespan"] for ref, _ in pairs])),
+            "makespan": float(np.nanmean([new["metrics"]["makespan"] for _, new in pairs])),
+            "seconds_ref": seconds_ref,
+            "seconds": seconds,
+            "speedup": seconds_ref / seconds if seconds > 0 else np.nan,
+        })
+    out = pd.DataFrame(rows)
+    out.attrs.update({"engine": engine, "reference_engine": golden["engine"], "mode": mode, "alpha": alpha})
+    return out
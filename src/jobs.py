@@ -0,0 +1,433 @@
+"""
+Servicio local de trabajos de simulación (asyncio).
+
+Varias sesiones de la app mandan escenarios al mismo servicio en vez de
+correrlos cada una por su cuenta. La cola, la deduplicación y el límite de
+procesos valen dentro de un proceso (la app, o un `src.cli sweep`): los
+scripts de experiments/ corren en proceso por defecto (run_job) y no
+comparten servicio entre sí.
+
+- deduplicación por hash de parámetros (runner.params_key): un pedido igual
+  a uno en cola, en curso o ya terminado (y aún guardado) devuelve el mismo
+  trabajo;
+- pool acotado: a lo sumo max_workers procesos a la vez (por defecto
+  núcleos - 1); el resto espera en una cola por prioridad (mayor primero,
+  FIFO entre iguales). Repetir un pedido en cola con más prioridad lo adelanta;
+- progreso y resultado en streaming: stream() (async) / watch() (síncrono)
+  entregan eventos ("started", job), ("progress", info) y, al final,
+  (status, job) con status "done" | "error" | "cancelled".
+
+JobService vive en un event loop; ThreadedJobService lo corre en un hilo
+propio con API síncrona (Streamlit, CLIs) e InlineJobService es el
+sustituto en proceso, sin procesos ni event loop, con la misma API (tests,
+depuración).
+
+    svc = ThreadedJobService(max_workers=2)
+    job, created = svc.submit("baseline", {"N": 300, "seed": 1}, priority=1)
+    for event, payload in svc.watch(job.key):
+        ...
+    df, ts, perc, metrics = job.result
+"""
+import asyncio
+import itertools
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+from .runner import BackgroundRun, RunCancelled, params_key, run_scenario
+
+FINAL_STATUSES = ("done", "error", "cancelled")
+
+
+class Job(BackgroundRun):
+    """
+    Trabajo del servicio: una BackgroundRun que arranca en "queued" y lanza
+    su proceso cuando le toca. El servicio consume sus mensajes, así que
+    poll() sólo devuelve el estado; wait() bloquea hasta que termine.
+    """
+
+    def __init__(self, kind, params, priority=0, progress_every=50, snapshots=False, on_finish=None):
+        super().__init__(kind, params, progress_every=progress_every, snapshots=snapshots, start=False)
+        self.priority = priority
+        self.history = []  # reportes de progreso (sólo InlineJobService)
+        self._on_finish = on_finish
+        self._canceller = None
+        self._order = None  # orden de llegada (desempate en la cola)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def poll(self):
+        return self.status
+
+    def wait(self, timeout=None):
+        """Espera a que termine (o timeout s). Devuelve status."""
+        self._done.wait(timeout)
+        return self.status
+
+    def cancel(self, grace=2.0):
+        """Pide cancelar al servicio (no bloquea: el estado cambia al procesarse)."""
+        if self._canceller is not None:
+            self._canceller(self.key)
+
+    def _pump(self):
+        return BackgroundRun.poll(self)
+
+    def _finish(self, msg, payload):
+        # el despachador y cancel() pueden terminar el trabajo desde hilos distintos
+        with self._lock:
+            if not self.pending:
+                return
+            super()._finish(msg, payload)
+        self._done.set()
+        if self._on_finish is not None:
+            self._on_finish(self)
+
+
+class _Registry:
+    """Trabajos por clave, con los terminados acotados a max_finished (LRU)."""
+
+    def __init__(self, max_finished):
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+
+    def lookup(self, key):
+        """Trabajo reutilizable (en cola, en curso o terminado bien) o None."""
+        job = self._jobs.get(key)
+        if job is None or job.status not in ("queued", "running", "done"):
+            return None
+        self._jobs.move_to_end(key)
+        return job
+
+    def add(self, job):
+        self._jobs[job.key] = job
+        finished = [k for k, j in self._jobs.items() if not j.pending]
+        for k in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[k]
+
+    def get(self, key):
+        return self._jobs.get(key) if key is not None else None
+
+    def values(self):
+        return list(self._jobs.values())
+
+
+class JobService:
+    """
+    Servicio asyncio: usar dentro de un event loop (start() crea los
+    max_workers despachadores; close() cancela lo pendiente).
+    """
+
+    def __init__(self, max_workers=None, max_finished=16, poll_s=0.1):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) - 1)
+        self.poll_s = poll_s
+        self._registry = _Registry(max_finished)
+        self._subs = {}  # key -> [callback(event, payload)]
+        self._seq = itertools.count()
+        self._queue = None
+        self._tasks = []
+        self._loop = None
+
+    def start(self):
+        self._loop = asyncio.get_event_loop()
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [self._loop.create_task(self._dispatch()) for _ in range(self.max_workers)]
+        return self
+
+    async def close(self):
+        for job in self._registry.values():
+            if job.pending:
+                await self.cancel(job.key)
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ------------------------------------------------
+    async def submit(self, kind, params, priority=0, progress_every=50, snapshots=False):
+        """Encola un escenario. Devuelve (job, created)."""
+        key = params_key(kind, params, snapshots)
+        job = self._registry.lookup(key)
+        if job is not None:
+            if job.status == "queued" and priority > job.priority:
+                job.priority = priority
+                self._push(job)  # la entrada vieja queda obsoleta y se descarta
+            return job, False
+        job = Job(kind, params, priority, progress_every, snapshots, on_finish=self._finished)
+        job._canceller = self._cancel_threadsafe
+        self._registry.add(job)
+        self._push(job)
+        return job, True
+
+    def get(self, key):
+        return self._registry.get(key)
+
+    def jobs(self):
+        return self._registry.values()
+
+    def queue_position(self, key):
+        """Trabajos en cola antes que key (0 = el próximo), o None si no está en cola."""
+        queued = sorted((-j.priority, j._order, j.key) for j in self._registry.values() if j.status == "queued")
+        keys = [k for *_, k in queued]
+        return keys.index(key) if key in keys else None
+
+    async def cancel(self, key):
+        """Cancela un trabajo en cola o en curso. Devuelve True si estaba pendiente."""
+        job = self._registry.get(key)
+        if job is None or not job.pending:
+            return False
+        if job.status == "queued":
+            job._finish("cancelled", None)
+        else:
+            await self._loop.run_in_executor(None, BackgroundRun.cancel, job)
+        return True
+
+    async def result(self, key):
+        """Espera el final del trabajo y lo devuelve."""
+        job = self._registry.get(key)
+        async for _ in self.stream(key):
+            pass
+        return job
+
+    async def stream(self, key):
+        """Eventos del trabajo hasta su final (el último progreso conocido primero)."""
+        q = asyncio.Queue()
+
+        def cb(event, payload):
+            q.put_nowait((event, payload))
+
+        job = self.subscribe(key, cb)
+        try:
+            if job.last:
+                yield "progress", job.last
+            if not job.pending:
+                yield job.status, job
+                return
+            while True:
+                event, payload = await q.get()
+                yield event, payload
+                if event in FINAL_STATUSES:
+                    return
+        finally:
+            self.unsubscribe(key, cb)
+
+    def subscribe(self, key, callback):
+        """callback(evento, payload) en el hilo del loop. Devuelve el trabajo."""
+        job = self._registry.get(key)
+        if job is None:
+            raise KeyError(key)
+        self._subs.setdefault(key, []).append(callback)
+        return job
+
+    def unsubscribe(self, key, callback):
+        subs = self._subs.get(key, [])
+        if callback in subs:
+            subs.remove(callback)
+        if not subs:
+            self._subs.pop(key, None)
+
+    # ------------------------------------------------
+    def _push(self, job):
+        if job._order is None:
+            job._order = next(self._seq)
+        self._queue.put_nowait((-job.priority, job._order, job))
+
+    def _publish(self, key, event, payload):
+        for cb in list(self._subs.get(key, ())):
+            cb(event, payload)
+
+    def _finished(self, job):
+        # puede llamarse desde un hilo del executor (cancel, _pump)
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._publish, job.key, job.status, job)
+
+    def _cancel_threadsafe(self, key):
+        self._loop.call_soon_threadsafe(lambda: self._loop.create_task(self.cancel(key)))
+
+    async def _dispatch(self):
+        while True:
+            neg_priority, _, job = await self._queue.get()
+            if job.status != "queued" or -neg_priority != job.priority:
+                continue  # cancelado, ya lanzado o re-encolado con otra prioridad
+            job.start()
+            self._publish(job.key, "started", job)
+            last = None
+            while job.running:
+                await self._loop.run_in_executor(None, job._pump)
+                if job.last is not last and job.running:
+                    last = job.last
+                    self._publish(job.key, "progress", last)
+                await asyncio.sleep(self.poll_s)
+
+
+class _SyncClient:
+    """API síncrona común: run() = submit + watch hasta el final."""
+
+    def run(self, kind, params, priority=0, progress=None, progress_every=50, snapshots=False):
+        """
+        Corre (o reutiliza) un trabajo y espera el resultado. progress recibe
+        los reportes (metrics.progress_info). Lanza RuntimeError si falla y
+        RunCancelled si se canceló.
+        """
+        job, _ = self.submit(kind, params, priority=priority, progress_every=progress_every, snapshots=snapshots)
+        for event, payload in self.watch(job.key):
+            if event == "progress" and progress is not None:
+                progress(payload)
+        if job.status == "error":
+            raise RuntimeError(f"Falló el trabajo {kind}:\n{job.error}")
+        if job.status == "cancelled":
+            raise RunCancelled()
+        return job.result
+
+
+class ThreadedJobService(_SyncClient):
+    """JobService en un hilo con su propio event loop y API síncrona (thread-safe)."""
+
+    def __init__(self, max_workers=None, max_finished=16, poll_s=0.1):
+        self.service = JobService(max_workers, max_finished, poll_s)
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run():
+            asyncio.set_event_loop(self._loop)
+            self.service.start()
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, name="job-service", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    @property
+    def max_workers(self):
+        return self.service.max_workers
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _call_sync(self, fn, *args):
+        async def _wrap():
+            return fn(*args)
+        return self._call(_wrap())
+
+    def submit(self, kind, params, priority=0, progress_every=50, snapshots=False):
+        """Devuelve (job, created)."""
+        return self._call(self.service.submit(kind, params, priority, progress_every, snapshots))
+
+    def get(self, key):
+        return self._call_sync(self.service.get, key)
+
+    def queue_position(self, key):
+        return self._call_sync(self.service.queue_position, key)
+
+    def cancel(self, key):
+        return self._call(self.service.cancel(key))
+
+    def watch(self, key, timeout=None):
+        """Iterador síncrono de eventos hasta el final (ver JobService.stream)."""
+        q = queue.Queue()
+
+        def cb(event, payload):
+            q.put((event, payload))
+
+        job = self._call_sync(self.service.subscribe, key, cb)
+        try:
+            if job.last:
+                yield "progress", job.last
+            if not job.pending:
+                yield job.status, job
+                return
+            while True:
+                event, payload = q.get(timeout=timeout)
+                yield event, payload
+                if event in FINAL_STATUSES:
+                    return
+        finally:
+            self._loop.call_soon_threadsafe(self.service.unsubscribe, key, cb)
+
+    def close(self):
+        self._call(self.service.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5.0)
+
+
+class InlineJobService(_SyncClient):
+    """
+    Sustituto en proceso de ThreadedJobService: cada trabajo corre en el
+    hilo que lo envía, dentro de submit(); misma deduplicación y eventos.
+    """
+    max_workers = 1
+
+    def __init__(self, max_finished=16):
+        self._registry = _Registry(max_finished)
+
+    def submit(self, kind, params, priority=0, progress_every=50, snapshots=False):
+        key = params_key(kind, params, snapshots)
+        job = self._registry.lookup(key)
+        if job is not None:
+            return job, False
+        job = Job(kind, params, priority, progress_every, snapshots)
+        self._registry.add(job)
+        job.status, job.started = "running", time.time()
+
+        def progress(info):
+            job.history.append(info)
+            job._handle("progress", info)
+
+        try:
+            job._finish("done", run_scenario(kind, params, progress, progress_every, snapshots))
+        except RunCancelled:
+            job._finish("cancelled", None)
+        except Exception:
+            job._finish("error", traceback.format_exc())
+        return job, True
+
+    def get(self, key):
+        return self._registry.get(key)
+
+    def queue_position(self, key):
+        return None
+
+    def cancel(self, key):
+        return False  # los trabajos terminan dentro de submit()
+
+    def watch(self, key, timeout=None):
+        job = self._registry.get(key)
+        if job is None:
+            raise KeyError(key)
+        for info in job.history:
+            yield "progress", info
+        yield job.status, job
+
+    def close(self):
+        pass
+
+
+def _print_progress(info):
+    variant = f" [{info['variant']}]" if info.get("variant") is not None else ""
+    print(f"\r  {info['pct']:5.1f}% evacuado{variant}, step {info['steps']}/{info['max_steps']}", end="", flush=True)
+
+
+def run_job(kind, params, inline=True, priority=0, progress=_print_progress):
+    """
+    Cliente de una sola corrida para los CLIs: la corre en este proceso
+    (InlineJobService) o, con inline=False, en un proceso trabajador propio
+    (ThreadedJobService de un trabajador; cancelable con Ctrl+C sin dejar
+    procesos). Cada llamada tiene su servicio: no hay cola ni deduplicación
+    con otras invocaciones. Muestra el progreso y devuelve el resultado.
+    """
+    svc = InlineJobService() if inline else ThreadedJobService(max_workers=1)
+    try:
+        return svc.run(kind, params, priority=priority, progress=progress)
+    finally:
+        svc.close()
+        if progress is _print_progress:
+            print()
@@ -1,21 +1,125 @@
+import time
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from src.agents import PersonAgent
+from src.curves import StepCurve, PLOT_MAX_POINTS
+from src.perf import ResourceMeter
 
-def run_model(model, max_steps=5000):
+# pandas, matplotlib y mesa (src.agents) se importan dentro de las funciones
+# que los usan: importar este módulo (p. ej. desde batched.py o src.cli) no
+# paga su costo de arranque.
+
+def progress_info(model, steps, max_steps, t0):
+    """
+    Estado parcial de una corrida (para barras de progreso / ETA).
+    t0: instante (time.perf_counter) en que arrancó la corrida.
+    """
+    elapsed = time.perf_counter() - t0
+    total = getattr(model, "n_persons", model.N)
+    stream = getattr(model, "stream", None)
+    evacuados = stream.count if stream is not None else len(getattr(model, "exit_events", []))
+    tick_rate = steps / elapsed if elapsed > 0 else 0.0
+    eta = (max_steps - steps) / tick_rate if tick_rate > 0 else np.nan
+    return {
+        "steps": steps,
+        "max_steps": max_steps,
+        "t": steps * model.time_step,
+        "evacuados": evacuados,
+        "total": total,
+        "pct": evacuados / max(total, 1) * 100.0,
+        "elapsed": elapsed,
+        "ticks_per_s": tick_rate,
+        "eta_s": eta,
+    }
+
+
+def run_model(model, max_steps=5000, progress=None, progress_every=50, recorder=None, heatmaps=False, perf=False):
     """
     Ejecuta un modelo Mesa hasta que termine o llegue a max_steps.
-    Devuelve: df (t_exit), ts (tiempos), perc (%evacuado), metrics (dict)
+    progress: callable opcional que recibe progress_info(...) cada
+    progress_every steps y al terminar (puede lanzar excepción para cancelar).
+    recorder: objeto opcional con record(model, steps), llamado tras cada step
+    (p. ej. snapshots.SnapshotRecorder).
+    heatmaps: si True, acumula mapas por celda y se devuelven como 5º elemento
+    ({"occupancy_time", "peak_density", "mean_speed"}: arrays (height, width)).
+    perf: True / "trace" agrega metrics["perf"] (tiempo, throughput, memoria;
+    ver perf.py); los escenarios pasan un perf.ResourceMeter ya iniciado
+    antes de armar el modelo, así también cuenta el armado.
+    Devuelve: df (t_exit), ts, perc (curva de %evacuado como puntos de cambio,
+    ver curves.StepCurve), metrics (dict)
+    Con EvacuationModel(streaming=True) no hay filas por persona: el primer
+    elemento es el StreamingMetrics del modelo (ver summarize_stream).
     """
+    if heatmaps and model.heatmaps is None:
+        model.enable_heatmaps()
+    meter = ResourceMeter.from_option(perf)
+    stream = getattr(model, "stream", None)
+    evac_after_step = []
+    t0 = time.perf_counter()
     steps = 0
+    if meter is not None:
+        meter.begin_ticks()
+    if recorder is not None:
+        recorder.record(model, steps)
     while model.running and steps < max_steps:
         model.step()
         steps += 1
+        if stream is not None:
+            evac_after_step.append(stream.count)
+        if recorder is not None:
+            recorder.record(model, steps)
+        if steps % progress_every == 0:
+            if progress is not None:
+                progress(progress_info(model, steps, max_steps, t0))
+            if meter is not None:
+                meter.sample()
+    if meter is not None:
+        meter.end_ticks()
+    if progress is not None:
+        progress(progress_info(model, steps, max_steps, t0))
 
     # --- Obtener datos de evacuación ---
-    exit_events = getattr(model, "exit_events", [])
-    if exit_events:
+    from src.agents import PersonAgent
+    person_agents = [a for a in model.schedule.agents if isinstance(a, PersonAgent)]
+    common = dict(
+        initial_population=getattr(model, "n_persons", max(1, model.N)),
+        # abiertas y cerradas (bloqueo), por índice original como p50_exit_<i> del stream
+        exit_counts={ex.index: getattr(ex, "exit_count", 0)
+                     for ex in sorted(list(model.exits) + list(getattr(model, "closed_exits", {}).values()),
+                                      key=lambda e: e.index)},
+        reelecciones=[getattr(a, "reelecciones", 0) for a in person_agents],
+    )
+    if stream is not None:
+        df, ts, perc, metrics = summarize_stream(stream, evac_after_step, steps, model.time_step, **common)
+    else:
+        df, ts, perc, metrics = summarize_run(
+            getattr(model, "exit_events", []),
+            getattr(model, "person_data", None),
+            steps,
+            model.time_step,
+            **common,
+        )
+    if meter is not None:
+        metrics["perf"] = meter.report(steps, model.time_step, ts, perc, common["initial_population"])
+
+    if heatmaps:
+        return df, ts, perc, metrics, model.heatmaps.arrays()
+    return df, ts, perc, metrics
+
+
+def summarize_run(exit_events, person_data, steps, time_step, initial_population,
+                  exit_counts=(), reelecciones=()):
+    """
+    Post-proceso común a todos los motores (Mesa, batched, ...).
+    exit_events: lista de dicts {"id", "t_exit"} o DataFrame equivalente
+    person_data: atributos por persona (lista de dicts / DataFrame) o None
+    exit_counts: personas servidas por cada salida (final): secuencia en
+    orden de índice o dict {índice original: personas}
+    reelecciones: reelecciones de las personas que siguen en el modelo
+    Devuelve: df (t_exit), ts, perc (puntos de cambio de la curva de
+    %evacuado, ver curves.StepCurve), metrics (dict)
+    """
+    import pandas as pd
+
+    if len(exit_events):
         df = pd.DataFrame(exit_events)
         df = df.sort_values("t_exit").reset_index(drop=True)
     else:
@@ -25,19 +129,12 @@ def run_model(model, max_steps=5000):
     p50 = df["t_exit"].quantile(0.5) if not df.empty else np.nan
     p90 = df["t_exit"].quantile(0.9) if not df.empty else np.nan
 
-    ts = np.arange(0, steps + 1) * model.time_step
-    evac_counts = []
-    for s in range(steps + 1):
-        t = s * model.time_step
-        evac_counts.append(np.sum(df["t_exit"] <= t) if not df.empty else 0)
-    
-    # Calcular porcentaje usando el número inicial de personas
-    initial_population = len(model.person_data) if hasattr(model, "person_data") else max(1, model.N)
-    perc = np.array(evac_counts) / initial_population * 100.0
+    # % evacuado con t_exit <= t, sobre el número inicial de personas
+    ts, perc = StepCurve.from_events(df["t_exit"], initial_population, steps * time_step)
 
     metrics = {
         "steps": steps,
-        "time_step": model.time_step,
+        "time_step": time_step,
         "makespan": makespan,
         "p50": p50,
         "p90": p90,
@@ -45,28 +142,11 @@ def run_model(model, max_steps=5000):
         "total_agentes": initial_population
     }
 
-    # --- Métricas adicionales: reelecciones y throughput ---
-    person_agents = [a for a in model.schedule.agents if isinstance(a, PersonAgent)]
-    N = len(person_agents)
-    
-    if N > 0:
-        reelecciones_totales = sum(getattr(a, "reelecciones", 0) for a in person_agents)
-        metrics["reelecciones_totales"] = reelecciones_totales
-        metrics["reelecciones_promedio"] = reelecciones_totales / N
-
-        # Throughput por salida
-        for i, ex in enumerate(model.exits):
-            key = f"throughput_exit_{i}"
-            t = metrics["makespan"] if not np.isnan(metrics["makespan"]) else (steps * model.time_step)
-            if t > 0 and hasattr(ex, "exit_count"):
-                metrics[key] = ex.exit_count / t
-            else:
-                metrics[key] = 0.0
+    _add_flow_metrics(metrics, steps, time_step, exit_counts, reelecciones)
 
     # --- Análisis por tipo de persona ---
-    if hasattr(model, "person_data") and model.person_data:
-        df_persons = pd.DataFrame(model.person_data)
-        
+    if person_data is not None and len(person_data):
+        df_persons = pd.DataFrame(person_data)
         if not df.empty and not df_persons.empty and "id" in df.columns and "id" in df_persons.columns:
             # Combinar datos de evacuación con atributos demográficos
             df_full = df_persons.merge(df[["id", "t_exit"]], on="id", how="left")
@@ -100,6 +180,53 @@ def run_model(model, max_steps=5000):
     return df, ts, perc, metrics
 
 
+def _add_flow_metrics(metrics, steps, time_step, exit_counts, reelecciones):
+    """Reelecciones y throughput por salida (si quedan personas en el modelo)."""
+    N = len(reelecciones)
+
+    if N > 0:
+        reelecciones_totales = sum(reelecciones)
+        metrics["reelecciones_totales"] = reelecciones_totales
+        metrics["reelecciones_promedio"] = reelecciones_totales / N
+
+        # Throughput por salida (clave: índice original de la salida)
+        items = exit_counts.items() if hasattr(exit_counts, "items") else enumerate(exit_counts)
+        for i, count in items:
+            key = f"throughput_exit_{i}"
+            t = metrics["makespan"] if not np.isnan(metrics["makespan"]) else (steps * time_step)
+            if t > 0:
+                metrics[key] = count / t
+            else:
+                metrics[key] = 0.0
+
+
+def summarize_stream(stream, evac_after_step, steps, time_step, initial_population,
+                     exit_counts=(), reelecciones=()):
+    """
+    Como summarize_run pero desde un sketches.StreamingMetrics, sin filas por
+    persona. evac_after_step[s]: evacuados acumulados tras el tick s (t = s * dt).
+    p50/p90 tienen error relativo <= stream.rel_error; makespan y conteos son
+    exactos. Devuelve: stream (en lugar de df), ts, perc, metrics.
+    """
+    c = np.asarray(evac_after_step, dtype=float)[:steps]
+    evac_counts = np.append(c, c[-1] if c.size else 0.0)
+    ts, perc = StepCurve.from_counts(evac_counts, time_step, initial_population)
+
+    sm = stream.metrics()
+    metrics = {
+        "steps": steps,
+        "time_step": time_step,
+        "makespan": sm.pop("makespan"),
+        "p50": sm.pop("p50"),
+        "p90": sm.pop("p90"),
+        "evacuados": sm.pop("evacuados"),
+        "total_agentes": initial_population,
+    }
+    _add_flow_metrics(metrics, steps, time_step, exit_counts, reelecciones)
+    metrics.update(sm)
+    return stream, ts, perc, metrics
+
+
 def save_times(df, path_csv):
     """Guarda los tiempos de evacuación individuales en CSV"""
     df.to_csv(path_csv, index=False)
@@ -107,9 +234,20 @@ def save_times(df, path_csv):
 
 def save_metrics(metrics_dict, path_csv):
     """Guarda las métricas de la simulación en CSV"""
+    import pandas as pd
     pd.DataFrame([metrics_dict]).to_csv(path_csv, index=False)
 
 
+def save_heatmaps(maps, prefix):
+    """Guarda cada mapa de calor como {prefix}_{nombre}.npy; devuelve las rutas"""
+    paths = []
+    for name, arr in maps.items():
+        path = f"{prefix}_{name}.npy"
+        np.save(path, arr)
+        paths.append(path)
+    return paths
+
+
 def plot_curva(ts, perc, title, out_png):
     """Genera y guarda la curva de evacuación"""
     import matplotlib
@@ -117,9 +255,10 @@ def plot_curva(ts, perc, title, out_png):
         matplotlib.get_backend()
     except Exception:
         matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
     plt.figure(figsize=(10, 6))
-    plt.plot(ts, perc, linewidth=2, color='steelblue')
+    StepCurve(ts, perc).plot(plt.gca(), PLOT_MAX_POINTS, linewidth=2, color='steelblue')
     plt.xlabel("Tiempo (s)", fontsize=12)
     plt.ylabel("% evacuado", fontsize=12)
     plt.title(title, fontsize=14)
@@ -139,12 +278,13 @@ def plot_curvas_comparadas(series, title, out_png):
         matplotlib.get_backend()
     except Exception:
         matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
     plt.figure(figsize=(10, 6))
     colors = plt.cm.tab10(np.linspace(0, 1, len(series)))
     
     for (label, ts, perc), color in zip(series, colors):
-        plt.plot(ts, perc, label=label, linewidth=2, color=color)
+        StepCurve(ts, perc).plot(plt.gca(), PLOT_MAX_POINTS, label=label, linewidth=2, color=color)
     
     plt.xlabel("Tiempo (s)", fontsize=12)
     plt.ylabel("% evacuado", fontsize=12)
@@ -3,10 +3,17 @@ from mesa.time import RandomActivation
 from mesa.space import MultiGrid
 from mesa.datacollection import DataCollector
 import numpy as np
+import pandas as pd
 import random
 
-from .agents import PersonAgent, ExitAgent
-from .space import bfs_distance_field
+from .agents import IDLE, MOVING, WAITING, PersonAgent, ExitAgent
+from .events import EventQueue
+from .schedule import ActiveSetScheduler
+from .space import (best_step_csr, bottom_exit_positions, distance_field, moore_neighbors_csr,
+                    normalize_exit_widths, sample_free_cells)
+from .heatmaps import HeatmapAccumulator, PositionColumns
+from .population import DEFAULT_POPULATION, sample_attributes
+from .sketches import StreamingMetrics
 
 class EvacuationModel(Model):
     """
@@ -15,6 +22,19 @@ class EvacuationModel(Model):
     - Salidas con ancho -> capacidad (personas/seg)
     - Colas en puerta y servicio por capacidad
     Δt por defecto = 0.1 s
+    population: PopulationParams (mezcla de tipos y rangos de atributos);
+    por defecto 15 % niños, 70 % adultos, 12 % adultos mayores, 3 % discapacidad.
+    scheduler: "random" (mesa RandomActivation) o "active" (ActiveSetScheduler:
+    no activa a quien espera en cola; mismo modelo en distribución).
+    streaming: si True, las salidas se resumen en sketches de cuantiles
+    (self.stream, ver sketches.py) en vez de exit_events, y no se arma
+    person_data: ninguna fila por persona queda retenida para las métricas.
+    events: eventos de escenario con tiempo (events.py: cierres, reaperturas,
+    capacidad, obstáculos, alarma escalonada), aplicados entre ticks; se
+    pueden agregar más con schedule_event(). Quedan en self.event_log.
+    metric: métrica del campo de distancias (space.distance_field):
+    "manhattan" (por defecto), "chebyshev" u "octile" (coherentes con el
+    movimiento en vecindad de Moore: menos empates y zigzag).
     """
 
     def __init__(
@@ -26,7 +46,13 @@ class EvacuationModel(Model):
         exit_widths=None,         
         persons_speed_cells=1,   
         seed=None,
-        time_step=0.1
+        time_step=0.1,
+        population=None,
+        scheduler="random",
+        streaming=False,
+        sketch_rel_error=0.01,
+        events=None,
+        metric="manhattan",
     ):
         super().__init__()
         if seed is not None:
@@ -36,28 +62,32 @@ class EvacuationModel(Model):
         self.width = width
         self.height = height
         self.N = N
+        self.n_persons = N
         self.num_exits = num_exits
         self.time_step = time_step
-        self.schedule = RandomActivation(self)
+        self.population = population or DEFAULT_POPULATION
+        if scheduler == "random":
+            self.schedule = RandomActivation(self)
+        elif scheduler == "active":
+            self.schedule = ActiveSetScheduler(self)
+        else:
+            raise ValueError(f"Scheduler desconocido: {scheduler}")
         self.grid = MultiGrid(width, height, torus=False)
         self.running = True
         self.exit_events = []
         self.person_data = []
         self.obstacles = set()
+        self.metric = metric
 
         # Parámetros de puertas: si no envían anchos, 1.0 m por defecto
-        if exit_widths is None:
-            exit_widths = [1.0] * num_exits
-        else:
-            # ajustar tamaño si difiere
-            if len(exit_widths) < num_exits:
-                exit_widths = list(exit_widths) + [exit_widths[-1]] * (num_exits - len(exit_widths))
-            elif len(exit_widths) > num_exits:
-                exit_widths = exit_widths[:num_exits]
-        self.exit_widths = exit_widths
+        self.exit_widths = normalize_exit_widths(exit_widths, num_exits)
+
+        # === Vecindades precalculadas (CSR por id de celda, ver space.py) ===
+        self.nbr_ptr, self.nbr_idx = moore_neighbors_csr(width, height, self.obstacles)
 
         # === Crear salidas en el borde inferior, equidistantes ===
         self.exits = []
+        self.exits_generation = 0  # +1 cada vez que cambia self.exits (ver remove_exit)
         self.exit_positions = self._generate_exit_positions()
         for i, pos in enumerate(self.exit_positions):
             width_m = self.exit_widths[i]
@@ -67,70 +97,61 @@ class EvacuationModel(Model):
                 self.next_id(),
                 self,
                 pos=pos,
-                capacity_ps=cap_ps
+                capacity_ps=cap_ps,
+                index=i,
             )
+            exit_agent.window = self.moore_window(pos)
             self.grid.place_agent(exit_agent, pos)
             self.schedule.add(exit_agent)
             self.exits.append(exit_agent)
 
-        # === Campo de distancias (BFS) hacia salidas ===
-        self.obstacles = set()  # si luego agregas paredes internas, añádelas aquí
-        self.dist_field = bfs_distance_field(self.width, self.height, self.exit_positions, self.obstacles)
+        # === Campo de distancias hacia salidas (métrica self.metric) ===
+        # (si luego agregas paredes internas, añádelas a self.obstacles antes de esto)
+        self.dist_field = distance_field(self.width, self.height, self.exit_positions, self.obstacles, metric)
+        self._build_step_table()
 
         
         # === Crear personas con heterogeneidad realista ===
+        # Atributos y posiciones se muestrean en bloque (NumPy); el bucle sólo
+        # crea y ubica los agentes Mesa.
         self.exit_times = []
-        self.person_data = []  # para análisis post-simulación por grupo
-
-        for _ in range(N):
-            # Posición aleatoria (evitar salidas)
-            x = self.random.randrange(self.width)
-            y = self.random.randrange(self.height)
-            while (x, y) in self.exit_positions:
-                x = self.random.randrange(self.width)
-                y = self.random.randrange(self.height)
-
-            # Muestrear atributos realistas
-            r = self.random.random()
-            if r < 0.15:  # 15% niños
-                tipo = "niño"
-                edad = self.random.randint(5, 12)
-                v_base = self.random.uniform(0.8, 1.0)    # m/s
-                familiaridad = self.random.random() < 0.20
-                pánico = self.random.uniform(0.2, 0.6)
-                cumplimiento = self.random.uniform(0.3, 0.7)
-                movilidad_reducida = False
-            elif r < 0.85:  # 70% adultos
-                tipo = "adulto"
-                edad = self.random.randint(13, 59)
-                v_base = self.random.uniform(1.2, 1.4)
-                familiaridad = self.random.random() < 0.70
-                pánico = self.random.uniform(0.1, 0.4)
-                cumplimiento = self.random.uniform(0.7, 1.0)
-                movilidad_reducida = False
-            elif r < 0.97:  # 12% adultos mayores
-                tipo = "adulto_mayor"
-                edad = self.random.randint(60, 85)
-                v_base = self.random.uniform(0.6, 0.9)
-                familiaridad = self.random.random() < 0.40
-                pánico = self.random.uniform(0.3, 0.7)
-                cumplimiento = self.random.uniform(0.5, 0.9)
-                movilidad_reducida = False
-            else:  # 3% discapacidad motriz
-                tipo = "discapacidad"
-                edad = self.random.randint(20, 70)
-                v_base = self.random.uniform(0.3, 0.6)
-                familiaridad = self.random.random() < 0.50
-                pánico = self.random.uniform(0.4, 0.8)
-                cumplimiento = self.random.uniform(0.3, 0.8)
-                movilidad_reducida = True
-
-            # Convertir velocidad a celdas/tick (suponiendo: 1 celda = 0.5 m, Δt = 0.1 s)
-            # v (m/s) → celdas/tick = v * Δt / 0.5 = v * 0.2
-            v_cells = max(1, min(3, int(v_base * 0.2)))  # clamping: 1–3 celdas/step
+        self.heatmaps = None   # ver enable_heatmaps()
+        self.pos_cols = None   # PositionColumns, sólo con mapas de calor
+        self._first_person_id = self.current_id + 1  # ids de personas contiguos
+        self.np_random = np.random.default_rng(seed)
 
+        attrs = sample_attributes(self.np_random, N, self.population)
+        ys, xs = np.divmod(self._sample_cells(N), self.width)
+        ids = np.arange(self._first_person_id, self._first_person_id + N)
+        self.current_id += N
+
+        tipos = np.asarray(self.population.names, dtype=object)[attrs["tipo"]]
+        if streaming:
+            counts = np.bincount(attrs["tipo"], minlength=len(self.population.names))
+            self.stream = StreamingMetrics(dict(zip(self.population.names, counts.tolist())),
+                                           rel_error=sketch_rel_error)
+            self.person_data = None
+        else:
+            self.stream = None
+            # Datos para métricas post-simulación (tabla columnar, una fila por persona)
+            self.person_data = pd.DataFrame({
+                "id": ids,
+                "tipo": tipos,
+                "edad": attrs["edad"],
+                "v_base": attrs["v_base"],
+                "pánico": attrs["pánico"],
+                "familiaridad": attrs["familiaridad"],
+                "cumplimiento": attrs["cumplimiento"],
+                "movilidad_reducida": attrs["movilidad_reducida"],
+            })
+
+        cols = [ids, xs, ys, tipos, attrs["edad"], attrs["v_cells"],
+                attrs["pánico"], attrs["familiaridad"], attrs["cumplimiento"], attrs["movilidad_reducida"]]
+        for uid, x, y, tipo, edad, v_cells, pánico, familiaridad, cumplimiento, movilidad_reducida in zip(
+            *(np.asarray(c).tolist() for c in cols)
+        ):
             agent = PersonAgent(
-                self.next_id(),
+                uid,
                 self,
                 pos=(x, y),
                 tipo=tipo,
@@ -144,40 +165,220 @@ class EvacuationModel(Model):
             self.grid.place_agent(agent, (x, y))
             self.schedule.add(agent)
 
-            # Guardar datos para métricas post-simulación
-            self.person_data.append({
-                "id": agent.unique_id,
-                "tipo": tipo,
-                "edad": edad,
-                "v_base": v_base,
-                "pánico": pánico,
-                "familiaridad": familiaridad,
-                "cumplimiento": cumplimiento,
-                "movilidad_reducida": movilidad_reducida,
-            })
+        # === Eventos de escenario (cola por tiempo, ver events.py) ===
+        self.events = EventQueue()
+        self.event_log = []
+        self.closed_exits = {}      # índice original -> ExitAgent cerrado
+        self._defer_field = False   # durante _apply_events el campo se recalcula una vez
+        self._field_dirty = False
+        for ev in events or ():
+            self.schedule_event(ev)
 
         # === DataCollector ===
         self.datacollector = DataCollector(
             model_reporters={
-                "Evacuados": lambda m: sum(a.evacuated for a in m.schedule.agents if isinstance(a, PersonAgent))
+                "Evacuados": lambda m: m.stream.count if m.stream is not None else len(m.exit_events)
             }
         )
 
+    # ------------------------------------------------
+    # Registro de agentes que no heredan de mesa.Agent (PersonAgent usa
+    # __slots__). mesa 2.2 guarda model._agents[tipo][agente]; es interno de
+    # Mesa, así que todo acceso pasa por acá y se omite si no existe.
+    def track_agent(self, agent):
+        registry = getattr(self, "_agents", None)
+        if registry is not None:
+            registry[type(agent)][agent] = None
+
+    def untrack_agent(self, agent):
+        registry = getattr(self, "_agents", None)
+        if registry is not None:
+            registry[type(agent)].pop(agent, None)
+
     # ------------------------------------------------
     def _generate_exit_positions(self):
-        pos = []
-        for i in range(self.num_exits):
-            x = int((i + 1) * self.width / (self.num_exits + 1))
-            y = 0  # borde inferior
-            pos.append((x, y))
-        return pos
+        return bottom_exit_positions(self.width, self.num_exits)
+
+    # ------------------------------------------------
+    def moore_window(self, pos):
+        """Celdas (x, y) vecinas de pos (ventana 3x3 sin el centro ni obstáculos)."""
+        c = pos[1] * self.width + pos[0]
+        cells = self.nbr_idx[self.nbr_ptr[c]:self.nbr_ptr[c + 1]]
+        return [(x, y) for y, x in zip(*(v.tolist() for v in np.divmod(cells, self.width)))]
+
+    def _build_step_table(self):
+        """
+        Pasos greedy por celda (space.best_step_csr) para el dist_field actual.
+        Se guardan como listas planas: PersonAgent las indexa escalar a escalar
+        en cada micro-paso y así evita el costo de indexar arrays NumPy.
+        """
+        ptr, idx = best_step_csr(self.dist_field, self.obstacles)
+        self.step_ptr = ptr.tolist()
+        self.step_idx = idx.tolist()
+        self._step_src = self.dist_field
+
+    # ------------------------------------------------
+    def _sample_cells(self, n):
+        """n celdas iniciales (space.sample_free_cells: sin reemplazo entre las libres)."""
+        return sample_free_cells(self.np_random, self.width, self.height, n,
+                                 list(self.exit_positions) + list(self.obstacles))
+
+    # ------------------------------------------------
+    def exit_by_index(self, index):
+        """Salida abierta con ExitAgent.index == index (o None)."""
+        for ex in self.exits:
+            if ex.index == index:
+                return ex
+        return None
+
+    def _update_field(self):
+        """Recalcula campo de distancias y tabla de pasos (una vez por tick si hay eventos)."""
+        if self._defer_field:
+            self._field_dirty = True
+            return
+        self.dist_field = distance_field(self.width, self.height, self.exit_positions, self.obstacles,
+                                         self.metric)
+        self._build_step_table()
+
+    def remove_exit(self, ex):
+        """
+        Quita una salida (grid, scheduler y self.exits), recalcula el campo de
+        distancias e invalida las salidas objetivo de las personas.
+        """
+        try:
+            self.grid.remove_agent(ex)
+        except Exception:
+            pass
+        try:
+            self.schedule.remove(ex)
+        except Exception:
+            pass
+        self.exits.remove(ex)
+        if ex.index is not None:
+            self.closed_exits[ex.index] = ex
+        self.exit_positions = [e.pos for e in self.exits]
+        self._update_field()
+        self.exits_generation += 1
+
+    def restore_exit(self, index):
+        """Reabre una salida quitada con remove_exit (por índice original); False si no estaba cerrada."""
+        ex = self.closed_exits.pop(index, None)
+        if ex is None:
+            return False
+        ex.service_credit = 0.0
+        self.grid.place_agent(ex, ex.home)
+        self.schedule.add(ex)
+        self.exits.append(ex)
+        self.exits.sort(key=lambda e: e.index)
+        self.exit_positions = [e.pos for e in self.exits]
+        self._update_field()
+        self.exits_generation += 1
+        return True
+
+    def add_obstacles(self, cells):
+        """
+        Agrega celdas bloqueadas; recalcula vecindades, colas de salida y campo.
+        Quienes estaban parados en una celda nueva se corren a la celda libre
+        más cercana (Chebyshev; a igual distancia, la más cerca de una salida)
+        desde la que todavía se llega a alguna salida; si esperaban en cola
+        vuelven a moverse. Devuelve (celdas nuevas, personas reubicadas).
+        """
+        nuevas = [(x, y) for x, y in cells
+                  if 0 <= x < self.width and 0 <= y < self.height and (x, y) not in self.obstacles]
+        if not nuevas:
+            return [], 0
+        self.obstacles.update(nuevas)
+        self.nbr_ptr, self.nbr_idx = moore_neighbors_csr(self.width, self.height, self.obstacles)
+        for ex in list(self.exits) + list(self.closed_exits.values()):
+            ex.window = self.moore_window(ex.home)
+        occupants = [a for a in self.grid.get_cell_list_contents(nuevas) if isinstance(a, PersonAgent)]
+        if occupants:
+            self._relocate(occupants)
+        self._update_field()
+        # las personas reubicadas (y las colas recortadas) vuelven a validar su objetivo;
+        # con scheduler="active" esto además despierta a quienes dormían en cola
+        self.exits_generation += 1
+        return nuevas, len(occupants)
+
+    def _relocate(self, persons):
+        """Mueve personas a la celda libre y alcanzable más cercana (ver add_obstacles)."""
+        field = distance_field(self.width, self.height, self.exit_positions, self.obstacles, self.metric)
+        ok = np.isfinite(field)
+        for (x, y) in list(self.exit_positions) + list(self.obstacles):
+            ok[y, x] = False
+        ys, xs = np.nonzero(ok)
+        if not len(xs):
+            return  # no queda celda útil: se quedan donde están (el campo es inf ahí)
+        for a in sorted(persons, key=lambda p: p.unique_id):
+            cheb = np.maximum(np.abs(xs - a.pos[0]), np.abs(ys - a.pos[1]))
+            i = np.lexsort((field[ys, xs], cheb))[0]
+            self.grid.move_agent(a, (int(xs[i]), int(ys[i])))
+            if self.pos_cols is not None:
+                self.pos_cols.move(a.unique_id, a.pos)
+            if a.state == WAITING:
+                a.state = MOVING
+
+    # ------------------------------------------------
+    def hold_persons(self, persons):
+        """Pasa personas a pre-movimiento (IDLE): no actúan hasta release_persons."""
+        for a in persons:
+            a.state = IDLE
+        if hasattr(self.schedule, "hold"):
+            self.schedule.hold(persons)
+
+    def release_persons(self, persons):
+        """Termina el pre-movimiento de quienes sigan IDLE; devuelve cuántos."""
+        released = [a for a in persons if a.state == IDLE and not a.evacuated]
+        for a in released:
+            a.state = MOVING
+        if hasattr(self.schedule, "release"):
+            self.schedule.release(released)
+        return len(released)
+
+    def schedule_event(self, event):
+        """Agrega un evento de escenario (events.py) a la cola."""
+        event.on_schedule(self)
+        self.events.push(event)
+
+    def _apply_events(self, t_now):
+        self._defer_field = True
+        try:
+            for ev in self.events.pop_due(t_now):
+                detail = ev.apply(self)
+                if detail is not None:
+                    self.event_log.append({"t": t_now, "evento": ev.kind, **detail})
+        finally:
+            self._defer_field = False
+        if self._field_dirty:
+            self._field_dirty = False
+            self._update_field()
+
+    # ------------------------------------------------
+    def enable_heatmaps(self, cell_m=0.5):
+        """Activa la acumulación de mapas de calor por celda (ver heatmaps.py)."""
+        self.heatmaps = HeatmapAccumulator(
+            self.width, self.height, self.n_persons, time_step=self.time_step, cell_m=cell_m
+        )
+        # posiciones en columnas: se recorren los agentes una sola vez, acá;
+        # después las mantienen PersonAgent.step, ExitAgent.step y _relocate
+        self.pos_cols = PositionColumns(self._first_person_id, self.n_persons)
+        for a in self.schedule.agents:
+            if isinstance(a, PersonAgent):
+                self.pos_cols.move(a.unique_id, a.pos)
+        return self.heatmaps
+
+    def _update_heatmaps(self):
+        self.heatmaps.update(*self.pos_cols.snapshot())
 
     # ------------------------------------------------
     def step(self):
+        if len(self.events) and self.events.next_time() <= self.schedule.steps * self.time_step:
+            self._apply_events(self.schedule.steps * self.time_step)
         self.datacollector.collect(self)
         self.schedule.step()
+        if self.heatmaps is not None:
+            self._update_heatmaps()
 
-        # detener si ya no quedan personas
-        any_left = any(isinstance(a, PersonAgent) for a in self.schedule.agents)
-        if not any_left:
-            self.   ning = False
+        # detener si ya no quedan personas (en el scheduler sólo quedan las salidas)
+        if self.schedule.get_agent_count() <= len(self.exits):
+            self.running = False
@@ -0,0 +1,400 @@
+"""
+Motor particionado por franjas para pisos muy grandes (p. ej. 2000 x 2000
+celdas y 200k personas).
+
+El grid se divide en P franjas horizontales de filas contiguas; cada franja
+la posee un proceso trabajador con sus propias personas (estado columnar
+como en batched.py) y su tramo del campo de distancias (sus filas más un
+halo de v_max filas arriba y abajo, donde pueden quedar tras moverse en el
+tick). Por tick, con dos barreras:
+
+1. cada trabajador publica en memoria compartida su cola por salida y sus
+   personas restantes; tras la barrera todos suman la cola global (la
+   elección softmax de salida la necesita) y saben si la corrida terminó;
+2. re-elección, movimiento greedy y servicio de salidas son locales; quien
+   cruzó el borde de su franja se escribe en el buzón (memoria compartida)
+   de la franja vecina y, tras la segunda barrera, cada uno lee sus
+   llegadas.
+
+Las salidas están en la fila 0 y sus colas (filas 0-1) quedan enteras en la
+primera franja, que es la única que sirve. La población inicial es la de
+EvacuationModel con la misma semilla; la dinámica es la de batched.py
+(equivalente en distribución al modelo Mesa, no bit a bit) y cada franja
+usa su propio generador, así que el resultado depende de P sólo en
+distribución. Los tiempos de salida de todas las franjas se juntan en la
+tupla (df, ts, perc, metrics) de run_model.
+
+Con franjas estáticas la carga se concentra, hacia el final, en la franja
+de las salidas: el speedup baja cuando la mayoría ya está haciendo cola.
+"""
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .batched import BatchedEvacuation, MOVING, WAITING
+from .metrics import summarize_run
+from .population import DEFAULT_POPULATION, sample_attributes
+from .space import bottom_exit_positions, distance_field, normalize_exit_widths, sample_free_cells
+
+# columnas de una persona en los buzones (float64: los enteros caben exactos)
+_COLS = ("pid", "x", "y", "state", "target", "preferred", "reelecciones", "tipo", "familiar", "panic", "v")
+_INT_COLS = ("pid", "x", "y", "target", "preferred", "reelecciones", "tipo", "v")
+
+# paso greedy: la celda propia primero y luego los vecinos en el orden de neighbors_moore
+_OFFSETS = [(0, 0)] + [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+_DX = np.array([o[0] for o in _OFFSETS], dtype=np.int64)
+_DY = np.array([o[1] for o in _OFFSETS], dtype=np.int64)
+
+
+def band_bounds(height, workers, min_rows=2):
+    """Límites de filas [b0, b1, ..., bP] de P franjas de alto >= min_rows (P se reduce si hace falta)."""
+    workers = max(1, min(workers, height // max(min_rows, 1)))
+    return np.linspace(0, height, workers + 1).round().astype(np.int64)
+
+
+class _Shared:
+    """Arrays NumPy sobre bloques de memoria compartida (el padre los crea y libera)."""
+
+    def __init__(self, specs=None, names=None):
+        self.blocks, self.arrays = {}, {}
+        for key, (shape, dtype) in (specs or {}).items():
+            nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            name = names[key] if names else None
+            shm = shared_memory.SharedMemory(name=name, create=name is None, size=0 if name else nbytes)
+            self.blocks[key] = shm
+            self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    @property
+    def names(self):
+        return {k: b.name for k, b in self.blocks.items()}
+
+    def close(self, unlink=False):
+        self.arrays.clear()
+        for b in self.blocks.values():
+            b.close()
+            if unlink:
+                b.unlink()
+
+
+class _Band(BatchedEvacuation):
+    """
+    Una franja: estado de batched.py con K = 1 para las personas locales.
+    Reutiliza _choose, _serve y _compact; cambian la cola (global), el
+    movimiento (candidatos calculados sobre el tramo local del campo, sin la
+    tabla completa) y el fin de la corrida (global).
+    """
+
+    def __init__(self, w, bounds, people, field, exit_positions, capacity_ps, time_step, seed, vmax, shared,
+                 barrier, halo_capacity, num_people):
+        self.w, self.P = w, len(bounds) - 1
+        self.y0, self.y1 = int(bounds[w]), int(bounds[w + 1])
+        self.height, self.width = field.shape
+        self.K, self.N = 1, num_people
+        self.num_exits = len(exit_positions)
+        self.time_step = time_step
+        self.steps = 0
+        self.streaming = False
+        self.population = [DEFAULT_POPULATION]
+        # sólo la franja de las salidas sirve; en las demás nadie junta crédito
+        self.capacity_ps = capacity_ps if w == 0 else np.zeros_like(capacity_ps)
+        self._ex_x = np.array([p[0] for p in exit_positions], dtype=np.int64)
+        self._ex_y = np.array([p[1] for p in exit_positions], dtype=np.int64)
+
+        self.vmax = vmax
+        self.lo = max(self.y0 - self.vmax - 1, 0)
+        hi = min(self.y1 + self.vmax + 1, self.height)
+        self.field = np.array(field[self.lo:hi])  # copia local: filas propias + halo
+
+        for name in _COLS:
+            setattr(self, name, people[name])
+        self.rep = np.zeros(self.pid.size, dtype=np.int64)
+        self.credit = np.zeros((1, self.num_exits))
+        self.exit_count = np.zeros((1, self.num_exits), dtype=np.int64)
+        self.live = np.ones(1, dtype=bool)
+        self._events = []
+        self._served = []
+        self.rng = np.random.default_rng(np.random.SeedSequence([seed, w]))
+
+        self.shared = shared
+        self.barrier = barrier
+        self.cap = halo_capacity
+        self.done = False
+        self.alive_total = num_people
+
+    # ------------------------------------------------
+    def _queue_counts(self, waiting):
+        local = super()._queue_counts(waiting)
+        sh = self.shared.arrays
+        sh["queue"][self.w] = local[0]
+        sh["alive"][self.w] = self.pid.size
+        self.barrier.wait()
+        self.alive_total = int(sh["alive"].sum())  # consistente sólo entre las dos barreras
+        self.done = self.alive_total == 0
+        return sh["queue"].sum(axis=0, keepdims=True)
+
+    def _move(self, moving):
+        """Micro-pasos greedy como space.best_step_table, evaluando los 9 candidatos al vuelo."""
+        for j in range(self.vmax):
+            idx = np.flatnonzero(moving & (self.state == MOVING) & (self.v > j))
+            if idx.size == 0:
+                break
+            nx = self.x[idx, None] + _DX
+            ny = self.y[idx, None] + _DY
+            ok = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+            ly = np.clip(ny - self.lo, 0, self.field.shape[0] - 1)
+            vals = np.where(ok, self.field[ly, np.clip(nx, 0, self.width - 1)], np.inf)
+            best = vals.min(axis=1, keepdims=True)
+            with np.errstate(invalid="ignore"):
+                tie = ok & np.isfinite(best) & ((vals == best) | (np.abs(vals - best) < 1e-6))
+            tie[:, 0] |= ~tie.any(axis=1)
+            pick = (self.rng.random(idx.size) * tie.sum(axis=1)).astype(np.int64)
+            col = np.argmax(np.cumsum(tie, axis=1) > pick[:, None], axis=1)
+            rows = np.arange(idx.size)
+            self.x[idx], self.y[idx] = nx[rows, col], ny[rows, col]
+
+            has_target = self.target[idx] >= 0
+            tx = self._ex_x[np.maximum(self.target[idx], 0)]
+            ty = self._ex_y[np.maximum(self.target[idx], 0)]
+            adj = has_target & (np.maximum(np.abs(self.x[idx] - tx), np.abs(self.y[idx] - ty)) <= 1)
+            self.state[idx[adj]] = WAITING
+
+    def _migrate(self):
+        """Manda a las franjas vecinas a quien salió de [y0, y1) y recibe las llegadas."""
+        sh = self.shared.arrays
+        out, count = sh["halo"], sh["halo_n"]
+        for d, (mask, dest) in enumerate(((self.y < self.y0, self.w - 1), (self.y >= self.y1, self.w + 1))):
+            idx = np.flatnonzero(mask)
+            count[self.w, d] = idx.size
+            if idx.size == 0:
+                continue
+            if not 0 <= dest < self.P:
+                raise RuntimeError("persona fuera del grid")
+            if idx.size > self.cap:
+                raise RuntimeError(f"desborde del halo ({idx.size} > {self.cap}): subir halo_capacity")
+            for c, name in enumerate(_COLS):
+                out[self.w, d, :idx.size, c] = getattr(self, name)[idx]
+        keep = (self.y >= self.y0) & (self.y < self.y1)
+        self.barrier.wait()
+
+        # llegadas: de la franja de abajo (que mandó "arriba") y de la de arriba (que mandó "abajo")
+        incoming = []
+        for src, d in ((self.w - 1, 1), (self.w + 1, 0)):
+            if 0 <= src < self.P and count[src, d]:
+                incoming.append(np.array(out[src, d, :count[src, d]]))
+        for c, name in enumerate(_COLS):
+            arr = getattr(self, name)[keep]
+            if incoming:
+                new = np.concatenate([blk[:, c] for blk in incoming])
+                arr = np.concatenate([arr, new.astype(arr.dtype)])
+            setattr(self, name, arr)
+        self.rep = np.zeros(self.pid.size, dtype=np.int64)
+
+    def step(self):
+        waiting0 = self.state == WAITING
+        cola = self._queue_counts(waiting0)
+        if self.done:
+            return
+        idx = np.flatnonzero(waiting0 & (self.panic > 0.7))
+        idx = idx[self.rng.random(idx.size) < 0.05]
+        if idx.size:
+            self.target[idx] = self._choose(idx, cola)
+            self.state[idx] = MOVING
+
+        moving = ~waiting0
+        idx = np.flatnonzero(moving if self.steps % 10 == 0 else moving & (self.target < 0))
+        if idx.size:
+            old = self.target[idx]
+            new = self._choose(idx, cola)
+            self.reelecciones[idx] += old != new
+            self.target[idx] = new
+        self._move(moving)
+
+        waiting_now = self.state == WAITING
+        self._serve(waiting0 & waiting_now, moving & waiting_now)
+        self.steps += 1
+        self._compact()
+        self._migrate()
+
+
+def _band_worker(w, bounds, people, shm_names, shm_specs, exit_positions, capacity_ps, time_step, seed,
+                 vmax, max_steps, barrier, results, progress_q, progress_every, halo_capacity, num_people):
+    shared = _Shared(shm_specs, shm_names)
+    try:
+        band = _Band(w, bounds, people, shared.arrays["field"], exit_positions, capacity_ps, time_step, seed,
+                     vmax, shared, barrier, halo_capacity, num_people)
+        t0 = time.perf_counter()
+        while band.steps < max_steps:
+            band.step()
+            if band.done:
+                break
+            if progress_q is not None and w == 0 and band.steps % progress_every == 0:
+                progress_q.put(_progress(band.steps, max_steps, time_step, num_people, band.alive_total, t0))
+        ev = band._events
+        results.put(("done", w, {
+            "pid": np.concatenate([e[1] for e in ev]) if ev else np.zeros(0, dtype=np.int64),
+            "t": np.concatenate([np.full(e[1].size, e[2]) for e in ev]) if ev else np.zeros(0),
+            "exit_count": band.exit_count[0],
+            "reelecciones": band.reelecciones,
+            "steps": band.steps,
+        }))
+    except threading.BrokenBarrierError:
+        results.put(("aborted", w, None))
+    except Exception:
+        barrier.abort()
+        results.put(("error", w, traceback.format_exc()))
+    finally:
+        band = None  # suelta las vistas sobre la memoria compartida antes de cerrarla
+        shared.close()
+
+
+def _progress(steps, max_steps, time_step, total, alive, t0):
+    elapsed = time.perf_counter() - t0
+    rate = steps / elapsed if elapsed > 0 else 0.0
+    evac = total - alive
+    return {"steps": steps, "max_steps": max_steps, "t": steps * time_step, "evacuados": evac,
+            "total": total, "pct": evac / max(total, 1) * 100.0, "elapsed": elapsed,
+            "ticks_per_s": rate, "eta_s": (max_steps - steps) / rate if rate > 0 else np.nan}
+
+
+def _initial_population(N, width, height, exit_positions, seed, population):
+    """Atributos y celdas como EvacuationModel (mismo generador y orden de sorteos)."""
+    rng = np.random.default_rng(seed)
+    attrs = sample_attributes(rng, N, population)
+    return attrs, sample_free_cells(rng, width, height, N, exit_positions)
+
+
+def run_partitioned(N=300, width=25, height=25, num_exits=3, exit_widths=None, seed=42, max_steps=5000,
+                    time_step=0.1, population=None, workers=None, progress=None, progress_every=50,
+                    halo_capacity=None, metric="manhattan"):
+    """
+    Corre una réplica del baseline repartida en 'workers' procesos (por
+    defecto todos los núcleos; con 1 corre en este proceso). Devuelve
+    (df, ts, perc, metrics) como run_model; metrics["workers"] es la
+    cantidad de franjas usada (se reduce si el grid es bajo).
+    halo_capacity: máximo de personas que cruzan un borde por tick (por
+    defecto N / franjas, al menos 1024).
+    metric: métrica del campo de distancias (ver EvacuationModel).
+    """
+    population = population or DEFAULT_POPULATION
+    exit_positions = bottom_exit_positions(width, num_exits)
+    capacity_ps = 1.3 * np.asarray(normalize_exit_widths(exit_widths, num_exits), dtype=float)
+    attrs, cells = _initial_population(N, width, height, exit_positions, seed, population)
+    vmax = int(max(attrs["v_cells"].max(initial=1), 1))
+    bounds = band_bounds(height, workers or os.cpu_count() or 1, min_rows=max(2, vmax))
+    P = len(bounds) - 1
+    cap = int(halo_capacity or max(1024, N // P))
+
+    ys, xs = np.divmod(cells, width)
+    cols = {
+        "pid": np.arange(N, dtype=np.int64), "x": xs.astype(np.int64), "y": ys.astype(np.int64),
+        "state": np.full(N, MOVING, dtype=np.int8), "target": np.full(N, -1, dtype=np.int64),
+        "preferred": np.full(N, -1, dtype=np.int64), "reelecciones": np.zeros(N, dtype=np.int64),
+        "tipo": np.asarray(attrs["tipo"], dtype=np.int64), "familiar": np.asarray(attrs["familiaridad"], dtype=bool),
+        "panic": np.asarray(attrs["pánico"], dtype=float), "v": np.asarray(attrs["v_cells"], dtype=np.int64),
+    }
+    owner = np.searchsorted(bounds, ys, side="right") - 1
+    parts = [{k: v[owner == w] for k, v in cols.items()} for w in range(P)]
+
+    specs = {
+        "field": ((height, width), np.float64),
+        "queue": ((P, num_exits), np.int64),
+        "alive": ((P,), np.int64),
+        "halo": ((P, 2, cap, len(_COLS)), np.float64),
+        "halo_n": ((P, 2), np.int64),
+    }
+    shared = _Shared(specs)
+    shared.arrays["field"][:] = distance_field(width, height, exit_positions, metric=metric)
+    args = (exit_positions, capacity_ps, time_step, seed, vmax, max_steps)
+    t0 = time.perf_counter()
+    procs = []
+    try:
+        if P == 1:
+            results = _LocalQueue()
+            _band_worker(0, bounds, parts[0], shared.names, specs, *args, threading.Barrier(1), results,
+                         _Direct(progress) if progress is not None else None, progress_every, cap, N)
+        else:
+            ctx = mp.get_context("spawn")
+            barrier = ctx.Barrier(P)
+            results = ctx.Queue()
+            progress_q = ctx.Queue() if progress is not None else None
+            procs = [ctx.Process(target=_band_worker, daemon=True,
+                                 args=(w, bounds, parts[w], shared.names, specs, *args, barrier, results,
+                                       progress_q, progress_every, cap, N))
+                     for w in range(P)]
+            for p in procs:
+                p.start()
+        outs, errors = {}, []
+        while len(outs) + len(errors) < P:
+            if procs and progress is not None:
+                while not progress_q.empty():
+                    progress(progress_q.get())
+            try:
+                status, w, payload = results.get(timeout=0.2)
+            except queue.Empty:
+                if procs and not any(p.is_alive() for p in procs) and results.empty():
+                    raise RuntimeError("los trabajadores terminaron sin resultado")
+                continue
+            if status == "done":
+                outs[w] = payload
+            elif status == "error":
+                errors.append(payload)
+            else:
+                errors.append(None)
+        for p in procs:
+            p.join()
+        real = [e for e in errors if e]
+        if errors:
+            raise RuntimeError("falló un trabajador del motor particionado:\n" + (real[0] if real else ""))
+    finally:
+        for p in procs:  # cancelación (progress lanzó una excepción) o error
+            if p.is_alive():
+                p.terminate()
+        shared.close(unlink=True)
+    elapsed = time.perf_counter() - t0
+
+    steps = max(o["steps"] for o in outs.values())
+    E = num_exits
+    events = {"id": np.concatenate([o["pid"] for o in outs.values()]) + E + 1,
+              "t_exit": np.concatenate([o["t"] for o in outs.values()])}
+    person_data = {
+        "id": np.arange(E + 1, E + 1 + N),
+        "tipo": np.asarray(population.names, dtype=object)[attrs["tipo"]],
+        "edad": attrs["edad"], "v_base": attrs["v_base"], "pánico": attrs["pánico"],
+        "familiaridad": attrs["familiaridad"], "cumplimiento": attrs["cumplimiento"],
+        "movilidad_reducida": attrs["movilidad_reducida"],
+    }
+    df, ts, perc, metrics = summarize_run(
+        events if events["id"].size else [], person_data, steps, time_step, initial_population=N,
+        exit_counts=np.sum([o["exit_count"] for o in outs.values()], axis=0),
+        reelecciones=np.concatenate([o["reelecciones"] for o in outs.values()]),
+    )
+    metrics.update({"seed": seed, "workers": P, "elapsed_s": elapsed})
+    if progress is not None:
+        progress(_progress(steps, max_steps, time_step, N, N - int(metrics["evacuados"]), t0))
+    return df, ts, perc, metrics
+
+
+class _Direct:
+    """'Cola' de progreso que llama directo al callback (una sola franja)."""
+
+    def __init__(self, fn):
+        self.put = fn
+
+
+class _LocalQueue(list):
+    """Cola mínima para el caso de una sola franja (sin procesos)."""
+
+    def put(self, item):
+        self.append(item)
+
+    def get(self, timeout=None):
+        return self.pop(0)
+
+    def empty(self):
+        return not self
@@ -0,0 +1,222 @@
+"""
+Contabilidad de recursos de una corrida (opt-in).
+
+Con perf=True (o "trace") run_model y los escenarios agregan
+metrics["perf"], separado de las métricas de evacuación:
+
+- wall_s / cpu_s / cpu_util: tiempo de pared y de CPU de toda la corrida
+  (armado del modelo + ticks + post-proceso). cpu_s suma los procesos hijos
+  ya terminados (p. ej. las franjas de partitioned.py).
+- sim_s, ticks_per_s, agent_steps, agent_steps_per_s: sólo el bucle de ticks;
+  agent_steps es la suma de personas en el modelo en cada tick (área bajo la
+  curva de no evacuados), la unidad de trabajo que escala con N.
+- rss_start_mb / rss_peak_mb: RSS al empezar y máximo muestreado durante la
+  corrida (cada progress_every ticks y al terminar los ticks; el
+  post-proceso no cuenta); rss_max_mb es el pico de todo el proceso
+  (getrusage), que puede venir de una corrida anterior. Sólo este proceso:
+  la memoria de los hijos (franjas de partitioned.py) no se suma.
+- bytes_per_agent: (rss_peak - rss_start) / personas, o con "trace" el pico
+  de tracemalloc / personas (más preciso, pero tracemalloc hace la corrida
+  varias veces más lenta). Ambas incluyen los costos fijos (grid, campo de
+  distancias) y la de RSS además lo que se importa o cachea en la primera
+  corrida del proceso: el costo marginal por persona es la pendiente entre
+  corridas con distinto N (summarize_perf sobre un barrido).
+- top_allocs (sólo "trace"): los TRACE_TOP mayores asignadores vivos al
+  terminar, por archivo:línea.
+
+summarize_perf agrega los perf de muchas corridas (barridos, réplicas) por
+configuración para planificar capacidad con N y tamaños de grid grandes.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PERF_MODES = (False, True, "trace")
+TRACE_TOP = 10
+# Campos numéricos que summarize_perf agrega (promedio y máximo)
+PERF_FIELDS = ("wall_s", "cpu_s", "ticks_per_s", "agent_steps_per_s", "rss_peak_mb", "rss_max_mb",
+               "bytes_per_agent")
+
+_MB = 1024.0 * 1024.0
+
+
+def rss_bytes():
+    """RSS actual del proceso (Linux, /proc); None si no se puede leer."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def max_rss_bytes():
+    """Pico de RSS de todo el proceso (getrusage); None sin el módulo resource."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS: bytes, Linux: KiB
+
+
+def _cpu_seconds():
+    """CPU de este proceso + la de los hijos ya esperados."""
+    cpu = time.process_time()
+    if resource is not None:
+        ch = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += ch.ru_utime + ch.ru_stime
+    return cpu
+
+
+def agent_steps(ts, perc, population, time_step):
+    """
+    Personas-tick de una corrida a partir de su curva de % evacuado: área
+    bajo 100 - perc más el tick en que sale cada evacuado (t_exit es el
+    tiempo al empezar ese tick, cuando la persona todavía se mueve).
+    """
+    ts = np.asarray(ts, dtype=float)
+    perc = np.asarray(perc, dtype=float)
+    if len(ts) < 2 or time_step <= 0:
+        return 0
+    area = np.sum(np.diff(ts) * (100.0 - perc[:-1])) / 100.0
+    return int(round(area * population / time_step + perc[-1] / 100.0 * population))
+
+
+class ResourceMeter:
+    """
+    Mide una corrida entre start() y report(). sample() actualiza el pico de
+    RSS (run_model lo llama cada progress_every ticks); begin_ticks() /
+    end_ticks() delimitan el bucle de simulación.
+    """
+
+    def __init__(self, trace=False, top=TRACE_TOP):
+        self.trace = trace
+        self.top = top
+        self._own_trace = False
+        self._t0 = self._cpu0 = None
+        self._sim_t0 = self._sim_s = None
+        self._rss0 = self._rss_peak = None
+        self._traced0 = 0
+
+    @classmethod
+    def from_option(cls, perf):
+        """perf=False/None → None; True → sin tracemalloc; "trace" → con; un ResourceMeter se usa tal cual."""
+        if isinstance(perf, cls):
+            return perf
+        if perf is None or perf is False:
+            return None
+        if perf is not True and perf != "trace":
+            raise ValueError(f"perf inválido: {perf!r} (use uno de {PERF_MODES})")
+        return cls(trace=perf == "trace").start()
+
+    def start(self):
+        if self.trace:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._own_trace = True
+            self._traced0 = tracemalloc.get_traced_memory()[0]
+        self._rss0 = self._rss_peak = rss_bytes()
+        self._cpu0 = _cpu_seconds()
+        self._t0 = time.perf_counter()
+        return self
+
+    def sample(self):
+        rss = rss_bytes()
+        if rss is not None and (self._rss_peak is None or rss > self._rss_peak):
+            self._rss_peak = rss
+
+    def begin_ticks(self):
+        self._sim_t0 = time.perf_counter()
+
+    def end_ticks(self):
+        if self._sim_t0 is not None:
+            self._sim_s = time.perf_counter() - self._sim_t0
+        self.sample()
+
+    def report(self, steps, time_step, ts, perc, population):
+        """Cierra la medición y devuelve el dict de metrics["perf"]."""
+        wall = time.perf_counter() - self._t0
+        cpu = _cpu_seconds() - self._cpu0
+        if self._sim_s is None:
+            self.sample()
+        sim = self._sim_s if self._sim_s is not None else wall
+        work = agent_steps(ts, perc, population, time_step)
+        population = max(int(population), 1)
+        out = {
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "cpu_util": cpu / wall if wall > 0 else np.nan,
+            "sim_s": sim,
+            "ticks": steps,
+            "ticks_per_s": steps / sim if sim > 0 else np.nan,
+            "agents": population,
+            "agent_steps": work,
+            "agent_steps_per_s": work / sim if sim > 0 else np.nan,
+            "rss_start_mb": self._rss0 / _MB if self._rss0 is not None else np.nan,
+            "rss_peak_mb": self._rss_peak / _MB if self._rss_peak is not None else np.nan,
+            "rss_max_mb": max_rss_bytes() / _MB if resource is not None else np.nan,
+        }
+        if self.trace:
+            _, peak = tracemalloc.get_traced_memory()
+            out["traced_peak_mb"] = peak / _MB
+            out["bytes_per_agent"] = max(peak - self._traced0, 0) / population
+            out["bytes_source"] = "tracemalloc"
+            out["top_allocs"] = self._top_allocs()
+            if self._own_trace:
+                tracemalloc.stop()
+                self._own_trace = False
+        else:
+            grown = (self._rss_peak - self._rss0) if self._rss0 is not None else np.nan
+            out["bytes_per_agent"] = grown / population
+            out["bytes_source"] = "rss"
+        return out
+
+    def _top_allocs(self):
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        top = []
+        for stat in snap.statistics("lineno")[:self.top]:
+            frame = stat.traceback[0]
+            top.append({"where": f"{frame.filename}:{frame.lineno}", "kb": stat.size / 1024.0,
+                        "blocks": stat.count})
+        return top
+
+
+def flat_perf(perf, prefix="perf_"):
+    """Campos escalares de un metrics["perf"] con prefijo (para filas de CSV / DataFrame)."""
+    return {f"{prefix}{k}": v for k, v in (perf or {}).items() if not isinstance(v, (list, dict))}
+
+
+def summarize_perf(rows, by=()):
+    """
+    rows: dicts con las columnas de 'by' (configuración) y un "perf" (el de
+    metrics["perf"]). Devuelve un DataFrame por configuración con runs y, por
+    cada campo de PERF_FIELDS, su promedio (<campo>_mean) y máximo (<campo>_max).
+    """
+    import pandas as pd
+
+    by = list(by)
+    flat = [{**{k: r[k] for k in by}, **flat_perf(r.get("perf"), prefix="")} for r in rows if r.get("perf")]
+    if not flat:
+        return pd.DataFrame(columns=by + ["runs"])
+    df = pd.DataFrame(flat)
+    fields = [f for f in PERF_FIELDS if f in df.columns]
+    agg = {"runs": ("wall_s", "size")}
+    for f in fields:
+        agg[f"{f}_mean"] = (f, "mean")
+        agg[f"{f}_max"] = (f, "max")
+    if by:
+        return df.groupby(by, dropna=False, sort=False).agg(**agg).reset_index()
+    return pd.DataFrame([{"runs": len(df), **{k: getattr(df[col], fn)() for k, (col, fn) in agg.items()
+                                              if k != "runs"}}])
@@ -0,0 +1,131 @@
+"""
+Mezcla de tipos de persona y muestreo de sus atributos.
+
+PopulationParams reúne las proporciones por tipo y los rangos de edad,
+velocidad, pánico y cumplimiento (antes fijos en EvacuationModel.__init__),
+para poder variarlos en experimentos y análisis de sensibilidad.
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class TipoParams:
+    """Atributos de un tipo de persona; los rangos son (min, max) uniformes."""
+    nombre: str
+    proporcion: float
+    edad: tuple           # años, enteros [min, max]
+    v_base: tuple         # m/s
+    p_familiaridad: float
+    pánico: tuple
+    cumplimiento: tuple
+    movilidad_reducida: bool = False
+
+
+DEFAULT_TIPOS = (
+    TipoParams("niño",         0.15, (5, 12),  (0.8, 1.0), 0.20, (0.2, 0.6), (0.3, 0.7)),
+    TipoParams("adulto",       0.70, (13, 59), (1.2, 1.4), 0.70, (0.1, 0.4), (0.7, 1.0)),
+    TipoParams("adulto_mayor", 0.12, (60, 85), (0.6, 0.9), 0.40, (0.3, 0.7), (0.5, 0.9)),
+    TipoParams("discapacidad", 0.03, (20, 70), (0.3, 0.6), 0.50, (0.4, 0.8), (0.3, 0.8), True),
+)
+
+
+@dataclass(frozen=True)
+class PopulationParams:
+    """
+    Distribución de la población. Las proporciones se normalizan al muestrear,
+    así que no necesitan sumar 1.
+    """
+    tipos: tuple = DEFAULT_TIPOS
+
+    @property
+    def names(self):
+        return tuple(t.nombre for t in self.tipos)
+
+    def shares(self):
+        p = np.array([t.proporcion for t in self.tipos], dtype=float)
+        return p / p.sum()
+
+    def thresholds(self):
+        """Umbrales acumulados para elegir tipo con un uniforme r (el último es 'else')."""
+        return np.cumsum(self.shares())[:-1].tolist()
+
+    def tipo(self, nombre):
+        for t in self.tipos:
+            if t.nombre == nombre:
+                return t
+        raise KeyError(nombre)
+
+    def with_factors(self, values):
+        """
+        Copia con factores cambiados. values: {"campo.tipo": valor}, donde campo es
+        - proporcion / p_familiaridad: valor directo
+        - v_base / pánico / cumplimiento: centro del rango (se conserva su ancho)
+        """
+        tipos = {t.nombre: t for t in self.tipos}
+        for name, value in values.items():
+            field, nombre = name.split(".", 1)
+            t = tipos[nombre]
+            if field in ("proporcion", "p_familiaridad"):
+                tipos[nombre] = replace(t, **{field: float(value)})
+            elif field in ("v_base", "pánico", "cumplimiento"):
+                lo, hi = getattr(t, field)
+                half = (hi - lo) / 2.0
+                floor, ceil = (0.05, np.inf) if field == "v_base" else (0.0, 1.0)
+                lo, hi = max(floor, value - half), min(ceil, value + half)
+                tipos[nombre] = replace(t, **{field: (float(lo), float(hi))})
+            else:
+                raise KeyError(f"Factor desconocido: {name}")
+        return PopulationParams(tuple(tipos[t.nombre] for t in self.tipos))
+
+    def to_dict(self):
+        return {t.nombre: {k: getattr(t, k) for k in t.__dataclass_fields__ if k != "nombre"} for t in self.tipos}
+
+
+DEFAULT_POPULATION = PopulationParams()
+
+# Compatibilidad: nombres de los tipos por defecto (códigos = índices)
+TIPO_NAMES = DEFAULT_POPULATION.names
+
+
+def v_cells_per_step(v_base):
+    """
+    Velocidad (m/s) → celdas/tick (1 celda = 0.5 m, Δt = 0.1 s): v * 0.2,
+    truncado y acotado a 1–3 celdas/step.
+    """
+    return np.clip((np.asarray(v_base) * 0.2).astype(int), 1, 3)
+
+
+def sample_attributes(rng, size, params=None):
+    """
+    Muestrea atributos para 'size' personas (int o tupla, p. ej. (K, N)).
+    rng: np.random.Generator. Devuelve dict de arrays con forma 'size';
+    "tipo" es el código (índice en params.names).
+    """
+    params = params or DEFAULT_POPULATION
+    tipos = params.tipos
+    code = np.searchsorted(np.array(params.thresholds()), rng.random(size), side="right")
+
+    def per_tipo(field):
+        return np.array([getattr(t, field) for t in tipos])
+
+    edad_lo, edad_hi = per_tipo("edad").T
+    v_lo, v_hi = per_tipo("v_base").T
+    pan_lo, pan_hi = per_tipo("pánico").T
+    cum_lo, cum_hi = per_tipo("cumplimiento").T
+
+    def uniform(lo, hi):
+        return lo[code] + (hi[code] - lo[code]) * rng.random(size)
+
+    v_base = uniform(v_lo, v_hi)
+    return {
+        "tipo": code,
+        "edad": rng.integers(edad_lo[code], edad_hi[code] + 1),
+        "v_base": v_base,
+        "v_cells": v_cells_per_step(v_base),
+        "familiaridad": rng.random(size) < per_tipo("p_familiaridad")[code],
+        "pánico": uniform(pan_lo, pan_hi),
+        "cumplimiento": uniform(cum_lo, cum_hi),
+        "movilidad_reducida": per_tipo("movilidad_reducida").astype(bool)[code],
+    }
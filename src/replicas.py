@@ -0,0 +1,235 @@
+"""
+Réplicas con parada secuencial adaptativa.
+
+En vez de fijar a ojo cuántas semillas correr, las réplicas se lanzan por
+olas en un pool de procesos. Tras cada ola se actualizan media y varianza
+(Welford) de las métricas pedidas y su intervalo de confianza t de Student;
+se para cuando todas alcanzan la precisión relativa pedida
+(semiancho / |media| <= rel_precision) o se agota el presupuesto de corridas
+o de tiempo. El tamaño de cada ola se estima con la varianza observada.
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from .perf import flat_perf, summarize_perf
+
+REPLICA_SCENARIOS = ("baseline", "bloqueo")
+
+
+EXACT_T_DOF = 30  # hasta acá t_critical invierte la distribución exacta
+
+
+def _t_abs_cdf(t, dof):
+    """
+    P(|T| <= t) para T ~ t de Student con dof entero >= 1 (fórmula cerrada,
+    Abramowitz-Stegun 26.7.3-4, con θ = atan(t / sqrt(dof))).
+    """
+    theta = math.atan(t / math.sqrt(dof))
+    c2 = math.cos(theta) ** 2
+    term = total = 1.0
+    if dof % 2:
+        if dof == 1:
+            return 2.0 * theta / math.pi
+        for k in range(1, (dof - 1) // 2):
+            term *= c2 * (2 * k) / (2 * k + 1)
+            total += term
+        return 2.0 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    for k in range(1, dof // 2):
+        term *= c2 * (2 * k - 1) / (2 * k)
+        total += term
+    return math.sin(theta) * total
+
+
+def t_critical(dof, confidence=0.95):
+    """
+    Cuantil bilateral de la t de Student, sin depender de scipy. Para
+    dof <= EXACT_T_DOF invierte la distribución exacta por bisección (error
+    < 1e-9); más arriba usa la expansión de Cornish-Fisher sobre la normal
+    (error < 1e-6 para confianza <= 0.99 y dof > 30). Las réplicas con
+    pocas corridas dependen de que los IC no queden angostos.
+    """
+    if dof <= 0:
+        return np.inf
+    if dof <= EXACT_T_DOF:
+        dof = int(dof)
+        hi = 1.0
+        while _t_abs_cdf(hi, dof) < confidence:
+            hi *= 2.0
+        lo = 0.0
+        for _ in range(100):
+            mid = 0.5 * (lo + hi)
+            if _t_abs_cdf(mid, dof) < confidence:
+                lo = mid
+            else:
+                hi = mid
+            if hi - lo < 1e-12 * hi:
+                break
+        return 0.5 * (lo + hi)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    g1 = (z ** 3 + z) / 4.0
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96.0
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384.0
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160.0
+    return z + g1 / dof + g2 / dof ** 2 + g3 / dof ** 3 + g4 / dof ** 4
+
+
+class RunningStat:
+    """Media y varianza en línea (Welford); ignora valores no finitos."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, x):
+        x = float(x)
+        if not np.isfinite(x):
+            return
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self._m2 += d * (x - self.mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    def half_width(self, confidence=0.95):
+        if self.n < 2:
+            return np.inf
+        return t_critical(self.n - 1, confidence) * self.std / math.sqrt(self.n)
+
+    def rel_precision(self, confidence=0.95):
+        """Semiancho del IC relativo a |media| (inf si no se puede estimar)."""
+        hw = self.half_width(confidence)
+        if self.n < 2 or self.mean == 0:
+            return 0.0 if hw == 0 else np.inf
+        return hw / abs(self.mean)
+
+
+def _run_replica(kind, params, seed, metrics):
+    """
+    Una réplica en un proceso trabajador; devuelve sólo las métricas pedidas
+    (y metrics["perf"], si params lo pide, bajo la clave "perf").
+    """
+    from . import scenarios
+    met = getattr(scenarios, kind)(seed=seed, **params)[3]
+    out = {m: float(met.get(m, np.nan)) for m in metrics}
+    if "perf" in met:
+        out["perf"] = met["perf"]
+    return out
+
+
+def _next_wave(stats, metrics, rel_precision, confidence, done, workers, max_runs):
+    """
+    Corridas de la próxima ola: las que faltan según la varianza observada
+    (n * (precisión actual / pedida)^2) para la métrica más lejos de la meta,
+    al menos 'workers', a lo sumo las ya hechas (la varianza de una ola piloto
+    chica es ruidosa) y sin pasar el presupuesto.
+    """
+    need = 0
+    for m in metrics:
+        s = stats[m]
+        rp = s.rel_precision(confidence)
+        if s.n < 2 or not np.isfinite(rp):
+            need = max(need, workers)
+        elif rp > rel_precision:
+            need = max(need, math.ceil(s.n * (rp / rel_precision) ** 2) - s.n)
+    return max(0, min(max(need, workers), max(done, workers), max_runs - done))
+
+
+def run_replicas(kind="baseline", params=None, metrics=("makespan", "p90"), rel_precision=0.05,
+                 confidence=0.95, min_runs=5, max_runs=200, max_seconds=None, workers=None,
+                 base_seed=0, progress=None, perf=False):
+    """
+    Corre réplicas de scenarios.<kind>(seed=base_seed + i, **params) hasta que
+    todas las 'metrics' tengan IC con semiancho <= rel_precision * |media|
+    (con al menos min_runs corridas válidas), o se alcance max_runs o max_seconds.
+    La primera ola es de max(min_runs, workers) corridas.
+    progress: callable opcional que recibe el resumen (dict) tras cada ola.
+    perf: True / "trace" mide los recursos de cada réplica (ver perf.py).
+    Devuelve dict con:
+    - "runs": corridas usadas, "waves": tamaño de cada ola
+    - "stopped": "precision", "budget" o "time"
+    - "summary": DataFrame por métrica (n, mean, std, ci_low, ci_high,
+      half_width, rel_precision, target_met)
+    - "per_run": DataFrame con seed + métricas de cada réplica (con perf,
+      también las columnas perf_*)
+    - "perf" (con perf): perf.summarize_perf de todas las réplicas
+    """
+    if kind not in REPLICA_SCENARIOS:
+        raise ValueError(f"Escenario sin réplicas: {kind} (use uno de {REPLICA_SCENARIOS})")
+    params = dict(params or {})
+    params.pop("seed", None)
+    if perf:
+        params["perf"] = perf
+    metrics = list(metrics)
+    workers = workers or os.cpu_count() or 1
+    min_runs = max(2, min_runs)
+
+    stats = {m: RunningStat() for m in metrics}
+    rows, waves, perf_rows = [], [], []
+    t0 = time.perf_counter()
+    stopped = "budget"
+
+    def summary():
+        out = []
+        for m in metrics:
+            s = stats[m]
+            hw = s.half_width(confidence)
+            rp = s.rel_precision(confidence)
+            out.append({
+                "metric": m, "n": s.n,
+                "mean": s.mean if s.n else np.nan, "std": s.std,
+                "ci_low": s.mean - hw if s.n else np.nan, "ci_high": s.mean + hw if s.n else np.nan,
+                "half_width": hw, "rel_precision": rp,
+                "target_met": bool(s.n >= min_runs and rp <= rel_precision),
+            })
+        return pd.DataFrame(out)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        wave = min(max(min_runs, workers), max_runs)
+        while wave > 0:
+            seeds = range(base_seed + len(rows), base_seed + len(rows) + wave)
+            futures = [pool.submit(_run_replica, kind, params, s, metrics) for s in seeds]
+            for s, fut in zip(seeds, futures):
+                res = fut.result()
+                perf_rows.append({"perf": res.pop("perf", None)})
+                rows.append({"seed": s, **res, **flat_perf(perf_rows[-1]["perf"])})
+                for m in metrics:
+                    stats[m].add(res[m])
+            waves.append(wave)
+
+            table = summary()
+            if progress is not None:
+                progress({"runs": len(rows), "waves": len(waves), "elapsed": time.perf_counter() - t0,
+                          "summary": table})
+            if table["target_met"].all():
+                stopped = "precision"
+                break
+            if max_seconds is not None and time.perf_counter() - t0 >= max_seconds:
+                stopped = "time"
+                break
+            wave = _next_wave(stats, metrics, rel_precision, confidence, len(rows), workers, max_runs)
+
+    perf_cols = [c for c in (rows[0] if rows else ()) if c.startswith("perf_")]
+    result = {
+        "kind": kind,
+        "runs": len(rows),
+        "waves": waves,
+        "stopped": stopped,
+        "rel_precision_target": rel_precision,
+        "confidence": confidence,
+        "elapsed": time.perf_counter() - t0,
+        "summary": summary(),
+        "per_run": pd.DataFrame(rows, columns=["seed"] + metrics + perf_cols),
+    }
+    if perf:
+        result["perf"] = summarize_perf(perf_rows)
+    return result
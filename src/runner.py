@@ -0,0 +1,186 @@
+"""
+Ejecución de escenarios (baseline / bloqueo / anchos) en un proceso aparte.
+
+El proceso trabajador reporta progreso parcial por una cola; quien lo lanzó
+(p. ej. la app Streamlit) hace poll() sin bloquearse y puede cancelar la
+corrida. La cola, la deduplicación y el límite de procesos están en jobs.py.
+"""
+import hashlib
+import json
+import multiprocessing as mp
+import queue
+import time
+import traceback
+
+SCENARIOS = ("baseline", "bloqueo", "anchos")
+
+
+class RunCancelled(Exception):
+    """Se lanza dentro del trabajador cuando se pidió cancelar la corrida."""
+
+
+def params_key(kind, params, snapshots=False):
+    """Hash estable de (escenario, parámetros) para deduplicar corridas."""
+    raw = json.dumps({"kind": kind, "params": params, "snapshots": snapshots}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def run_scenario(kind, params, progress=None, progress_every=50, snapshots=False):
+    """
+    Corre el escenario en este proceso. Devuelve (resultado, snapshots
+    decimados o None); progress recibe progress_info(...) como en run_model.
+    """
+    from . import scenarios
+
+    if kind not in SCENARIOS:
+        raise ValueError(f"Escenario desconocido: {kind}")
+    fn = getattr(scenarios, kind)
+    extra = {}
+    recorder = None
+    if snapshots and kind != "anchos":
+        from .snapshots import SnapshotRecorder
+        recorder = SnapshotRecorder()
+        extra["recorder"] = recorder
+    result = fn(**params, progress=progress, progress_every=progress_every, **extra)
+    # La decimación se hace aquí: al proceso padre sólo llega el payload acotado
+    return result, recorder.view() if recorder is not None else None
+
+
+def _worker(kind, params, q, cancel_event, progress_every, snapshots):
+    def progress(info):
+        if cancel_event.is_set():
+            raise RunCancelled()
+        q.put(("progress", info))
+
+    try:
+        q.put(("done", run_scenario(kind, params, progress, progress_every, snapshots)))
+    except RunCancelled:
+        q.put(("cancelled", None))
+    except Exception:
+        q.put(("error", traceback.format_exc()))
+
+
+class BackgroundRun:
+    """
+    Una corrida en un proceso trabajador.
+    status: "queued" (start=False, aún sin proceso) | "running" | "done" | "cancelled" | "error"
+    points: {variant: [(t, pct), ...]} curva parcial (variant=None salvo en anchos)
+    last: último reporte de progreso (ver metrics.progress_info)
+    floor_view: snapshots decimados (si snapshots=True; ver snapshots.decimate)
+    """
+    def __init__(self, kind, params, progress_every=50, snapshots=False, start=True):
+        if kind not in SCENARIOS:
+            raise ValueError(f"Escenario desconocido: {kind}")
+        self.kind = kind
+        self.params = dict(params)
+        self.key = params_key(kind, self.params, snapshots)
+        self.progress_every = progress_every
+        self.snapshots = snapshots
+        self.status = "queued"
+        self.points = {}
+        self.last = {}
+        self.result = None
+        self.floor_view = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._process = None
+        if start:
+            self.start()
+
+    def start(self):
+        """Lanza el proceso trabajador (una sola vez)."""
+        if self.status != "queued":
+            return
+        # spawn: no heredar hilos/locks del proceso padre (Streamlit es multihilo)
+        ctx = mp.get_context("spawn")
+        self._queue = ctx.Queue()
+        self._cancel = ctx.Event()
+        self._process = ctx.Process(
+            target=_worker,
+            args=(self.kind, self.params, self._queue, self._cancel, self.progress_every, self.snapshots),
+            daemon=True,
+        )
+        self._process.start()
+        self.status = "running"
+        self.started = time.time()
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    @property
+    def pending(self):
+        """En cola o corriendo."""
+        return self.status in ("queued", "running")
+
+    def overall_pct(self):
+        """Avance global (0..100) en steps, contando variantes de anchos."""
+        info = self.last
+        if not info:
+            return 0.0
+        frac = info["steps"] / max(info["max_steps"], 1)
+        n = info.get("variants", 1)
+        return (info.get("variant_index", 0) + frac) / n * 100.0
+
+    def eta(self):
+        """Segundos restantes estimados (todas las variantes), o nan."""
+        info = self.last
+        if not info or not info.get("ticks_per_s"):
+            return float("nan")
+        remaining_variants = info.get("variants", 1) - info.get("variant_index", 0) - 1
+        return info["eta_s"] + remaining_variants * info["max_steps"] / info["ticks_per_s"]
+
+    def poll(self):
+        """Consume los mensajes pendientes sin bloquear. Devuelve status."""
+        if self._process is None:
+            return self.status
+        while True:
+            try:
+                msg, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._handle(msg, payload)
+
+        if self.running and not self._process.is_alive():
+            # puede haber un último mensaje en tránsito
+            try:
+                msg, payload = self._queue.get(timeout=1.0)
+                self._finish(msg, payload)
+            except queue.Empty:
+                self._finish("error", f"El proceso terminó sin resultado (exitcode={self._process.exitcode}).")
+        return self.status
+
+    def _handle(self, msg, payload):
+        if msg == "progress":
+            self.last = payload
+            self.points.setdefault(payload.get("variant"), []).append((payload["t"], payload["pct"]))
+        else:
+            self._finish(msg, payload)
+
+    def _finish(self, msg, payload):
+        if not self.pending:
+            return
+        self.status = msg
+        if msg == "done":
+            self.result, self.floor_view = payload
+        elif msg == "error":
+            self.error = payload
+        self.finished = time.time()
+        if self._process is not None:
+            self._process.join(timeout=1.0)
+
+    def cancel(self, grace=2.0):
+        """Cancela cooperativamente; si no responde en 'grace' s, termina el proceso."""
+        if self.status == "queued":
+            self._finish("cancelled", None)
+        if not self.running:
+            return
+        self._cancel.set()
+        self._process.join(timeout=grace)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self.poll()
+        if self.running:
+            self._finish("cancelled", None)
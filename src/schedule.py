@@ -0,0 +1,148 @@
+"""
+Scheduler de conjunto activo para EvacuationModel (scheduler="active").
+
+Con RandomActivation cada tick baraja y activa a toda la población, aunque
+en régimen la mayoría está WAITING y su step() sólo vuelve, salvo:
+- si su salida objetivo deja de existir (cambia model.exits_generation), o
+- la re-evaluación por pánico (pánico > 0.7: probabilidad 0.05 por tick).
+
+Acá las personas WAITING salen del conjunto activo. El pánico se resuelve
+sorteando de antemano el tick del próximo re-chequeo (geométrica con
+p = 0.05, igual distribución que el Bernoulli por tick); un cambio de
+salidas despierta a todas (también a las que se liberan desde fuera tras
+model.remove_exit, como en events.ExitClosure). Quien está en
+pre-movimiento (IDLE, events.StaggeredRelease) también duerme hasta que el
+modelo lo libera (hold / release). El costo por tick crece con las personas
+en movimiento, no con la población.
+
+Diferencia de orden: las salidas se activan primero (barajadas entre sí) y
+luego las personas activas barajadas; con RandomActivation salidas y
+personas se intercalan al azar. Las corridas no son idénticas bit a bit a
+las de RandomActivation, pero sí equivalentes en distribución.
+"""
+import heapq
+import math
+
+from .agents import ExitAgent, WAITING, PANIC_RECHECK_P, PANIC_RECHECK_MIN
+
+
+class ActiveSetScheduler:
+    """
+    Interfaz compatible con mesa.time.RandomActivation en lo que usa el
+    proyecto: steps, time, add, remove, step, agents, get_agent_count.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.steps = 0
+        self.time = 0
+        self.exits = {}       # ExitAgent -> None (dict: orden de inserción)
+        self.active = {}      # personas a activar en el próximo tick
+        self.waiting = {}     # persona WAITING dormida -> tick de re-chequeo (inf: ninguno)
+        self.idle = {}        # personas en pre-movimiento (no se activan hasta release)
+        self._wake = []       # heap (tick, seq, persona); entradas viejas se ignoran
+        self._seq = 0
+        self._generation = getattr(model, "exits_generation", 0)
+
+    # ------------------------------------------------
+    def add(self, agent):
+        if agent in self.exits or agent in self.active or agent in self.waiting or agent in self.idle:
+            raise ValueError("agent already added to scheduler")
+        if isinstance(agent, ExitAgent):
+            self.exits[agent] = None
+        else:
+            self.active[agent] = None
+
+    def remove(self, agent):
+        for group in (self.active, self.waiting, self.idle, self.exits):
+            if agent in group:
+                del group[agent]
+                return
+        raise KeyError(agent)
+
+    @property
+    def agents(self):
+        return [*self.exits, *self.active, *self.waiting, *self.idle]
+
+    def get_agent_count(self):
+        return len(self.exits) + len(self.active) + len(self.waiting) + len(self.idle)
+
+    @property
+    def moving_count(self):
+        return len(self.active)
+
+    # ------------------------------------------------
+    def _sleep(self, agent):
+        """Pasa una persona WAITING al conjunto dormido con su próximo re-chequeo."""
+        wake = math.inf
+        if agent.pánico > PANIC_RECHECK_MIN:
+            # ticks hasta el primer éxito de un Bernoulli(p) por tick: geométrica >= 1
+            u = 1.0 - self.model.random.random()
+            wake = self.steps + 1 + int(math.log(u) / math.log(1.0 - PANIC_RECHECK_P))
+            heapq.heappush(self._wake, (wake, self._seq, agent))
+            self._seq += 1
+        self.waiting[agent] = wake
+
+    def hold(self, agents):
+        """Saca personas del conjunto activo hasta release() (pre-movimiento)."""
+        for a in agents:
+            self.active.pop(a, None)
+            self.waiting.pop(a, None)
+            self.idle[a] = None
+
+    def release(self, agents):
+        for a in agents:
+            if a in self.idle:
+                del self.idle[a]
+                self.active[a] = None
+
+    def _wake_all(self):
+        self.active.update(dict.fromkeys(self.waiting))
+        self.waiting.clear()
+        self._wake.clear()
+
+    # ------------------------------------------------
+    def step(self):
+        model = self.model
+        rnd = model.random
+
+        exits = list(self.exits)
+        rnd.shuffle(exits)
+        for ex in exits:
+            ex.step()
+
+        # cambio de salidas: todas las personas vuelven a validar su objetivo
+        gen = getattr(model, "exits_generation", 0)
+        if gen != self._generation:
+            self._generation = gen
+            self._wake_all()
+
+        # re-chequeos por pánico que vencen este tick
+        due = []
+        while self._wake and self._wake[0][0] <= self.steps:
+            wake, _, agent = heapq.heappop(self._wake)
+            if self.waiting.get(agent) == wake:
+                del self.waiting[agent]
+                due.append(agent)
+
+        persons = list(self.active) + due
+        rnd.shuffle(persons)
+        recheck = set(due)
+        for agent in persons:
+            if agent.evacuated:
+                continue
+            if agent in recheck:
+                if agent.state == WAITING:
+                    agent.recheck()
+                    if agent.state == WAITING:
+                        self._sleep(agent)
+                        continue
+                self.active[agent] = None
+            else:
+                agent.step()
+                if agent.state == WAITING and agent in self.active:
+                    del self.active[agent]
+                    self._sleep(agent)
+
+        self.steps += 1
+        self.time += 1
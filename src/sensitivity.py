@@ -0,0 +1,285 @@
+"""
+Análisis de sensibilidad global sobre la distribución de la población.
+
+Los factores son campos de PopulationParams ("proporcion.niño", "pánico.adulto",
+...). Diseños: Latin hypercube + índices de Sobol (S1 de Saltelli 2010, ST de
+Jansen) o trayectorias de Morris (mu*, sigma). Cada punto del diseño se corre
+en paralelo (ProcessPoolExecutor) y su resultado se cachea en disco por hash
+de (factores, configuración), así que repetir o ampliar un estudio sólo corre
+los puntos nuevos.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .population import DEFAULT_POPULATION
+
+# Parte de la clave de caché: subir si cambia lo que produce un punto (2: una
+# corrida batched por punto; antes dependía del resto del bloque)
+CACHE_VERSION = 2
+
+
+@dataclass(frozen=True)
+class Factor:
+    """Factor de entrada con rango uniforme [lo, hi]."""
+    name: str
+    lo: float
+    hi: float
+
+
+def default_factors(params=DEFAULT_POPULATION):
+    """
+    Proporción (±50 %) y centro del pánico (±0.15) de cada tipo: los atributos
+    que hoy cambian la dinámica. No se incluyen (sus índices serían 0 por
+    construcción y gastarían corridas): cumplimiento, que ninguna regla de
+    decisión lee, y v_base, porque population.v_cells_per_step trunca
+    v * 0.2 a 1 celda/tick para toda velocidad realista. Se pueden pasar a
+    mano como Factor("v_base.<tipo>", lo, hi) cuando el modelo los use.
+    """
+    factors = []
+    for t in params.tipos:
+        n = t.nombre
+        factors.append(Factor(f"proporcion.{n}", 0.5 * t.proporcion, 1.5 * t.proporcion))
+        c = sum(t.pánico) / 2
+        factors.append(Factor(f"pánico.{n}", max(0.0, c - 0.15), min(1.0, c + 0.15)))
+    return factors
+
+
+def default_outputs(params=DEFAULT_POPULATION):
+    return ["makespan", "p90"] + [f"p90_{n}" for n in params.names]
+
+
+# ------------------------------------------------
+# Diseños (en el hipercubo unitario)
+# ------------------------------------------------
+def latin_hypercube(n, d, rng):
+    """n puntos en [0, 1)^d, un punto por estrato en cada dimensión."""
+    strata = rng.permuted(np.tile(np.arange(n), (d, 1)), axis=1).T
+    return (strata + rng.random((n, d))) / n
+
+
+def sobol_design(n, d, rng):
+    """Matrices A, B (LHS) y AB_j (A con la columna j de B): n * (d + 2) filas."""
+    A = latin_hypercube(n, d, rng)
+    B = latin_hypercube(n, d, rng)
+    blocks = [A, B]
+    for j in range(d):
+        AB = A.copy()
+        AB[:, j] = B[:, j]
+        blocks.append(AB)
+    return np.vstack(blocks)
+
+
+def sobol_indices(y, n, d, n_boot=200, rng=None):
+    """
+    S1 (Saltelli 2010) y ST (Jansen) con intervalos bootstrap al 95 %.
+    Las filas con NaN en cualquier bloque se descartan.
+    """
+    rng = rng or np.random.default_rng(0)
+    y = np.asarray(y, dtype=float)
+    fA, fB = y[:n], y[n:2 * n]
+    fAB = y[2 * n:].reshape(d, n)
+    ok = np.isfinite(fA) & np.isfinite(fB) & np.isfinite(fAB).all(axis=0)
+    fA, fB, fAB = fA[ok], fB[ok], fAB[:, ok]
+    m = ok.sum()
+    if m < 2:
+        nan = np.full(d, np.nan)
+        return {"S1": nan, "S1_conf": nan, "ST": nan, "ST_conf": nan, "n_valid": int(m)}
+
+    def estimate(idx):
+        a, b, ab = fA[idx], fB[idx], fAB[:, idx]
+        var = np.var(np.concatenate([a, b]), ddof=1)
+        if var <= 0:
+            return np.zeros(d), np.zeros(d)
+        s1 = np.mean(b * (ab - a), axis=1) / var
+        st = 0.5 * np.mean((a - ab) ** 2, axis=1) / var
+        return s1, st
+
+    s1, st = estimate(np.arange(m))
+    boots = [estimate(rng.integers(0, m, m)) for _ in range(n_boot)]
+    s1_b = np.array([b[0] for b in boots])
+    st_b = np.array([b[1] for b in boots])
+    return {
+        "S1": s1, "S1_conf": 1.96 * s1_b.std(axis=0),
+        "ST": st, "ST_conf": 1.96 * st_b.std(axis=0),
+        "n_valid": int(m),
+    }
+
+
+def morris_design(r, d, rng, levels=4):
+    """
+    r trayectorias de d + 1 puntos sobre una grilla de 'levels' niveles.
+    Devuelve (X (r * (d + 1), d), factor cambiado en cada paso, delta con signo).
+    """
+    delta = levels / (2.0 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+    X, changed, deltas = [], [], []
+    for _ in range(r):
+        x = rng.choice(grid[grid + delta <= 1 + 1e-12], size=d)
+        X.append(x.copy())
+        for j in rng.permutation(d):
+            step = delta if rng.random() < 0.5 else -delta
+            if not (0 <= x[j] + step <= 1 + 1e-12):
+                step = -step
+            x[j] += step
+            X.append(x.copy())
+            changed.append(j)
+            deltas.append(step)
+    return np.array(X), np.array(changed), np.array(deltas)
+
+
+def morris_indices(y, d, changed, deltas):
+    """Efectos elementales: mu, mu* (media de |EE|) y sigma por factor."""
+    y = np.asarray(y, dtype=float).reshape(-1, d + 1)
+    ee = (np.diff(y, axis=1) / deltas.reshape(-1, d))
+    by_factor = [ee.ravel()[changed == j] for j in range(d)]
+    by_factor = [e[np.isfinite(e)] for e in by_factor]
+    return {
+        "mu": np.array([e.mean() if e.size else np.nan for e in by_factor]),
+        "mu_star": np.array([np.abs(e).mean() if e.size else np.nan for e in by_factor]),
+        "sigma": np.array([e.std(ddof=1) if e.size > 1 else np.nan for e in by_factor]),
+    }
+
+
+# ------------------------------------------------
+# Evaluación paralela con caché
+# ------------------------------------------------
+def _point_key(values, settings):
+    raw = json.dumps({"values": {k: round(float(v), 12) for k, v in values.items()}, "settings": settings,
+                      "cache": CACHE_VERSION}, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _outputs(metrics, outputs):
+    return {k: float(metrics.get(k, np.nan)) for k in outputs}
+
+
+def _eval_chunk(points, settings, outputs):
+    """
+    Corre un bloque de puntos (en un proceso trabajador); promedia sobre las
+    semillas. Con engine="batched" cada punto es su propia corrida vectorizada
+    (las réplicas de una corrida comparten generador): así el resultado de un
+    punto depende sólo de (punto, semillas), no de con quién cae en el bloque,
+    y la caché y los números aleatorios comunes entre puntos valen.
+    """
+    pops = [DEFAULT_POPULATION.with_factors(v) for v in points]
+    seeds = settings["seeds"]
+    common = dict(N=settings["N"], width=settings["width"], height=settings["height"],
+                  num_exits=settings["num_exits"], max_steps=settings["max_steps"])
+
+    if settings["engine"] == "batched":
+        from .batched import run_batched
+        metrics = [r[3] for p in pops for r in run_batched(seeds, population=p, **common)]
+    else:
+        from .scenarios import baseline
+        metrics = [baseline(seed=s, model_kwargs={"population": p}, **common)[3] for p in pops for s in seeds]
+
+    out = []
+    for i in range(len(pops)):
+        rows = [_outputs(m, outputs) for m in metrics[i * len(seeds):(i + 1) * len(seeds)]]
+        out.append({k: float(np.nanmean([r[k] for r in rows])) if any(np.isfinite(r[k]) for r in rows)
+                    else np.nan for k in outputs})
+    return out
+
+
+def evaluate(points, settings, outputs, workers=None, cache_dir=None, chunk_size=16):
+    """
+    points: lista de {factor: valor}. Devuelve (DataFrame de salidas, n_cacheados).
+    Los puntos ya presentes en cache_dir no se vuelven a correr.
+    """
+    keys = [_point_key(p, settings) for p in points]
+    results = [None] * len(points)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        for i, k in enumerate(keys):
+            path = os.path.join(cache_dir, f"{k}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    cached = json.load(f)
+                if all(o in cached for o in outputs):
+                    results[i] = {o: cached[o] for o in outputs}
+    n_cached = sum(r is not None for r in results)
+
+    # deduplicar puntos idénticos (p. ej. trayectorias de Morris que se cruzan)
+    pending = {}
+    for i, k in enumerate(keys):
+        if results[i] is None:
+            pending.setdefault(k, []).append(i)
+    todo = list(pending)
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_eval_chunk, [points[pending[k][0]] for k in c], settings, outputs)
+                       for c in chunks]
+            for c, fut in zip(chunks, futures):
+                for k, res in zip(c, fut.result()):
+                    for i in pending[k]:
+                        results[i] = res
+                    if cache_dir:
+                        with open(os.path.join(cache_dir, f"{k}.json"), "w") as f:
+                            json.dump(res, f)
+
+    return pd.DataFrame(results, columns=outputs), n_cached
+
+
+def run_sensitivity(method="sobol", n=64, factors=None, outputs=None, engine="batched",
+                    N=300, width=25, height=25, num_exits=3, seeds=(42,), max_steps=2000,
+                    workers=None, cache_dir=None, rng_seed=0):
+    """
+    method: "sobol" (n * (d + 2) corridas) o "morris" (n trayectorias, n * (d + 1)).
+    engine: "batched" (src/batched.py, rápido) o "mesa" (scenarios.baseline).
+    El modelo es estocástico: todos los puntos usan las mismas semillas
+    (números aleatorios comunes) y con varias semillas se promedian, lo que
+    reduce el ruido que infla los índices.
+    Devuelve dict con "indices" (DataFrame: output, factor, índices),
+    "design" (valores de factores + salidas), "points" (puntos del diseño)
+    y "cached" (cuántos salieron de la caché).
+    """
+    factors = factors or default_factors()
+    outputs = outputs or default_outputs()
+    d = len(factors)
+    rng = np.random.default_rng(rng_seed)
+
+    if method == "sobol":
+        U = sobol_design(n, d, rng)
+    elif method == "morris":
+        U, changed, deltas = morris_design(n, d, rng)
+    else:
+        raise ValueError(f"Método desconocido: {method}")
+
+    lo = np.array([f.lo for f in factors])
+    hi = np.array([f.hi for f in factors])
+    X = lo + U * (hi - lo)
+    names = [f.name for f in factors]
+    points = [dict(zip(names, row)) for row in X]
+
+    settings = {"engine": engine, "N": N, "width": width, "height": height, "num_exits": num_exits,
+                "seeds": list(seeds), "max_steps": max_steps}
+    Y, n_cached = evaluate(points, settings, outputs, workers=workers, cache_dir=cache_dir)
+
+    rows = []
+    for out in outputs:
+        if method == "sobol":
+            idx = sobol_indices(Y[out].to_numpy(), n, d, rng=rng)
+            cols = ("S1", "S1_conf", "ST", "ST_conf")
+        else:
+            # efectos en unidades de la salida por rango completo del factor
+            idx = morris_indices(Y[out].to_numpy(), d, changed, deltas)
+            cols = ("mu", "mu_star", "sigma")
+        for j, name in enumerate(names):
+            rows.append({"output": out, "factor": name, **{c: idx[c][j] for c in cols}})
+
+    design = pd.concat([pd.DataFrame(X, columns=names), Y], axis=1)
+    return {
+        "method": method,
+        "indices": pd.DataFrame(rows),
+        "design": design,
+        "points": len(points),
+        "cached": n_cached,
+    }
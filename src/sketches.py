@@ -0,0 +1,259 @@
+"""
+Métricas en streaming con sketches de cuantiles combinables.
+
+Para corridas enormes (millones de personas o cientos de réplicas) guardar
+cada evento de salida, armar un DataFrame y cruzarlo con person_data es el
+pico de memoria. Acá cada evacuación actualiza sketches (total, por tipo y
+por salida) y no se retiene ninguna fila por persona.
+
+QuantileSketch es un DDSketch: cubetas logarítmicas de razón
+gamma = (1 + a) / (1 - a), así que todo cuantil tiene error RELATIVO <= a
+(rel_error) respecto del valor exacto (pandas.Series.quantile); min, max
+(makespan) y conteos son exactos. Dos sketches con el mismo rel_error se
+combinan sumando cubetas, sin pérdida: el resultado es el mismo que con un
+único sketch de todos los datos (réplicas, procesos, bloques de personas).
+"""
+import math
+
+import numpy as np
+
+
+class QuantileSketch:
+    """Sketch de cuantiles de valores >= 0 con error relativo acotado."""
+
+    def __init__(self, rel_error=0.01):
+        if not 0 < rel_error < 1:
+            raise ValueError("rel_error debe estar en (0, 1)")
+        self.rel_error = rel_error
+        self._gamma = (1 + rel_error) / (1 - rel_error)
+        self._log_gamma = math.log(self._gamma)
+        self.bins = {}      # k -> conteo de valores en (gamma^(k-1), gamma^k]
+        self.zeros = 0      # valores == 0 (p. ej. t_exit en el primer tick)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, x):
+        return math.ceil(math.log(x) / self._log_gamma)
+
+    def add(self, x, n=1):
+        x = float(x)
+        if x < 0 or not math.isfinite(x):
+            raise ValueError(f"valor inválido para el sketch: {x}")
+        if x == 0:
+            self.zeros += n
+        else:
+            k = self._key(x)
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.count += n
+        self.sum += x * n
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def add_many(self, values):
+        """Agrega un array de valores (una llamada por tick, no por persona)."""
+        v = np.asarray(values, dtype=float).ravel()
+        if v.size == 0:
+            return
+        if (v < 0).any() or not np.isfinite(v).all():
+            raise ValueError("valores inválidos para el sketch")
+        pos = v[v > 0]
+        self.zeros += v.size - pos.size
+        if pos.size:
+            keys, counts = np.unique(np.ceil(np.log(pos) / self._log_gamma).astype(np.int64),
+                                     return_counts=True)
+            for k, c in zip(keys.tolist(), counts.tolist()):
+                self.bins[k] = self.bins.get(k, 0) + c
+        self.count += v.size
+        self.sum += float(v.sum())
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+
+    def merge(self, other):
+        """Suma otro sketch (mismo rel_error) a éste; devuelve self."""
+        if other.rel_error != self.rel_error:
+            raise ValueError("sólo se combinan sketches con el mismo rel_error")
+        for k, c in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + c
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _value_at(self, rank):
+        """Valor de rango entero 'rank' (0 = mínimo), con error relativo <= rel_error."""
+        if rank <= 0:
+            return self.min
+        if rank >= self.count - 1:
+            return self.max
+        seen = self.zeros
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                value = 2 * self._gamma ** k / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantile(self, q):
+        """
+        Cuantil q en [0, 1] (NaN si está vacío), interpolado entre rangos como
+        pandas (interpolation="linear"): al ser valores >= 0, el error relativo
+        respecto de Series.quantile(q) también es <= rel_error.
+        """
+        if self.count == 0:
+            return np.nan
+        rank = q * (self.count - 1)
+        lo = math.floor(rank)
+        frac = rank - lo
+        v = self._value_at(lo)
+        if frac > 0:
+            v += frac * (self._value_at(lo + 1) - v)
+        return v
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else np.nan
+
+    def to_dict(self):
+        return {"rel_error": self.rel_error, "bins": {str(k): c for k, c in self.bins.items()},
+                "zeros": self.zeros, "count": self.count, "sum": self.sum,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, d):
+        s = cls(d["rel_error"])
+        s.bins = {int(k): c for k, c in d["bins"].items()}
+        s.zeros, s.count, s.sum = d["zeros"], d["count"], d["sum"]
+        if s.count:
+            s.min, s.max = d["min"], d["max"]
+        return s
+
+
+class StreamingMetrics:
+    """
+    Tiempos de salida resumidos en sketches: total, por tipo y por salida.
+    population: {tipo: personas al inicio} (para % evacuado por tipo).
+    """
+
+    def __init__(self, population=None, rel_error=0.01):
+        self.rel_error = rel_error
+        self.population = dict(population or {})
+        self.overall = QuantileSketch(rel_error)
+        self.by_tipo = {}
+        self.by_exit = {}
+
+    def _sketch(self, group, key):
+        s = group.get(key)
+        if s is None:
+            s = group[key] = QuantileSketch(self.rel_error)
+        return s
+
+    @property
+    def count(self):
+        return self.overall.count
+
+    def record(self, t, tipo=None, exit_index=None):
+        """Una evacuación en t (s)."""
+        self.overall.add(t)
+        if tipo is not None:
+            self._sketch(self.by_tipo, tipo).add(t)
+        if exit_index is not None:
+            self._sketch(self.by_exit, int(exit_index)).add(t)
+
+    def record_many(self, t, tipos=None, exits=None):
+        """
+        Varias evacuaciones en el mismo tick t (o t array). tipos / exits:
+        arrays alineados (nombres o códigos) o None.
+        """
+        n = len(tipos) if tipos is not None else len(exits) if exits is not None else np.size(t)
+        ts = np.broadcast_to(np.asarray(t, dtype=float), (n,))
+        self.overall.add_many(ts)
+        for group, labels in ((self.by_tipo, tipos), (self.by_exit, exits)):
+            if labels is None:
+                continue
+            labels = np.asarray(labels)
+            for key in np.unique(labels).tolist():
+                self._sketch(group, key).add_many(ts[labels == key])
+
+    def record_counts(self, t, by_tipo=None, by_exit=None):
+        """
+        Evacuaciones de un mismo tick t ya contadas: by_tipo / by_exit son
+        {tipo: n} / {salida: n} (ambos suman el total del tick).
+        """
+        groups = [(self.by_tipo, by_tipo), (self.by_exit, by_exit)]
+        n = sum((by_tipo or by_exit or {}).values())
+        if n:
+            self.overall.add(t, n)
+        for group, counts in groups:
+            for key, c in (counts or {}).items():
+                if c:
+                    self._sketch(group, key).add(t, c)
+
+    def merge(self, other):
+        """Combina otra réplica / otro proceso; devuelve self."""
+        self.overall.merge(other.overall)
+        for group, theirs in ((self.by_tipo, other.by_tipo), (self.by_exit, other.by_exit)):
+            for key, s in theirs.items():
+                self._sketch(group, key).merge(s)
+        for tipo, n in other.population.items():
+            self.population[tipo] = self.population.get(tipo, 0) + n
+        return self
+
+    @classmethod
+    def merged(cls, streams):
+        """Un StreamingMetrics nuevo con la combinación de todos."""
+        streams = list(streams)
+        out = cls(rel_error=streams[0].rel_error if streams else 0.01)
+        for s in streams:
+            out.merge(s)
+        return out
+
+    def metrics(self):
+        """
+        Métricas con las mismas claves que metrics.summarize_run (makespan,
+        p50, p90, evacuados, p50_/p90_/evacuados_/pct_evac_<tipo>) más
+        p50_/p90_/evacuados_exit_<i> y quantile_rel_error.
+        """
+        o = self.overall
+        out = {
+            "makespan": o.max if o.count else np.nan,
+            "p50": o.quantile(0.5),
+            "p90": o.quantile(0.9),
+            "evacuados": o.count,
+            "quantile_rel_error": self.rel_error,
+        }
+        for tipo in list(self.population) + [t for t in self.by_tipo if t not in self.population]:
+            s = self.by_tipo.get(tipo) or QuantileSketch(self.rel_error)
+            key = str(tipo).replace(" ", "_").replace("-", "_")
+            total = self.population.get(tipo, 0)
+            if total == 0 and s.count == 0:
+                continue
+            out[f"p90_{key}"] = s.quantile(0.9)
+            out[f"p50_{key}"] = s.quantile(0.5)
+            out[f"evacuados_{key}"] = s.count
+            out[f"pct_evac_{key}"] = s.count / total * 100 if total > 0 else 0.0
+        for i in sorted(self.by_exit):
+            s = self.by_exit[i]
+            out[f"p50_exit_{i}"] = s.quantile(0.5)
+            out[f"p90_exit_{i}"] = s.quantile(0.9)
+            out[f"evacuados_exit_{i}"] = s.count
+        return out
+
+    def to_dict(self):
+        return {"rel_error": self.rel_error, "population": self.population,
+                "overall": self.overall.to_dict(),
+                "by_tipo": {str(k): s.to_dict() for k, s in self.by_tipo.items()},
+                "by_exit": {str(k): s.to_dict() for k, s in self.by_exit.items()}}
+
+    @classmethod
+    def from_dict(cls, d):
+        m = cls(d["population"], d["rel_error"])
+        m.overall = QuantileSketch.from_dict(d["overall"])
+        m.by_tipo = {k: QuantileSketch.from_dict(s) for k, s in d["by_tipo"].items()}
+        m.by_exit = {int(k): QuantileSketch.from_dict(s) for k, s in d["by_exit"].items()}
+        return m
@@ -0,0 +1,163 @@
+"""
+Snapshots del piso (posiciones, estado y colas por salida) para la vista animada.
+
+SnapshotRecorder guarda un snapshot cada 'every' ticks y, si se llena,
+duplica 'every' descartando uno de cada dos (memoria acotada).
+decimate() reduce los snapshots a un payload acotado (frames x bins) antes
+de mandarlos al navegador; build_floor_figure() arma la animación plotly.
+"""
+import numpy as np
+
+from .agents import PersonAgent, WAITING
+
+
+class SnapshotRecorder:
+    """
+    Se pasa a run_model(..., recorder=...). Cada frame es un dict con:
+    t (s), x, y (int16), waiting (bool), queues (personas en cola por salida),
+    exits [(x, y), ...].
+    """
+    def __init__(self, every=5, max_frames=2000):
+        self.every = max(1, int(every))
+        self.max_frames = max_frames
+        self.frames = []
+        self.width = None
+        self.height = None
+
+    def record(self, model, steps):
+        if steps % self.every:
+            return
+        self.width, self.height = model.width, model.height
+
+        persons = [a for a in model.schedule.agents if isinstance(a, PersonAgent)]
+        n = len(persons)
+        x = np.fromiter((a.pos[0] for a in persons), dtype=np.int16, count=n)
+        y = np.fromiter((a.pos[1] for a in persons), dtype=np.int16, count=n)
+        waiting = np.fromiter((a.state == WAITING for a in persons), dtype=bool, count=n)
+
+        exit_index = {ex.unique_id: i for i, ex in enumerate(model.exits)}
+        queues = np.zeros(len(model.exits), dtype=np.int32)
+        for a, w in zip(persons, waiting):
+            if w and a.target_exit is not None:
+                i = exit_index.get(a.target_exit.unique_id)
+                if i is not None:
+                    queues[i] += 1
+
+        self.frames.append({
+            "t": steps * model.time_step,
+            "x": x,
+            "y": y,
+            "waiting": waiting,
+            "queues": queues,
+            "exits": [ex.pos for ex in model.exits],
+        })
+
+        # Memoria acotada: al llenarse, quedarse con uno de cada dos
+        if len(self.frames) > self.max_frames:
+            self.frames = self.frames[::2]
+            self.every *= 2
+
+    def view(self, **kwargs):
+        """Atajo: decimate(self.frames, self.width, self.height, **kwargs)."""
+        return decimate(self.frames, self.width, self.height, **kwargs)
+
+
+def decimate(frames, width, height, max_frames=120, max_bins=40, max_points=1000, seed=0):
+    """
+    Reduce snapshots a un payload acotado:
+    - tiempo: a lo sumo max_frames frames equiespaciados (siempre incluye el último)
+    - espacio: densidad por bloques de celdas (a lo sumo max_bins x max_bins)
+    - puntos: a lo sumo max_points personas dibujadas por frame (muestra fija)
+    Tamaño ~ max_frames * (max_bins^2 + 3 * max_points) números sin importar N.
+    """
+    if not frames:
+        return {"width": width, "height": height, "frames": []}
+
+    idx = np.unique(np.linspace(0, len(frames) - 1, min(max_frames, len(frames))).round().astype(int))
+    bin_size = max(1, int(np.ceil(max(width, height) / max_bins)))
+    bx = int(np.ceil(width / bin_size))
+    by = int(np.ceil(height / bin_size))
+    rng = np.random.default_rng(seed)
+
+    out = []
+    for i in idx:
+        f = frames[i]
+        n = len(f["x"])
+        cell = (f["y"] // bin_size).astype(np.int64) * bx + (f["x"] // bin_size)
+        density = np.bincount(cell, minlength=bx * by).reshape(by, bx)
+
+        if n > max_points:
+            keep = np.sort(rng.choice(n, size=max_points, replace=False))
+        else:
+            keep = slice(None)
+        out.append({
+            "t": f["t"],
+            "n": n,
+            "density": density.astype(np.uint16),
+            "x": f["x"][keep],
+            "y": f["y"][keep],
+            "waiting": f["waiting"][keep],
+            "queues": f["queues"],
+            "exits": f["exits"],
+        })
+
+    return {"width": width, "height": height, "bin_size": bin_size, "frames": out}
+
+
+def _frame_traces(f, bin_size):
+    import plotly.graph_objects as go
+
+    half = (bin_size - 1) / 2.0
+    moving = ~f["waiting"]
+    ex = np.array(f["exits"], dtype=float).reshape(-1, 2)
+    return [
+        go.Heatmap(
+            z=f["density"], x0=half, dx=bin_size, y0=half, dy=bin_size,
+            colorscale="YlOrRd", zmin=0, opacity=0.6, colorbar={"title": "personas/bloque"},
+        ),
+        go.Scatter(x=f["x"][moving], y=f["y"][moving], mode="markers", name="MOVING",
+                   marker={"size": 4, "color": "steelblue"}),
+        go.Scatter(x=f["x"][f["waiting"]], y=f["y"][f["waiting"]], mode="markers", name="WAITING",
+                   marker={"size": 4, "color": "darkorange"}),
+        go.Scatter(x=ex[:, 0], y=ex[:, 1], mode="markers+text", name="Salidas",
+                   text=[str(q) for q in f["queues"]], textposition="top center",
+                   marker={"symbol": "square", "color": "green",
+                           "size": [10 + min(int(q), 30) for q in f["queues"]]}),
+    ]
+
+
+def build_floor_figure(view, title="Piso: posiciones, colas y densidad"):
+    """Figura plotly animada a partir de decimate(...)/SnapshotRecorder.view()."""
+    import plotly.graph_objects as go
+
+    frames = view["frames"]
+    if not frames:
+        return go.Figure()
+    bin_size = view.get("bin_size", 1)
+
+    fig = go.Figure(
+        data=_frame_traces(frames[0], bin_size),
+        frames=[go.Frame(data=_frame_traces(f, bin_size), name=f"{f['t']:.1f}") for f in frames],
+    )
+    steps = [{
+        "label": f"{f['t']:.1f}s",
+        "method": "animate",
+        "args": [[f"{f['t']:.1f}"], {"mode": "immediate", "frame": {"duration": 0, "redraw": True}}],
+    } for f in frames]
+    fig.update_layout(
+        title=title,
+        xaxis={"range": [-0.5, view["width"] - 0.5], "title": "x (celdas)"},
+        yaxis={"range": [-0.5, view["height"] - 0.5], "title": "y (celdas)", "scaleanchor": "x"},
+        updatemenus=[{
+            "type": "buttons",
+            "showactive": False,
+            "buttons": [
+                {"label": "▶", "method": "animate",
+                 "args": [None, {"frame": {"duration": 100, "redraw": True}, "fromcurrent": True}]},
+                {"label": "⏸", "method": "animate",
+                 "args": [[None], {"mode": "immediate", "frame": {"duration": 0, "redraw": False}}]},
+            ],
+        }],
+        sliders=[{"steps": steps, "currentvalue": {"prefix": "t = "}}],
+    )
+    return fig
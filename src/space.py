@@ -1,38 +1,75 @@
-from collections import deque
 import numpy as np
 
+METRICS = ("manhattan", "chebyshev", "octile")
+
+# (dx, dy, costo) de un paso según la métrica del campo de distancias
+_STEPS = {
+    "manhattan": [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0)],
+    "chebyshev": [(dx, dy, 1.0) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)],
+    "octile": [(dx, dy, 1.0 if dx == 0 or dy == 0 else float(np.sqrt(2.0)))
+               for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)],
+}
+
+
+def distance_field(width, height, exit_positions, obstacles=None, metric="manhattan"):
+    """
+    Array (height, width) con la distancia mínima a la celda de cualquier
+    salida (np.inf si es inalcanzable), con pasos según metric:
+    - "manhattan": 4 vecinos, costo 1 (el campo de siempre);
+    - "chebyshev": 8 vecinos (vecindad de Moore, como se mueven las
+      personas), costo 1: distancia en ticks de movimiento;
+    - "octile": 8 vecinos, costo sqrt(2) en diagonal: sin las mesetas de
+      chebyshev, el paso greedy sigue la recta hacia la salida.
+    Frente de onda vectorizado (Dial con cubetas de ancho 1 = costo mínimo
+    de un paso): en cada ola se fijan todas las celdas abiertas con
+    distancia < t + 1 y se relajan sus vecinos de una vez con NumPy.
+    obstacles: set((x,y)) con celdas bloqueadas (opcional).
+    """
+    if metric not in _STEPS:
+        raise ValueError(f"Métrica desconocida: {metric} (opciones: {', '.join(METRICS)})")
+    # grid con un borde bloqueado: los vecinos no necesitan chequeo de límites
+    W = width + 2
+    blocked = np.ones((height + 2, W), dtype=bool)
+    blocked[1:-1, 1:-1] = False
+    for (ox, oy) in (obstacles or ()):
+        if 0 <= ox < width and 0 <= oy < height:
+            blocked[oy + 1, ox + 1] = True
+    blocked = blocked.ravel()
+    offsets = np.array([dy * W + dx for dx, dy, _ in _STEPS[metric]], dtype=np.int64)
+    costs = np.array([c for *_, c in _STEPS[metric]])
+
+    dist = np.full(blocked.size, np.inf)
+    done = blocked.copy()
+    seeds = [(y + 1) * W + x + 1 for (x, y) in exit_positions
+             if 0 <= x < width and 0 <= y < height and not blocked[(y + 1) * W + x + 1]]
+    open_ = np.unique(np.array(seeds, dtype=np.int64))
+    dist[open_] = 0.0
+    t = 1.0
+    while open_.size:
+        ready = dist[open_] < t
+        cur, open_ = open_[ready], open_[~ready]
+        t += 1.0
+        if cur.size == 0:
+            continue
+        done[cur] = True
+        nb = (cur[:, None] + offsets).ravel()
+        cand = (dist[cur][:, None] + costs).ravel()
+        keep = ~done[nb] & (cand < dist[nb])
+        nb, cand = nb[keep], cand[keep]
+        if nb.size == 0:
+            continue
+        np.minimum.at(dist, nb, cand)
+        open_ = np.union1d(open_, nb)
+    return dist.reshape(height + 2, W)[1:-1, 1:-1].copy()
+
+
 def bfs_distance_field(width, height, exit_positions, obstacles=None):
     """
     Devuelve un array (height, width) con la distancia Manhattan mínima
     hacia la celda de cualquier salida. Celdas inalcanzables quedan con np.inf.
     obstacles: set((x,y)) con celdas bloqueadas (opcional).
     """
-    if obstacles is None:
-        obstacles = set()
-
-    INF = np.inf
-    dist = np.full((height, width), INF, dtype=float)
-
-    q = deque()
-    # inicializar con las celdas de salida
-    for (x, y) in exit_positions:
-        if 0 <= x < width and 0 <= y < height and (x, y) not in obstacles:
-            dist[y, x] = 0.0
-            q.append((x, y))
-
-    # 4-neighbors BFS (suficiente para distancia base)
-    dirs = [(1,0), (-1,0), (0,1), (0,-1)]
-    while q:
-        x, y = q.popleft()
-        d0 = dist[y, x]
-        for dx, dy in dirs:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < width and 0 <= ny < height and (nx, ny) not in obstacles:
-                if dist[ny, nx] > d0 + 1:
-                    dist[ny, nx] = d0 + 1
-                    q.append((nx, ny))
-
-    return dist
+    return distance_field(width, height, exit_positions, obstacles, metric="manhattan")
 
 
 def neighbors_moore(x, y, width, height):
@@ -45,6 +82,112 @@ def neighbors_moore(x, y, width, height):
             if 0 <= nx < width and 0 <= ny < height:
                 yield nx, ny
 
+def moore_neighbors_csr(width, height, obstacles=None):
+    """
+    Tabla CSR de vecinos de Moore por id de celda (y * width + x), sin
+    obstáculos y en el mismo orden que neighbors_moore: los vecinos de la
+    celda c son indices[indptr[c]:indptr[c + 1]]. Se arma una vez por layout.
+    """
+    n = width * height
+    ys, xs = np.divmod(np.arange(n), width)
+    blocked = np.zeros(n, dtype=bool)
+    for (ox, oy) in (obstacles or ()):
+        blocked[oy * width + ox] = True
+
+    nbrs = np.full((n, 8), -1, dtype=np.int64)
+    offsets = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+    for j, (dx, dy) in enumerate(offsets):
+        nx, ny = xs + dx, ys + dy
+        ok = (0 <= nx) & (nx < width) & (0 <= ny) & (ny < height)
+        cell = np.where(ok, ny * width + nx, 0)
+        ok &= ~blocked[cell]
+        nbrs[ok, j] = cell[ok]
+    return _to_csr(nbrs)
+
+
+def _to_csr(table):
+    """(C, k) con -1 de relleno (válidos primero o intercalados) → (indptr, indices)."""
+    valid = table >= 0
+    indptr = np.concatenate([[0], np.cumsum(valid.sum(axis=1))]).astype(np.int64)
+    return indptr, table[valid]
+
+
+def bottom_exit_positions(width, num_exits):
+    """Salidas equidistantes en el borde inferior (y = 0)."""
+    return [(int((i + 1) * width / (num_exits + 1)), 0) for i in range(num_exits)]
+
+
+def sample_free_cells(rng, width, height, n, blocked=()):
+    """
+    Celdas iniciales de n personas (ids y * width + x), común a los tres
+    motores: sin reemplazo entre las celdas libres (sin salidas ni
+    obstáculos, 'blocked'). Si n supera las libres, cada celda recibe
+    n // libres personas y el resto se reparte sin reemplazo; al final se
+    baraja. Mismo orden de sorteos en rng que EvacuationModel.
+    """
+    free = np.ones(width * height, dtype=bool)
+    for (x, y) in blocked:
+        free[y * width + x] = False
+    free = np.flatnonzero(free)
+    rounds, rem = divmod(n, len(free))
+    cells = np.concatenate([np.tile(free, rounds), rng.choice(free, size=rem, replace=False)])
+    return rng.permutation(cells)
+
+
+def normalize_exit_widths(exit_widths, num_exits):
+    """Anchos (m) por salida: 1.0 m por defecto; rellena/recorta a num_exits."""
+    if exit_widths is None:
+        return [1.0] * num_exits
+    if len(exit_widths) < num_exits:
+        return list(exit_widths) + [exit_widths[-1]] * (num_exits - len(exit_widths))
+    return list(exit_widths[:num_exits])
+
+
+def best_step_table(dist, obstacles=None):
+    """
+    Para cada celda (id = y * width + x), las celdas destino de un paso
+    'greedy' sobre el campo de distancias: la propia celda y sus vecinos de
+    Moore con el valor mínimo (empates dentro de 1e-6), como en
+    PersonAgent._best_neighbor_step. Depende sólo del layout, así que se
+    calcula una vez y se comparte entre réplicas.
+    Devuelve (cands (C, 9) int64 con -1 de relleno, counts (C,)).
+    """
+    height, width = dist.shape
+    ys, xs = np.divmod(np.arange(width * height), width)
+    offsets = [(0, 0)] + [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+
+    blocked = np.zeros((height, width), dtype=bool)
+    for (ox, oy) in (obstacles or ()):
+        blocked[oy, ox] = True
+
+    cells = np.full((width * height, 9), -1, dtype=np.int64)
+    vals = np.full((width * height, 9), np.inf)
+    for j, (dx, dy) in enumerate(offsets):
+        nx, ny = xs + dx, ys + dy
+        ok = (0 <= nx) & (nx < width) & (0 <= ny) & (ny < height)
+        nxc, nyc = np.where(ok, nx, 0), np.where(ok, ny, 0)
+        if j > 0:
+            ok &= ~blocked[nyc, nxc]
+        cells[ok, j] = nyc[ok] * width + nxc[ok]
+        vals[ok, j] = dist[nyc[ok], nxc[ok]]
+
+    best = vals.min(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore"):
+        tie = (cells >= 0) & np.isfinite(best) & ((vals == best) | (np.abs(vals - best) < 1e-6))
+    tie[:, 0] |= ~tie.any(axis=1)  # sin salida alcanzable: quedarse
+
+    # compactar: candidatos válidos primero
+    order = np.argsort(~tie, axis=1, kind="stable")
+    cands = np.where(np.take_along_axis(tie, order, axis=1), np.take_along_axis(cells, order, axis=1), -1)
+    return cands, tie.sum(axis=1)
+
+
+def best_step_csr(dist, obstacles=None):
+    """best_step_table en formato CSR: (indptr, indices) por id de celda."""
+    cands, _ = best_step_table(dist, obstacles)
+    return _to_csr(cands)
+
+
 def update_distance_field(width, height, exit_positions, obstacles=None):
     """Versión para actualizar campo existente después de cambios"""
     return bfs_distance_field(width, height, exit_positions, obstacles)
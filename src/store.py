@@ -0,0 +1,182 @@
+"""
+Almacén columnar de resultados (Parquet, particionado por escenario).
+
+    <root>/runs/scenario=<esc>/part-<lote>.parquet    una fila por corrida: parámetros + métricas
+    <root>/curves/scenario=<esc>/part-<lote>.parquet  run_id, t, perc (puntos de cambio, ver curves.py)
+    <root>/times/scenario=<esc>/part-<lote>.parquet   run_id, id, t_exit
+
+Cada append escribe un archivo nuevo por tabla (nunca se reescribe nada), así
+que varios procesos pueden agregar corridas a la vez. La tabla de corridas es
+chica y se lee entera para filtrar; curvas y tiempos se cargan sólo para los
+run_id pedidos, abriendo únicamente los lotes donde están.
+"""
+import glob
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROOT = os.path.join("results", "store")
+META_COLUMNS = ("run_id", "scenario", "batch", "created", "params")
+
+
+def _scalar(v):
+    """Valor apto para una columna: escalares tal cual, el resto como JSON."""
+    if isinstance(v, (np.generic,)):
+        v = v.item()
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    return json.dumps(v, sort_keys=True, default=str)
+
+
+class ResultsStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def _dir(self, table, scenario):
+        return os.path.join(self.root, table, f"scenario={scenario}")
+
+    def _write(self, table, scenario, batch, df):
+        path = self._dir(table, scenario)
+        os.makedirs(path, exist_ok=True)
+        tmp = os.path.join(path, f".part-{batch}.parquet.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, os.path.join(path, f"part-{batch}.parquet"))
+
+    # ------------------------------------------------
+    # Escritura
+    # ------------------------------------------------
+    def append(self, scenario, runs, batch=None):
+        """
+        runs: iterable de dicts con "params" y "metrics" (dicts) y, opcionales,
+        "ts"/"perc" (curva) y "times" (DataFrame con id, t_exit).
+        Todas quedan en un mismo lote (p. ej. un barrido). Devuelve los run_id.
+        """
+        batch = batch or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        created = pd.Timestamp.now()
+        rows, curves, times, ids = [], [], [], []
+        for i, run in enumerate(runs):
+            run_id = f"{batch}-{i:04d}"
+            ids.append(run_id)
+            params = dict(run.get("params") or {})
+            row = {"run_id": run_id, "scenario": scenario, "batch": batch, "created": created,
+                   "params": json.dumps(params, sort_keys=True, default=str)}
+            row.update({k: _scalar(v) for k, v in params.items()})
+            for k, v in (run.get("metrics") or {}).items():
+                if k in row and k not in META_COLUMNS and row[k] == _scalar(v):
+                    continue  # métrica que repite un parámetro
+                row[k if k not in row else f"metric_{k}"] = _scalar(v)
+            rows.append(row)
+
+            if run.get("ts") is not None:
+                ts = np.asarray(run["ts"], dtype=np.float32)
+                curves.append(pd.DataFrame({"run_id": run_id, "t": ts,
+                                            "perc": np.asarray(run["perc"], dtype=np.float32)}))
+            df = run.get("times")
+            if df is not None and len(df):
+                tdf = pd.DataFrame({"run_id": run_id, "t_exit": df["t_exit"].to_numpy(dtype=float)})
+                if "id" in df.columns:
+                    tdf.insert(1, "id", df["id"].to_numpy())
+                times.append(tdf)
+
+        if not rows:
+            return []
+        if curves:
+            self._write("curves", scenario, batch, pd.concat(curves, ignore_index=True))
+        if times:
+            self._write("times", scenario, batch, pd.concat(times, ignore_index=True))
+        # la tabla de corridas va al final: una corrida visible siempre tiene sus datos
+        self._write("runs", scenario, batch, pd.DataFrame(rows))
+        return ids
+
+    def append_run(self, scenario, params, metrics, ts=None, perc=None, times=None, batch=None):
+        """Agrega una sola corrida; devuelve su run_id."""
+        return self.append(scenario, [{"params": params, "metrics": metrics, "ts": ts, "perc": perc,
+                                       "times": times}], batch=batch)[0]
+
+    def append_results(self, scenario, params, results, batch=None):
+        """
+        Agrega tuplas (df, ts, perc, metrics, ...) de scenarios.baseline/bloqueo,
+        o la lista (a, df, ts, perc, metrics, ...) de scenarios.anchos (cada
+        variante queda como una corrida con su "ancho" en los parámetros).
+        """
+        if scenario == "anchos":
+            params = {k: v for k, v in params.items() if k != "lista_anchos"}
+            runs = [{"params": {**params, "ancho": a}, "metrics": met, "ts": ts, "perc": perc, "times": df}
+                    for a, df, ts, perc, met, *_ in results]
+        else:
+            runs = []
+            for res in results:
+                df, ts, perc, met = res[:4]
+                runs.append({"params": params, "metrics": met, "ts": ts, "perc": perc, "times": df})
+        return self.append(scenario, runs, batch=batch)
+
+    # ------------------------------------------------
+    # Consultas
+    # ------------------------------------------------
+    def scenarios(self):
+        paths = glob.glob(os.path.join(self.root, "runs", "scenario=*"))
+        return sorted(os.path.basename(p).split("=", 1)[1] for p in paths)
+
+    def runs(self, scenario=None, where=None, **filters):
+        """
+        Tabla de corridas (parámetros + métricas, sin curvas).
+        scenario: nombre o lista de nombres (None = todos).
+        filters: columna=valor; una lista/tupla/set filtra por pertenencia y
+        un callable recibe la columna y devuelve una máscara.
+        where: expresión extra para DataFrame.query (p. ej. "makespan < 60").
+        """
+        names = self.scenarios() if scenario is None else (
+            [scenario] if isinstance(scenario, str) else list(scenario))
+        parts = [pd.read_parquet(p) for s in names
+                 for p in sorted(glob.glob(os.path.join(self._dir("runs", s), "part-*.parquet")))]
+        if not parts:
+            return pd.DataFrame(columns=list(META_COLUMNS))
+        df = pd.concat(parts, ignore_index=True)
+
+        for col, value in filters.items():
+            if col not in df.columns:
+                return df.iloc[0:0]
+            if callable(value):
+                mask = value(df[col])
+            elif isinstance(value, (list, tuple, set)):
+                mask = df[col].isin(list(value))
+            else:
+                mask = df[col] == _scalar(value)
+            df = df[mask]
+        if where:
+            df = df.query(where)
+        return df.sort_values("created", kind="stable").reset_index(drop=True)
+
+    def _load(self, table, run_ids, columns=None):
+        """Lee sólo los lotes que contienen los run_id pedidos."""
+        run_ids = list(run_ids)
+        if not run_ids:
+            return pd.DataFrame()
+        index = self.runs()
+        index = index[index["run_id"].isin(run_ids)]
+        parts = []
+        for (scenario, batch), _ in index.groupby(["scenario", "batch"]):
+            path = os.path.join(self._dir(table, scenario), f"part-{batch}.parquet")
+            if os.path.exists(path):
+                parts.append(pd.read_parquet(path, columns=columns, filters=[("run_id", "in", run_ids)]))
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    def curves(self, run_ids):
+        """{run_id: (ts, perc)} para las corridas pedidas que tengan curva."""
+        df = self._load("curves", run_ids)
+        if df.empty:
+            return {}
+        return {rid: (g["t"].to_numpy(dtype=float), g["perc"].to_numpy(dtype=float))
+                for rid, g in df.groupby("run_id", sort=False)}
+
+    def curve(self, run_id):
+        """(ts, perc) de una corrida, o None."""
+        return self.curves([run_id]).get(run_id)
+
+    def times(self, run_ids):
+        """Tiempos individuales (run_id, id, t_exit) de las corridas pedidas."""
+        return self._load("times", run_ids)
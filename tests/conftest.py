@@ -0,0 +1,9 @@
+import os
+import sys
+
+# los tests importan src.* desde la raíz del repo (sin instalar el paquete)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("filterwarnings", "ignore::FutureWarning")  # AgentSet experimental de mesa
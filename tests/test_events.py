@@ -0,0 +1,51 @@
+"""Regresiones de eventos de escenario: obstáculos sobre personas y cierre de salidas."""
+import numpy as np
+import pytest
+
+from src.agents import PersonAgent
+from src.events import ObstacleInsertion
+from src.metrics import run_model
+from src.model import EvacuationModel
+from src.scenarios import bloqueo
+
+
+def _persons(model):
+    return [a for a in model.schedule.agents if isinstance(a, PersonAgent)]
+
+
+@pytest.mark.parametrize("scheduler", ["random", "active"])
+def test_obstacle_on_occupied_cells_relocates_people(scheduler):
+    model = EvacuationModel(N=200, seed=1, scheduler=scheduler)
+    for _ in range(5):
+        model.step()
+    cells = sorted({a.pos for a in _persons(model) if a.pos[1] > 2})[:30]
+    model.schedule_event(ObstacleInsertion(0.5, cells))
+
+    _, _, _, metrics = run_model(model, max_steps=400)  # antes: ValueError "probabilities contain NaN"
+
+    log = [e for e in model.event_log if e["evento"] == ObstacleInsertion.kind]
+    assert log and log[0]["reubicadas"] > 0
+    assert not any(a.pos in model.obstacles for a in _persons(model))
+    assert all(np.isfinite(model.dist_field[a.pos[1], a.pos[0]]) for a in _persons(model))
+    assert metrics["evacuados"] > 0
+
+
+def test_enclosed_people_do_not_crash_exit_choice():
+    # una pared completa en y = 1 deja a todos sin camino a las salidas (y = 0)
+    model = EvacuationModel(N=50, seed=3)
+    model.schedule_event(ObstacleInsertion(0.0, [(x, 1) for x in range(model.width)]))
+    _, _, _, metrics = run_model(model, max_steps=50)
+    assert metrics["steps"] == 50
+
+
+def test_throughput_after_closing_exit_0_keyed_by_original_index():
+    _, _, _, m = bloqueo(N=300, seed=1, t_bloqueo=20, exit_index=0, max_steps=1500,
+                         model_kwargs={"streaming": True})
+    assert m["num_exits_final"] == 2
+    assert m["t_bloqueo_aplicado"] == pytest.approx(20.0)
+    t = m["makespan"]
+    for i in range(3):
+        # el throughput de cada salida (incluida la cerrada) coincide con sus evacuados
+        assert m[f"throughput_exit_{i}"] * t == pytest.approx(m[f"evacuados_exit_{i}"])
+    assert m["evacuados_exit_0"] > 0
+    assert sum(m[f"evacuados_exit_{i}"] for i in range(3)) == m["evacuados"]
@@ -0,0 +1,19 @@
+import pytest
+
+from src.replicas import t_critical
+
+# Cuantiles bilaterales de tabla (t de Student)
+TABLE = [
+    (1, 0.95, 12.706205), (2, 0.95, 4.302653), (3, 0.95, 3.182446), (3, 0.99, 5.840909),
+    (5, 0.90, 2.015048), (10, 0.95, 2.228139), (30, 0.95, 2.042272), (31, 0.95, 2.039513),
+    (60, 0.99, 2.660283),
+]
+
+
+@pytest.mark.parametrize("dof, confidence, expected", TABLE)
+def test_t_critical_matches_table(dof, confidence, expected):
+    assert t_critical(dof, confidence) == pytest.approx(expected, abs=1e-5)
+
+
+def test_t_critical_without_dof_is_infinite():
+    assert t_critical(0) == float("inf")